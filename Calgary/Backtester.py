@@ -1,25 +1,85 @@
+import os
+import pickle
+
+import numpy as np
+
+import pandas as pd
+
+from columns import LazyColumns
+from journal import TradeJournal
+from maths import warmup_length
+from orders import LEGACY, Executor
+from strategies import MeanReversion
+from streaming import StrategyIndicators
+from timeframes import split
 
 BALANCE = 50 # Balance totale du compte
 LEVERAGE = 20 # Levier
 SPREAD = 0.4 # dollars
+MARGIN_RATIO = 0.5 # Part de la balance immobilisée en marge à chaque trade
+STOP_PCT = 0.009 # Distance du stop par rapport à la bande de Bollinger d'entrée
+CHUNK_SIZE = 500_000 # Nombre de candles par bloc en mode run_chunks
+EQUITY_STRIDE = 1 # Une valeur de la courbe de capital toutes les EQUITY_STRIDE candles
+CHECKPOINT_VERSION = 3
+
+# Attributs du Backtester sauvegardés dans un checkpoint
+STATE = (
+    "balance", "trades", "journal", "equity", "marked",
+    "position", "entry_price", "stoploss", "units", "margin_used", "position_size", "entry_time", "limit",
+)
+
+# Colonnes lues par la stratégie par défaut
+COLUMNS = MeanReversion.columns
+
+def to_arrays(df, columns=COLUMNS):
+    """
+    Extrait les colonnes utiles du dataframe en tableaux NumPy float64 contigus.
+
+    :param df: Dataframe préparé (indicateurs déjà calculés)
+    :param columns: Colonnes à extraire
+    :return: dict nom de colonne -> numpy.ndarray
+    """
+    return {col: np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)) for col in columns}
 
 class Backtester: 
-    def __init__(self, df, balance=BALANCE, leverage=LEVERAGE): 
+    def __init__(self, df, balance=BALANCE, leverage=LEVERAGE, spread=SPREAD, margin_ratio=MARGIN_RATIO, stop_pct=None, journal=None, verbose=False,
+                 strategy=None, margin_per_trade=None, fill_model=None, cache=None, equity_stride=EQUITY_STRIDE,
+                 registry=None): 
         """
         Docstring for __init__
         
         :param self: Description
-        :param df: Dataframe pour le backtest
+        :param df: Dataframe pour le backtest : candles brutes ou déjà préparées par add_indicators,
+            les colonnes manquantes sont calculées à la demande selon la stratégie
         :param balance: Quantité d'argent au départ dans le compte fictif
         :param leverage: Levier utilisé pour trader
-        :param margin_per_trade: Marge en argent réservée de la balance
+        :param spread: Spread en dollars entre bid et ask
+        :param margin_ratio: Part de la balance immobilisée en marge à chaque trade
+        :param stop_pct: Distance relative du stop, strategy.stop_pct par défaut
+        :param journal: TradeJournal où enregistrer les trades, un journal en mémoire par défaut
+        :param verbose: Affiche chaque trade clôturé dans la console
+        :param strategy: strategies.Strategy, MeanReversion() par défaut
+        :param margin_per_trade: Marge fixe en argent réservée à chaque trade (sinon balance * margin_ratio)
+        :param fill_model: orders.FillModel des stratégies à ordres en attente, orders.LEGACY par défaut
+        :param cache: cache.IndicatorCache optionnel pour les indicateurs calculés à la demande
+        :param equity_stride: La courbe de capital garde une candle sur equity_stride (1 : toutes),
+            pour limiter la mémoire sur de très longs historiques
+        :param registry: registry.Registry optionnel : chaque run y est enregistré, et un run déjà fait
+            sur les mêmes données avec les mêmes paramètres y est relu au lieu d'être simulé
         """
         self.dataframe = df 
+        self.initial_balance = balance
         self.balance = balance 
-        self.balance_history = []
         self.leverage = leverage 
         # self.margin_per_trade = self.balance / 2 # Calcul de la valeur notionnelle totale contrôlée 
-        self.margin_ratio = 0.5
+        self.margin_ratio = margin_ratio
+        self.spread = spread
+        self.strategy = strategy if strategy is not None else MeanReversion()
+        self.stop_pct = stop_pct if stop_pct is not None else self.strategy.stop_pct
+        self.margin_per_trade = margin_per_trade
+        self.fill_model = fill_model if fill_model is not None else LEGACY
+        self.cache = cache
+        self.registry = registry
         self.margin_used = None
         self.position_size = None
 
@@ -27,154 +87,66 @@ class Backtester:
         self.entry_price = None # si oui, à combien suis-je entrée 
         self.stoploss = None # le stop loss est fixe et calculé à la prise de position 
         self.units = None # quantité d'or contrôlée 
+        self.limit = None # ordre limite d'entrée en attente (stratégies à limite, mode "pandas")
+        self.entry_time = None # datetime de la prise de position, pour le journal
         self.trades = [] # log des trades cloturés
+        self.journal = journal if journal is not None else TradeJournal()
+
+        # Courbe de capital par candle du dataframe, préallouée au lancement du run (voir mark)
+        self.equity_stride = equity_stride
+        self.equity = None
+        self.marked = 0 # candles dont le capital est déjà écrit dans equity
+        self.bar = 0 # candle du dataframe en cours de traitement, fixée par le moteur
+        self._close = None
+        self._times = None
+        if verbose:
+            self.journal.verbose = True
 
     def on_candle(self, candle):
-        open_ = candle["Open"]
-        close = candle["Close"]
-        prev_close = candle["prev_close"]
-        high = candle["High"]
-        low = candle["Low"]
-        rsi = candle["RSI"]
-        prev_rsi = candle["prev_RSI"]
-        moymob = candle["MoyMob"] # Moyenne mobile, exact milieu entre BB lower et BB upper
-        prev_moymob = candle['prev_MoyMob']
-        bbupper = candle["BB_upper"]
-        prev_bbupper = candle["prev_BB_upper"]
-        bblower = candle["BB_lower"]
-        prev_bblower = candle["prev_BB_lower"]
-
-        # Notion de trend
-        sma50 = candle['SMA50']
-        sma200 = candle['SMA200']
-
-        trend_haussier = sma50 >= sma200
-
-        # Notion de pente de la moyenne mobile, pour les conditions de sortie
-        slope = moymob - prev_moymob 
-
-        #### Conditions de long
-        # Si le RSI passe de inférieur à 30 à supérieur à 30
-        rsi_long_ok = (prev_rsi < 30) and (rsi > 30)
-        # Et que le prix croise la BB lower par le bas
-        price_long_ok = (prev_close < prev_bblower) and (close > bblower)
-        # Alors on considère qu'on est en position longue
-        shouldibuy = rsi_long_ok and price_long_ok and trend_haussier
-
-        # Conditions de vente de la position longue
-        # take profit en variable car ajustable
-        tp_long = moymob #- (moymob*0.001)
-
-        # Si le RSI croise la barre des 70 par le dessus 
-        rsi_sell_ok = (prev_rsi > 70) and (rsi < 70)
-        # Et que le prix (close) a atteint le take profit définit plus haut
-        price_sell_ok = close >= tp_long
-        # Alors on cloture la position longue
-        take_profit_long = rsi_sell_ok or price_sell_ok
-
-        #### Conditions de short
-        # Si le RSI croise la barre des 70 par le dessus 
-        rsi_short_ok = (prev_rsi > 70) and (rsi < 70)
-        # Et que le prix croise la BB upper par le dessus 
-        price_short_ok = (prev_close > prev_bbupper) and (close < bbupper)
-        # Alors on considère qu'on est en position short
-        shouldisell = rsi_short_ok and price_short_ok and not trend_haussier
-
-        # conditions d'achat de la position short 
-        # Take profit en variable car ajustable
-        tp_short = moymob #+ (moymob*0.001)
-
-        # Si le RSI croise la barre des 30 par le dessous 
-        rsi_buy_ok = (prev_rsi < 30) and (rsi > 30)
-        # Et que le prix a atteint le take profit 
-        price_buy_ok = close <= tp_short
-        # Alors on cloture la position short
-        take_profit_short = rsi_buy_ok or price_buy_ok
-
-        # Position en cours ?
-        if self.position is None:
-            # === OUVERTURE DE POSITION SHORT ===
-            if shouldisell == True:
-                direction = "short"
-
-                exec_price = self.get_execution_price(close, direction, "entry")
-                self.open_position(exec_price, bbupper, direction)
-
-            # === OUVERTURE DE POSITION LONG ===
-            elif shouldibuy == True:
-                direction = "long"
-
-                exec_price = self.get_execution_price(close, direction, "entry")
-                self.open_position(exec_price, bblower, "long")
-        # Si oui, on va gérer notre position en cours
-        else:
-            if self.position == "short":
-                exec_price = self.get_execution_price(close, "long", "exit") # prix d'execution de sortie du short au prix ASK
-                # === STOP LOSS SHORT ===
-                if exec_price >= self.stoploss:
-                    self.exit_trade("stop loss", "short", exec_price, candle.name)
-
-                # === TRAILING STOP ===
-                # Si la moymob est supérieure au prix d'entrée du short ou que la moyenne mobile est en train de monter
-                # elif moymob > self.entry_price and slope > 0:
-                #     self.exit_trade("trailing stop", "short", close, candle.name)
+        """
+        Traite une candle (ligne de dataframe) avec la stratégie, chemin de référence du mode "pandas" et du mode live.
 
-                # === TAKE PROFIT SHORT ===
-                elif take_profit_short == True:
-                    self.exit_trade("take profit", "short", exec_price, candle.name)
+        :param candle: pandas.Series (ou live.Candle) avec les colonnes déclarées par la stratégie
+        """
+        self.strategy.on_candle(self, candle)
 
-            elif self.position == "long":
-                exec_price = self.get_execution_price(close, "short", "exit") # prix d'execution de sortie du long au prix BID
-                # === STOP LOSS LONG ===
-                if exec_price <= self.stoploss:
-                    self.exit_trade("stop loss", "long", exec_price, candle.name)
-                
-                # === TRAILING STOP ===
-                # Si la moymob est inférieure au prix d'entrée du long ou que la moyenne mobile est en train de chuter
-                # elif moymob < self.entry_price and slope < 0:
-                #     self.exit_trade("trailing stop", "long", close, candle.name)
+    def check_fill_model(self, caller):
+        """
+        Vérifie que les trades de on_candle sont ceux du mode "events" : on_candle exécute les ordres
+        en attente avec les règles orders.LEGACY, un autre modèle d'exécution n'est simulé qu'en mode "events".
 
-                # === TAKE PROFIT LONG ===
-                elif take_profit_long == True:
-                    self.exit_trade("take profit", "long", exec_price, candle.name)
+        :param caller: Nom de l'appelant pour le message d'erreur
+        """
+        if self.strategy.pending_orders and vars(self.fill_model) != vars(LEGACY):
+            raise ValueError(f"{caller} : the fill model of {type(self.strategy).__name__} is only simulated in 'events' mode")
 
-    def open_position(self, entry_price: float, bb, direction: str = "long"):
+    def open_position(self, entry_price: float, bb, direction: str = "long", datetime=None):
         """
         Ouvre une position <direction> au prix <entry_price>
         
         :param entry_price: Prix d'entrée sur la position
         :type entry_price: float
+        :param bb: Niveau de référence du stop (bande de Bollinger d'entrée pour MeanReversion)
         :param direction: Sens du trade: "long" ou "short"
         :type direction: str
+        :param datetime: Date et temps de l'entrée pour le journal
         """
+        self.mark(self.bar) # capital à plat jusqu'à la candle d'entrée
         self.position = direction
         self.entry_price = entry_price
+        self.entry_time = datetime
 
-        self.margin_used = self.balance * self.margin_ratio
+        if self.margin_per_trade is not None:
+            self.margin_used = self.margin_per_trade
+        else:
+            self.margin_used = self.balance * self.margin_ratio
         self.position_size = self.margin_used * self.leverage
         self.units = self.position_size / entry_price
         self.balance -= self.margin_used
 
-        # intégration du spread pour le calcul des stops
-        half_spread = SPREAD / 2
-
-        if direction in ("short", "Short"):
-            # On définit un stop loss dès l'entrée en position
-            # self.stoploss = entry_price * (1 + 0.003) # Stop 0.3% au dessus du prix de cloture (prix d'entrée)
-            self.stoploss = bb * (1 + 0.009)  # Stop 0.009% au dessus de BB_upper
-            self.stoploss += half_spread
-            
-            # self.stoploss = self.entry_price - ((self.balance*0.005)/self.units) # Stop quand on a perdu 0.5% de la balance totale 
-        elif direction in ("long", "Long"):
-            # On définit un stop loss dès l'entrée en position
-            # self.stoploss = entry_price * (1 - 0.0036) # Stop 0.36% sous le prix de cloture (prix d'entrée)
-            self.stoploss = bb * (1 - 0.009)  # Stop 0.009% sous BB_lower
-            self.stoploss -= half_spread
+        # Stop fixé à l'entrée par la stratégie, à partir du prix d'entrée ou du niveau de référence (bande d'entrée)
+        self.stoploss = self.strategy.stop_level(self, entry_price, bb, direction)
 
-            # self.stoploss = self.entry_price + ((self.balance*0.005)/self.units)# Stop quand on a perdu 0.5% de la balance totale 
-        else:
-            raise ValueError("stop_loss : direction must be 'long' or 'short'")
-        
     def exit_trade(self, label, direction, price, datetime = ""):
         """
         Docstring for exit_trade
@@ -182,7 +154,7 @@ class Backtester:
         :param label: Description de la sortie du trade
         :param direction: Sens du trade à stopper
         :param price: Prix d'excution de la sortie du trade
-        :param datetime: Date et temps pour le log
+        :param datetime: Date et temps pour le journal
         """
         # Calcul des gains/pertes
         if direction in ("short", "Short"):
@@ -192,9 +164,10 @@ class Backtester:
         else:
             raise ValueError(f"{label} : direction must be 'long' or 'short'")
 
+        self.mark(self.bar) # capital de la position ouverte jusqu'à la candle de sortie
         self.close_position(pnl)
 
-        print(f"{datetime} --- {direction} {label} --- prix d'entrée : {self.entry_price} --- {self.balance} ---")
+        self.journal.record(self.entry_time, datetime, direction, self.entry_price, price, self.units, pnl, label, self.balance)
 
         # Reset
         self.reset()
@@ -205,7 +178,7 @@ class Backtester:
         side: 'entry' ou 'exit'
         direction: 'long' ou 'short'
         """
-        half_spread = SPREAD / 2
+        half_spread = self.spread / 2
 
         if direction in ("long", "Long"):
             if side == "entry":
@@ -234,22 +207,440 @@ class Backtester:
     def reset(self):
         """
         Remet à None les parametres propres à une position courante.
-        Met à jour l'historique de balance avec la balance courante.        
         """
         self.position = None
         self.margin_used = None
         self.entry_price = None
         self.units = None 
         self.stoploss = None
-        self.balance_history.append(self.balance)
+        self.entry_time = None
+
+    def start_equity(self, close, times):
+        """
+        Préalloue la courbe de capital d'un run : une valeur toutes les equity_stride candles du dataframe
+        (candles 0, stride, 2 * stride...), y compris les candles de chauffe, à plat.
+
+        :param close: numpy.ndarray des clôtures de toutes les candles du dataframe
+        :param times: Index datetime de ces candles (DatetimeIndex, ou int64 ns comme loader.load_columns)
+        """
+        self._close = close
+        self._times = times
+        self.equity = np.empty(-(-len(close) // self.equity_stride))
+        self.marked = 0
+
+    def mark(self, stop):
+        """
+        Écrit le capital des candles [marked, stop) du dataframe avec l'état courant, en une opération
+        NumPy : la balance à plat, et en position la balance + la marge immobilisée + le PnL latent
+        à la clôture de chaque candle. Appelé avant chaque entrée et chaque sortie, puis à la fin
+        du run : la courbe est remplie au fil de la simulation, sans visiter chaque candle.
+
+        :param stop: Première candle du dataframe à ne pas écrire
+        """
+        if self.equity is None or stop <= self.marked:
+            return
+        stride = self.equity_stride
+        lo, hi = -(-self.marked // stride), -(-stop // stride)
+        if self.position is None:
+            self.equity[lo:hi] = self.balance
+        else:
+            close = self._close[lo * stride:hi * stride:stride]
+            sign = 1.0 if self.position in ("long", "Long") else -1.0
+            self.equity[lo:hi] = self.balance + self.margin_used + sign * (close - self.entry_price) * self.units
+        self.marked = stop
+
+    def equity_curve(self):
+        """
+        Courbe de capital du dernier run, indexée par les candles gardées du dataframe.
+
+        :return: pandas.Series, None si aucun run n'a été lancé
+        """
+        if self.equity is None:
+            return None
+        times = self._times[::self.equity_stride]
+        if not isinstance(times, pd.DatetimeIndex):
+            times = pd.DatetimeIndex(np.asarray(times).view("datetime64[ns]"), name="datetime")
+        return pd.Series(self.equity, index=times, name="equity", copy=False)
+
+    def run_arrays(self, arrays, index, rows=None):
+        """
+        Même machine à états que MeanReversion.on_candle, mais sur des floats Python extraits
+        une seule fois des colonnes (pas de pandas.Series par candle).
+
+        :param arrays: dict colonne -> numpy.ndarray, voir to_arrays
+        :param index: Index du dataframe, utilisé seulement pour dater les sorties
+        :param rows: Position de chaque candle dans le dataframe, pour la courbe de capital (optionnel)
+        """
+        strategy = self.strategy
+        if type(strategy) is not MeanReversion or strategy.take_profit != "moymob" or strategy.trailing:
+            raise ValueError("run_arrays : only the default MeanReversion exits have a 'numpy' mode, use 'events'")
+        half_spread = self.spread / 2
+        rsi_low, rsi_high = strategy.rsi_low, strategy.rsi_high
+
+        close_ = arrays["Close"].tolist()
+        prev_close_ = arrays["prev_close"].tolist()
+        rsi_ = arrays["RSI"].tolist()
+        prev_rsi_ = arrays["prev_RSI"].tolist()
+        moymob_ = arrays["MoyMob"].tolist()
+        bbupper_ = arrays["BB_upper"].tolist()
+        prev_bbupper_ = arrays["prev_BB_upper"].tolist()
+        bblower_ = arrays["BB_lower"].tolist()
+        prev_bblower_ = arrays["prev_BB_lower"].tolist()
+        sma50_ = arrays[strategy.trend[0]].tolist()
+        sma200_ = arrays[strategy.trend[1]].tolist()
+        rows_ = range(len(close_)) if rows is None else rows.tolist()
+
+        for i in range(len(close_)):
+            self.bar = rows_[i]
+            close = close_[i]
+            prev_rsi = prev_rsi_[i]
+            rsi = rsi_[i]
+
+            if self.position is None:
+                trend_haussier = sma50_[i] >= sma200_[i]
+
+                # === OUVERTURE DE POSITION SHORT ===
+                if (prev_rsi > rsi_high) and (rsi < rsi_high) and (prev_close_[i] > prev_bbupper_[i]) and (close < bbupper_[i]) and not trend_haussier:
+                    self.open_position(close - half_spread, bbupper_[i], "short", index[i])
+
+                # === OUVERTURE DE POSITION LONG ===
+                elif (prev_rsi < rsi_low) and (rsi > rsi_low) and (prev_close_[i] < prev_bblower_[i]) and (close > bblower_[i]) and trend_haussier:
+                    self.open_position(close + half_spread, bblower_[i], "long", index[i])
+
+            elif self.position == "short":
+                exec_price = close - half_spread # = get_execution_price(close, "long", "exit"), comme on_candle
+                # === STOP LOSS SHORT ===
+                if exec_price >= self.stoploss:
+                    self.exit_trade("stop loss", "short", exec_price, index[i])
+                # === TAKE PROFIT SHORT ===
+                elif ((prev_rsi < rsi_low) and (rsi > rsi_low)) or close <= moymob_[i]:
+                    self.exit_trade("take profit", "short", exec_price, index[i])
 
-    def run(self):
-        for _, candle in self.dataframe.iterrows():
-            self.on_candle(candle)
+            elif self.position == "long":
+                exec_price = close + half_spread # = get_execution_price(close, "short", "exit"), comme on_candle
+                # === STOP LOSS LONG ===
+                if exec_price <= self.stoploss:
+                    self.exit_trade("stop loss", "long", exec_price, index[i])
+                # === TAKE PROFIT LONG ===
+                elif ((prev_rsi > rsi_high) and (rsi < rsi_high)) or close >= moymob_[i]:
+                    self.exit_trade("take profit", "long", exec_price, index[i])
+
+    def run_events(self, arrays, index, start=0, entry_bar=None, rows=None):
+        """
+        Moteur rapide commun à toutes les stratégies : les signaux sont des masques NumPy
+        (strategy.signals) et la boucle ne visite que les barres utiles, les entrées quand
+        on est à plat puis la barre de sortie trouvée par strategy.exit.
+
+        :param arrays: dict colonne -> numpy.ndarray, voir prepare
+        :param index: Index des candles, utilisé pour dater les trades
+        :param start: Première candle à traiter (reprise depuis un checkpoint)
+        :param entry_bar: Candle d'entrée de la position ouverte dont la sortie reste à chercher depuis start
+        :param rows: Position de chaque candle dans le dataframe, pour la courbe de capital (optionnel)
+        :return: (candle où reprendre si des candles sont ajoutées, candle d'entrée de la position
+            encore ouverte ou None), voir checkpoint
+        """
+        strategy = self.strategy
+        signals = strategy.signals(self, arrays)
+        short_entry = signals["short_entry"]
+        entries = np.flatnonzero(signals["long_entry"] | short_entry)
+        executor = Executor(arrays, self.fill_model, index.asi8 if self.fill_model.lower is not None else None)
+
+        n = len(arrays["Close"])
+        i = start
+        while i < n:
+            if self.position is None:
+                k = np.searchsorted(entries, i)
+                if k == len(entries):
+                    return n, None
+                signal = int(entries[k])
+                direction = "short" if short_entry[signal] else "long"
+                j, price, reference = strategy.enter(self, executor, arrays, signals, signal, direction)
+                if j is None:
+                    return signal, None # ordre encore en attente à la fin des données
+                if price is not None:
+                    self.bar = j if rows is None else int(rows[j])
+                    self.open_position(price, reference, direction, index[j])
+                    entry_bar = j
+            else:
+                j, price, label = strategy.exit(self, executor, arrays, signals, i, entry_bar)
+                if j is None:
+                    return i, entry_bar # sortie pas encore trouvée
+                entry_bar = None
+                self.bar = j if rows is None else int(rows[j])
+                self.exit_trade(label, self.position, price, index[j])
+
+            i = j + 1
+        return n, entry_bar
+
+    def prepare(self, df=None, skip=0):
+        """
+        Calcule, à la demande, les seules colonnes déclarées par la stratégie et retire les candles
+        incomplètes (l'équivalent du dropna de add_indicators, limité à ces colonnes).
+
+        :param df: Dataframe de candles, self.dataframe par défaut ; les colonnes déjà présentes sont reprises
+        :param skip: Nombre de candles de chauffe à retirer au début, après le calcul des indicateurs
+        :return: (dict colonne -> numpy.ndarray, index des candles gardées)
+        """
+        arrays, index, rows = self._prepare(df, skip)
+        return arrays, index
+
+    def _prepare(self, df=None, skip=0):
+        """
+        prepare, avec en plus la position dans df de chaque candle gardée (numpy.ndarray int64).
+        """
+        df = self.dataframe if df is None else df
+        strategy = self.strategy
+        columns = LazyColumns(df, strategy.rsi_window, strategy.bb_period, strategy.bb_num_std, self.cache)
+
+        arrays = {col: columns[col][skip:] for col in strategy.columns}
+        index = df.index[skip:]
+        rows = np.arange(skip, len(df))
+
+        valid = np.logical_and.reduce([~np.isnan(values) for values in arrays.values()])
+        if not valid.all():
+            arrays = {col: np.ascontiguousarray(values[valid]) for col, values in arrays.items()}
+            index = index[valid]
+            rows = rows[valid]
+        return arrays, index, rows
+
+    def run(self, mode="pandas", checkpoint=None):
+        """
+        Lance le backtest sur tout le dataframe.
+
+        :param mode: "pandas" (iterrows + on_candle), "numpy" (run_arrays, MeanReversion seulement)
+            ou "events" (run_events) ; ils donnent exactement les mêmes trades. Le fill_model des
+            stratégies à ordres en attente n'est simulé qu'en mode "events" (les autres modes refusent
+            un modèle différent de orders.LEGACY)
+        :param checkpoint: Fichier de checkpoint (mode "events"). S'il correspond au début du dataframe
+            et aux paramètres du backtest, seules les candles ajoutées depuis sont traitées ;
+            dans tous les cas il est réécrit à la fin du run, voir resume
+        Avec un registre (voir registry.Registry), un run déjà enregistré pour les mêmes données, paramètres,
+        mode et code est relu sans simulation, et chaque run simulé y est enregistré.
+        """
+        if mode not in ("pandas", "numpy", "events"):
+            raise ValueError("run : mode must be 'pandas', 'numpy' or 'events'")
+        if checkpoint is not None and mode != "events":
+            raise ValueError("run : checkpoint requires mode 'events'")
+        if mode == "pandas":
+            self.check_fill_model("run")
+
+        key = None
+        if self.registry is not None:
+            key = self.registry.key(self, mode)
+            results = self.registry.serve(self, key)
+            if results is not None:
+                return results
+
+        results = self._run(mode, checkpoint)
+        if self.registry is not None:
+            self.registry.record(self, results, key, mode)
+        return results
+
+    def _run(self, mode, checkpoint):
+        """
+        Simulation de run, sans passer par le registre.
+        """
+        if checkpoint is not None:
+            self.config() # vérifie, avant le run, que le backtest peut être sauvegardé
+            snapshot = self.load_checkpoint(checkpoint)
+            if snapshot is not None:
+                return self.resume(snapshot, checkpoint)
+
+        arrays, index, rows = self._prepare()
+        self.start_equity(self.dataframe["Close"].to_numpy(dtype=np.float64), self.dataframe.index)
+
+        if mode == "pandas":
+            for row, (_, candle) in zip(rows.tolist(), pd.DataFrame(arrays, index=index).iterrows()):
+                self.bar = row
+                self.on_candle(candle)
+        elif mode == "numpy":
+            self.run_arrays(arrays, index, rows)
+        else:
+            cursor, entry_bar = self.run_events(arrays, index, rows=rows)
+        self.mark(len(self.dataframe)) # la position encore ouverte est évaluée jusqu'à la dernière candle
+
+        if checkpoint is not None:
+            indicators = self._indicators()
+            indicators.warm(self.dataframe["Close"].tolist())
+            self.checkpoint(checkpoint, arrays, index, rows, cursor, entry_bar, indicators)
+        return self.results()
+
+    def _indicators(self):
+        strategy = self.strategy
+        return StrategyIndicators(strategy.rsi_window, strategy.bb_period, strategy.bb_num_std, strategy.columns)
 
+    def config(self):
+        """
+        Paramètres qui déterminent les trades : un checkpoint n'est repris que s'ils sont identiques.
+        """
+        if self.fill_model.lower is not None:
+            raise ValueError("checkpoint : a fill model with lower timeframe bars cannot be checkpointed")
+        if any(split(col)[1] for col in self.strategy.columns):
+            raise ValueError("checkpoint : higher timeframe columns cannot be checkpointed")
+        return self.parameters()
+
+    def parameters(self):
+        """
+        Paramètres qui déterminent les trades et la courbe de capital (stratégie, exécution, compte).
+        """
+        return {
+            "strategy": (type(self.strategy).__name__, vars(self.strategy)),
+            "fill_model": vars(self.fill_model),
+            "balance": self.initial_balance,
+            "leverage": self.leverage,
+            "spread": self.spread,
+            "margin_ratio": self.margin_ratio,
+            "margin_per_trade": self.margin_per_trade,
+            "stop_pct": self.stop_pct,
+            "equity_stride": self.equity_stride,
+        }
+
+    def checkpoint(self, path, arrays, index, rows, cursor, entry_bar, indicators):
+        """
+        Sauvegarde l'état du backtest à la fin d'un run "events" : position, prix d'entrée, stop,
+        unités, balance, journal, courbe de capital, état glissant des indicateurs (streaming.StrategyIndicators,
+        qui reproduit exactement le calcul sur tout le dataframe) et les candles à réexaminer
+        quand de nouvelles candles seront ajoutées (à partir de cursor - 1, la candle précédente
+        servant de contexte).
+
+        :param path: Fichier du checkpoint, écrit de façon atomique
+        :param arrays: Colonnes de la stratégie sur lesquelles run_events vient de tourner
+        :param index: Index de ces colonnes
+        :param rows: Position de ces candles dans le dataframe
+        :param cursor: Candle où reprendre, renvoyée par run_events
+        :param entry_bar: Candle d'entrée de la position encore ouverte, renvoyée par run_events
+        :param indicators: StrategyIndicators positionné sur la dernière candle du dataframe
+        """
+        df = self.dataframe
+        lo = max(cursor - 1, 0)
+        snapshot = {
+            "version": CHECKPOINT_VERSION,
+            "config": self.config(),
+            "rows": len(df),
+            "last_time": df.index[-1],
+            "last_close": float(df["Close"].iloc[-1]),
+            "state": {name: getattr(self, name) for name in STATE},
+            "indicators": indicators,
+            "tail": ({col: np.array(values[lo:]) for col, values in arrays.items()}, index[lo:], np.array(rows[lo:])),
+            "start": cursor - lo,
+            "entry_bar": None if entry_bar is None else entry_bar - lo,
+        }
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def load_checkpoint(self, path):
+        """
+        Relit un checkpoint s'il peut être repris sur self.dataframe : mêmes paramètres, et les
+        candles déjà traitées sont toujours le début du dataframe (même nombre au moins, même
+        dernière candle).
+
+        :return: Le checkpoint, ou None s'il est absent ou ne correspond plus
+        """
+        try:
+            with open(path, "rb") as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        if not isinstance(snapshot, dict) or snapshot.get("version") != CHECKPOINT_VERSION:
+            return None
+
+        df = self.dataframe
+        rows = snapshot["rows"]
+        if (snapshot["config"] != self.config() or len(df) < rows
+                or df.index[rows - 1] != snapshot["last_time"]
+                or float(df["Close"].iloc[rows - 1]) != snapshot["last_close"]):
+            return None
+        return snapshot
+
+    def resume(self, snapshot, path=None):
+        """
+        Reprend un backtest depuis un checkpoint et ne traite que les candles ajoutées depuis :
+        les indicateurs de ces candles sont calculés par l'état glissant sauvegardé, puis
+        run_events repart de la candle où le run précédent s'était arrêté. Les trades sont
+        exactement ceux d'un run complet sur tout le dataframe.
+
+        :param snapshot: Checkpoint relu par load_checkpoint
+        :param path: Fichier où réécrire le checkpoint après la reprise (optionnel)
+        """
+        for name, value in snapshot["state"].items():
+            setattr(self, name, value)
+
+        # Courbe de capital agrandie aux candles ajoutées, les candles déjà écrites sont gardées
+        done = self.equity
+        self.start_equity(self.dataframe["Close"].to_numpy(dtype=np.float64), self.dataframe.index)
+        self.equity[:len(done)] = done
+        self.marked = snapshot["state"]["marked"]
+
+        indicators = snapshot["indicators"]
+        columns = self.strategy.columns
+        new = self.dataframe.iloc[snapshot["rows"]:]
+        values = {col: [] for col in columns}
+        kept = []
+        for k, (open_, high, low, close) in enumerate(zip(*(new[col].tolist() for col in ("Open", "High", "Low", "Close")))):
+            row = indicators.update(open_, high, low, close)
+            if row is not None:
+                kept.append(k)
+                for col in columns:
+                    values[col].append(row[col])
+
+        tail, tail_index, tail_rows = snapshot["tail"]
+        arrays = {col: np.concatenate([tail[col], np.asarray(values[col], dtype=np.float64)]) for col in columns}
+        index = tail_index.append(new.index[kept])
+        rows = np.concatenate([tail_rows, snapshot["rows"] + np.asarray(kept, dtype=np.int64)])
+
+        cursor, entry_bar = self.run_events(arrays, index, snapshot["start"], snapshot["entry_bar"], rows)
+        self.mark(len(self.dataframe))
+        if path is not None:
+            self.checkpoint(path, arrays, index, rows, cursor, entry_bar, indicators)
+        return self.results()
+
+    def run_chunks(self, columns, chunk_size=CHUNK_SIZE):
+        """
+        Backtest par blocs de candles, pour des historiques qui ne tiennent pas en RAM avec leurs indicateurs.
+        Chaque bloc est copié depuis les colonnes (memory-map, voir loader.load_columns), précédé des
+        candles de chauffe nécessaires aux fenêtres glissantes (SMA200...), puis simulé en mode "events".
+        La position ouverte, le stop et la balance sont portés d'un bloc à l'autre par l'objet lui-même
+        (une limite d'entrée encore en attente à la fin d'un bloc est abandonnée).
+        Les trades sont ceux d'un run complet, aux arrondis près des sommes glissantes de pandas.
+
+        :param columns: dict colonne -> numpy.ndarray (Open/High/Low/Close et 'datetime' en int64 ns)
+        :param chunk_size: Nombre de candles simulées par bloc
+        """
+        if any(split(col)[1] for col in self.strategy.columns):
+            raise ValueError("run_chunks : higher timeframe columns need more warm-up than a chunk provides")
+        warmup = warmup_length(self.strategy.rsi_window, self.strategy.bb_period)
+        n = len(columns["Close"])
+        self.start_equity(columns["Close"], columns["datetime"])
+
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            lo = max(0, start - warmup)
+
+            index = pd.DatetimeIndex(np.asarray(columns["datetime"][lo:stop]).view("datetime64[ns]"), name="datetime")
+            block = pd.DataFrame({col: np.array(columns[col][lo:stop], dtype=np.float64) for col in ("Open", "High", "Low", "Close")}, index=index)
+
+            # On ne garde que les candles du bloc, la chauffe ne sert qu'aux indicateurs
+            arrays, index, rows = self._prepare(block, skip=start - lo)
+            self.run_events(arrays, index, rows=lo + rows)
+        self.mark(n)
+
+        return self.results()
+
+    def results(self):
+        """
+        Résultats du backtest courant. Si le journal écrit sur disque, le dernier lot est écrit.
+        """
+        self.journal.flush()
         return {
             "final_balance": self.balance,
             "total_pnl": sum(self.trades),
             "number_of_trades": len(self.trades),
-            "all_trades": self.trades
-        }
\ No newline at end of file
+            "all_trades": self.trades,
+            "journal": self.journal,
+            "equity": self.equity_curve(),
+            "open_since": self.entry_time, # entrée de la position encore ouverte, None sinon
+        }
@@ -0,0 +1,167 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import maths
+import timeframes
+
+MAX_BYTES = 512 * 1024 * 1024 # Taille maximale du cache en mémoire
+
+def fingerprint(series):
+    """
+    Empreinte des valeurs d'une série (l'index n'influence pas le calcul des indicateurs).
+
+    :param series: pandas.Series de prix
+    :return: str, hash hexadécimal des valeurs
+    """
+    values = np.ascontiguousarray(series.to_numpy(dtype=np.float64))
+    return hashlib.blake2b(values.view(np.uint8), digest_size=16).hexdigest()
+
+def frame_fingerprint(df, columns=("Open", "High", "Low", "Close")):
+    """
+    Empreinte des valeurs de plusieurs colonnes et de l'index d'un dataframe
+    (les bars d'une unité de temps supérieure dépendent des dates des candles).
+
+    :param df: Dataframe de candles indexé par datetime
+    :param columns: Colonnes à prendre en compte
+    :return: str, hash hexadécimal
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(pd.DatetimeIndex(df.index).as_unit("ns").asi8).view(np.uint8))
+    for col in columns:
+        h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).view(np.uint8))
+    return h.hexdigest()
+
+class IndicatorCache:
+    def __init__(self, max_bytes=MAX_BYTES, directory=None):
+        """
+        Cache LRU des colonnes d'indicateurs, indexé par (empreinte des données, indicateur, paramètres).
+
+        :param max_bytes: Taille maximale des colonnes gardées en mémoire
+        :param directory: Dossier du cache disque optionnel, partagé entre processus
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict() # clé -> numpy.ndarray, (n,) ou (k, n)
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, func, series, *args):
+        """
+        Renvoie func(series, *args), calculé une seule fois pour les mêmes données et paramètres.
+
+        :param func: Fonction d'indicateur de maths.py, renvoie une Series ou un tuple de Series
+        :param series: pandas.Series d'entrée
+        :param args: Paramètres de l'indicateur
+        :return: Même forme que func, alignée sur l'index de series
+        """
+        key = f"{func.__name__}-{fingerprint(series)}-" + "-".join(map(str, args))
+
+        values = self._memory.get(key)
+        if values is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+        else:
+            values = self._load(key)
+            if values is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                result = func(series, *args)
+                if isinstance(result, tuple):
+                    values = np.stack([column.to_numpy(dtype=np.float64) for column in result])
+                else:
+                    values = result.to_numpy(dtype=np.float64)
+                self._save(key, values)
+            # Les colonnes sont partagées entre tous les appels : lecture seule
+            values.flags.writeable = False
+            self._remember(key, values)
+
+        if values.ndim == 1:
+            return pd.Series(values, index=series.index)
+        return tuple(pd.Series(column, index=series.index) for column in values)
+
+    def rsi(self, close_series, window=13):
+        return self(maths.rsi, close_series, window)
+
+    def bollinger_bands(self, close_series, period=25, num_std=2):
+        return self(maths.bollinger_bands, close_series, period, num_std)
+
+    def sma(self, close_series, window):
+        return self(maths.sma, close_series, window)
+
+    def resample(self, df, timeframe):
+        """
+        Bars d'une unité de temps supérieure (timeframes.resample), construites une seule fois par
+        jeu de candles : partagées par tous les LazyColumns et Backtester qui utilisent ce cache.
+
+        :param df: Dataframe de candles (Open/High/Low/Close) trié, indexé par datetime
+        :param timeframe: Clé de timeframes.TIMEFRAMES ("H1", "H4"...)
+        :return: (dataframe OHLC des bars, positions de candles où chaque bar est connue)
+        """
+        key = f"resample-{frame_fingerprint(df)}-{timeframe}"
+
+        values = self._memory.get(key)
+        if values is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+        else:
+            values = self._load(key)
+            if values is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                bars, known_at = timeframes.resample(df, timeframe)
+                # Une seule matrice int64 : OHLC (bits des float64), début de période en ns, known_at
+                values = np.stack([bars[col].to_numpy(dtype=np.float64).view(np.int64) for col in ("Open", "High", "Low", "Close")]
+                                  + [bars.index.as_unit("ns").asi8, known_at.astype(np.int64)])
+                self._save(key, values)
+            values.flags.writeable = False
+            self._remember(key, values)
+
+        index = pd.DatetimeIndex(values[4].view("datetime64[ns]"), name="datetime")
+        bars = pd.DataFrame({col: values[k].view(np.float64) for k, col in enumerate(("Open", "High", "Low", "Close"))}, index=index)
+        return bars, values[5]
+
+    def clear(self):
+        """
+        Vide le cache mémoire (le cache disque est conservé).
+        """
+        self._memory.clear()
+        self.nbytes = 0
+
+    def _remember(self, key, values):
+        """
+        Ajoute une entrée en mémoire et évince les moins récemment utilisées au delà de max_bytes.
+        """
+        if values.nbytes > self.max_bytes:
+            return
+        self._memory[key] = values
+        self.nbytes += values.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def _load(self, key):
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+        return np.load(self._path(key))
+
+    def _save(self, key, values):
+        if self.directory is None:
+            return
+        # Écriture atomique : plusieurs workers d'un sweep peuvent écrire la même clé
+        tmp = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, values)
+        os.replace(tmp, self._path(key))
@@ -0,0 +1,91 @@
+import numpy as np
+
+import maths
+from timeframes import align, resample, split
+
+def shift(values, periods):
+    """
+    Décale un tableau de periods candles vers le futur, comme pandas.Series.shift.
+    """
+    shifted = np.empty_like(values)
+    shifted[:periods] = np.nan
+    shifted[periods:] = values[:len(values) - periods]
+    return shifted
+
+class LazyColumns:
+    def __init__(self, df, rsi_window=13, bb_period=21, bb_num_std=2, cache=None):
+        """
+        Colonnes d'indicateurs calculées à la demande : une stratégie ne paie que pour les
+        colonnes qu'elle déclare. Les colonnes déjà présentes dans df sont reprises telles quelles.
+
+        Une colonne suffixée par une unité de temps supérieure ("SMA200_H4", "RSI_H1", voir
+        timeframes.TIMEFRAMES) est calculée sur les bars de cette unité de temps, puis reportée
+        sur les candles sans voir la bar en cours. Les bars de chaque unité de temps sont construites
+        une seule fois par jeu de candles quand un cache est fourni (IndicatorCache.resample),
+        sinon une fois par LazyColumns.
+
+        :param df: Dataframe de candles (Open/High/Low/Close), éventuellement déjà préparé
+        :param rsi_window: Fenêtre du RSI
+        :param bb_period: Période des bandes de Bollinger
+        :param bb_num_std: Nombre d'écarts-types des bandes de Bollinger
+        :param cache: cache.IndicatorCache optionnel
+        """
+        self.df = df
+        self.rsi_window = rsi_window
+        self.bb_period = bb_period
+        self.bb_num_std = bb_num_std
+        self.cache = cache
+        self.computed = {}
+        self.higher = {} # unité de temps -> (LazyColumns des bars, positions où chaque bar est connue)
+
+    def __getitem__(self, name):
+        if name not in self.computed:
+            if name in self.df.columns:
+                self.computed[name] = np.ascontiguousarray(self.df[name].to_numpy(dtype=np.float64))
+            else:
+                self._compute(name)
+        return self.computed[name]
+
+    def timeframe(self, timeframe):
+        """
+        Colonnes des bars d'une unité de temps supérieure, avec les mêmes paramètres d'indicateurs.
+
+        :param timeframe: Clé de timeframes.TIMEFRAMES ("H1", "H4"...)
+        :return: (LazyColumns des bars, positions de candles où chaque bar est connue), voir timeframes.resample
+        """
+        if timeframe not in self.higher:
+            if self.cache is not None:
+                bars, known_at = self.cache.resample(self.df, timeframe)
+            else:
+                bars, known_at = resample(self.df, timeframe)
+            columns = LazyColumns(bars, self.rsi_window, self.bb_period, self.bb_num_std, self.cache)
+            self.higher[timeframe] = (columns, known_at)
+        return self.higher[timeframe]
+
+    def _compute(self, name):
+        cache = self.cache
+        close = self.df["Close"]
+        base, timeframe = split(name)
+
+        if timeframe is not None:
+            columns, known_at = self.timeframe(timeframe)
+            self.computed[name] = align(columns[base], known_at, len(self.df))
+        elif name == "RSI":
+            rsi = cache.rsi if cache is not None else maths.rsi
+            self.computed[name] = rsi(close, self.rsi_window).to_numpy(dtype=np.float64)
+        elif name in ("MoyMob", "BB_upper", "BB_lower"):
+            bollinger_bands = cache.bollinger_bands if cache is not None else maths.bollinger_bands
+            bands = bollinger_bands(close, self.bb_period, self.bb_num_std)
+            for col, values in zip(("MoyMob", "BB_upper", "BB_lower"), bands):
+                self.computed[col] = values.to_numpy(dtype=np.float64)
+        elif name in ("SMA50", "SMA200"):
+            sma = cache.sma if cache is not None else maths.sma
+            self.computed[name] = sma(close, int(name[3:])).to_numpy(dtype=np.float64)
+        elif name == "prev_MoyMob":
+            self.computed[name] = shift(self["MoyMob"], 5)
+        elif name == "prev_close":
+            self.computed[name] = shift(self["Close"], 1)
+        elif name.startswith("prev_"):
+            self.computed[name] = shift(self[name[5:]], 1)
+        else:
+            raise KeyError(f"LazyColumns : unknown column {name}")
@@ -0,0 +1,163 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+CAPACITY = 4096 # Nombre de trades préalloués
+NAT = np.iinfo(np.int64).min # valeur int64 de NaT
+
+# Colonnes du journal et leur type
+FIELDS = {
+    "entry_time": np.int64, # nanosecondes depuis epoch
+    "exit_time": np.int64,
+    "direction": np.int8, # 1 long, -1 short
+    "entry_price": np.float64,
+    "exit_price": np.float64,
+    "units": np.float64,
+    "pnl": np.float64,
+    "label": np.int8, # indice dans TradeJournal.labels
+    "balance": np.float64, # balance après clôture
+}
+
+LABELS = ("stop loss", "take profit", "trailing stop")
+
+def to_ns(datetime):
+    """
+    Convertit un datetime (Timestamp, datetime64, str) en int64 nanosecondes, NAT si absent.
+    """
+    if datetime is None or (isinstance(datetime, str) and datetime == ""):
+        return NAT
+    return pd.Timestamp(datetime).value
+
+class TradeJournal:
+    def __init__(self, capacity=CAPACITY, directory=None, verbose=False):
+        """
+        Journal des trades clôturés, stocké en colonnes NumPy préallouées.
+
+        :param capacity: Nombre de trades préalloués. Sans dossier, la capacité double quand
+            elle est atteinte ; avec un dossier, les trades sont écrits par lots de cette taille
+        :param directory: Dossier où écrire les lots (fichiers .npz), optionnel. Le premier lot écrit
+            remplace les lots d'un journal précédent dans le même dossier
+        :param verbose: Affiche chaque trade dans la console, comme l'ancien print de exit_trade
+        """
+        self.capacity = capacity
+        self.directory = directory
+        self.verbose = verbose
+        self.labels = list(LABELS)
+        self.count = 0 # trades dans le buffer courant
+        self.flushed = 0 # trades déjà écrits sur disque
+        self.files = [] # lots écrits par ce journal, dans l'ordre
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in FIELDS.items()}
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return self.flushed + self.count
+
+    def record(self, entry_time, exit_time, direction, entry_price, exit_price, units, pnl, label, balance):
+        """
+        Ajoute un trade clôturé.
+
+        :param direction: "long" ou "short"
+        :param label: Raison de la sortie ("stop loss", "take profit"...)
+        """
+        if self.count == self.capacity:
+            if self.directory is not None:
+                self.flush()
+            else:
+                self._grow()
+
+        code = self._code(label)
+
+        i = self.count
+        columns = self.columns
+        columns["entry_time"][i] = to_ns(entry_time)
+        columns["exit_time"][i] = to_ns(exit_time)
+        columns["direction"][i] = 1 if direction in ("long", "Long") else -1
+        columns["entry_price"][i] = entry_price
+        columns["exit_price"][i] = exit_price
+        columns["units"][i] = units
+        columns["pnl"][i] = pnl
+        columns["label"][i] = code
+        columns["balance"][i] = balance
+        self.count += 1
+
+        if self.verbose:
+            print(f"{exit_time} --- {direction} {label} --- prix d'entrée : {entry_price} --- {balance} ---")
+
+    def _grow(self):
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            grown = np.empty(self.capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            self.columns[name] = grown
+
+    def flush(self):
+        """
+        Écrit le buffer courant dans un nouveau lot du dossier et le vide.
+        """
+        if self.directory is None or self.count == 0:
+            return
+        if self.flushed == 0:
+            # Nouveau run dans ce dossier : les lots d'un run précédent ne font pas partie de ce journal
+            for path in glob.glob(os.path.join(self.directory, "trades-*.npz")):
+                os.remove(path)
+        path = os.path.join(self.directory, f"trades-{self.flushed:012d}.npz")
+        np.savez(path, labels=np.array(self.labels), **{name: column[:self.count] for name, column in self.columns.items()})
+        if path not in self.files:
+            self.files.append(path)
+        self.flushed += self.count
+        self.count = 0
+
+    def _code(self, label):
+        if label not in self.labels:
+            self.labels.append(label)
+        return self.labels.index(label)
+
+    def arrays(self):
+        """
+        Toutes les colonnes du journal (lots écrits par ce journal + buffer), sans copie si rien n'a été écrit.
+        Les raisons de sortie de chaque lot sont décodées avec les labels enregistrés dans le lot.
+
+        :return: dict colonne -> numpy.ndarray
+        """
+        parts = []
+        for path in self.files:
+            with np.load(path) as part:
+                part = {name: part[name] for name in (*FIELDS, "labels")}
+            codes = np.array([self._code(label) for label in part.pop("labels").tolist()], dtype=np.int8)
+            part["label"] = codes[part["label"]]
+            parts.append(part)
+        if not parts:
+            return {name: column[:self.count] for name, column in self.columns.items()}
+        parts.append({name: column[:self.count] for name, column in self.columns.items()})
+        return {name: np.concatenate([part[name] for part in parts]) for name in FIELDS}
+
+    def to_frame(self):
+        """
+        Journal sous forme de dataframe, avec les dates, le sens et la raison de sortie en clair.
+        """
+        df = pd.DataFrame(self.arrays())
+        for col in ("entry_time", "exit_time"):
+            df[col] = df[col].to_numpy().view("datetime64[ns]")
+        df["direction"] = np.where(df["direction"] > 0, "long", "short")
+        df["label"] = np.array(self.labels)[df["label"].to_numpy()]
+        return df
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Relit un journal écrit par lots dans un dossier.
+
+        :param directory: Dossier des fichiers trades-*.npz
+        """
+        journal = cls(directory=directory)
+        for path in sorted(glob.glob(os.path.join(directory, "trades-*.npz"))):
+            with np.load(path) as part:
+                journal.flushed += len(part["pnl"])
+                for label in part["labels"].tolist():
+                    journal._code(label)
+            journal.files.append(path)
+        return journal
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from streaming import StrategyIndicators
+
+class Candle(dict):
+    def __init__(self, values, name):
+        """
+        Candle lue par Backtester.on_candle : accès par colonne comme une ligne de dataframe,
+        et datetime dans .name comme une ligne d'iterrows.
+
+        :param values: dict colonne -> valeur
+        :param name: Datetime de la candle
+        """
+        super().__init__(values)
+        self.name = name
+
+class BarFeed:
+    """
+    Interface d'un flux de bars : un itérateur asynchrone de tuples
+    (datetime, open, high, low, close). Le flux s'arrête quand l'itération se termine.
+    """
+
+    def __aiter__(self):
+        raise NotImplementedError
+
+class ReplayFeed(BarFeed):
+    def __init__(self, df, speed=None):
+        """
+        Rejoue un dataframe de candles dans le processus courant.
+
+        :param df: Dataframe indexé par datetime avec Open/High/Low/Close
+        :param speed: Facteur d'accélération du temps réel (60 = une candle minute par seconde),
+            None pour rejouer sans attendre
+        """
+        self.df = df
+        self.speed = speed
+
+    async def __aiter__(self):
+        prev = None
+        for when, open_, high, low, close in zip(self.df.index, self.df["Open"].tolist(), self.df["High"].tolist(),
+                                                 self.df["Low"].tolist(), self.df["Close"].tolist()):
+            if self.speed is not None and prev is not None:
+                await asyncio.sleep((when - prev).total_seconds() / self.speed)
+            prev = when
+            yield when, open_, high, low, close
+
+class SocketFeed(BarFeed):
+    def __init__(self, host="127.0.0.1", port=8765):
+        """
+        Flux de bars reçu sur une socket TCP, une bar JSON par ligne :
+        {"t": "2025-04-25 09:12:00", "o": ..., "h": ..., "l": ..., "c": ...}
+
+        :param host: Hôte du serveur de bars
+        :param port: Port du serveur de bars
+        """
+        self.host = host
+        self.port = port
+
+    async def __aiter__(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            while line := await reader.readline():
+                bar = json.loads(line)
+                yield pd.Timestamp(bar["t"]), bar["o"], bar["h"], bar["l"], bar["c"]
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+async def serve_replay(df, host="127.0.0.1", port=8765, speed=None):
+    """
+    Serveur local qui rejoue un dataframe de candles au format attendu par SocketFeed,
+    pour tester le mode live sans courtier.
+
+    :param df: Dataframe indexé par datetime avec Open/High/Low/Close
+    :param host: Hôte d'écoute
+    :param port: Port d'écoute (0 pour un port libre, voir server.sockets)
+    :param speed: Facteur d'accélération, voir ReplayFeed
+    :return: asyncio.Server
+    """
+    async def handle(reader, writer):
+        async for when, open_, high, low, close in ReplayFeed(df, speed):
+            writer.write(json.dumps({"t": str(when), "o": open_, "h": high, "l": low, "c": close}).encode() + b"\n")
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    return await asyncio.start_server(handle, host, port)
+
+class LiveRunner:
+    def __init__(self, backtester, feed, rsi_window=None, bb_period=None, bb_num_std=None):
+        """
+        Fait tourner la stratégie Backtester.on_candle sur un flux de bars, avec des
+        indicateurs mis à jour à chaque bar au lieu du calcul sur tout le dataframe.
+
+        :param backtester: Backtester dont on_candle prend les décisions (son dataframe n'est pas lu) ;
+            les ordres en attente y sont exécutés avec orders.LEGACY
+        :param feed: BarFeed
+        :param rsi_window: Fenêtre du RSI, celle de backtester.strategy par défaut
+        :param bb_period: Période des bandes de Bollinger, celle de backtester.strategy par défaut
+        :param bb_num_std: Nombre d'écarts-types des bandes de Bollinger, celui de backtester.strategy par défaut
+        """
+        backtester.check_fill_model("LiveRunner")
+        strategy = backtester.strategy
+        rsi_window = strategy.rsi_window if rsi_window is None else rsi_window
+        bb_period = strategy.bb_period if bb_period is None else bb_period
+        bb_num_std = strategy.bb_num_std if bb_num_std is None else bb_num_std
+        self.backtester = backtester
+        self.feed = feed
+        self.indicators = StrategyIndicators(rsi_window, bb_period, bb_num_std, strategy.columns)
+        self.latencies = [] # nanosecondes par bar, indicateurs + décision
+
+    async def run(self):
+        """
+        Consomme le flux jusqu'à sa fin.
+
+        :return: Résultats du backtester, comme Backtester.run
+        """
+        async for when, open_, high, low, close in self.feed:
+            start = time.perf_counter_ns()
+            row = self.indicators.update(open_, high, low, close)
+            if row is not None:
+                self.backtester.on_candle(Candle(row, when))
+            self.latencies.append(time.perf_counter_ns() - start)
+
+        return self.backtester.results()
+
+    def latency_percentiles(self, percentiles=(50, 90, 99, 99.9)):
+        """
+        Percentiles de la latence de décision par bar.
+
+        :param percentiles: Percentiles à calculer
+        :return: dict "p50"... -> latence en microsecondes, plus "max"
+        """
+        latencies = np.asarray(self.latencies, dtype=np.float64) / 1000
+        if len(latencies) == 0:
+            return {}
+        stats = {f"p{p:g}": float(v) for p, v in zip(percentiles, np.percentile(latencies, percentiles))}
+        stats["max"] = float(latencies.max())
+        return stats
+
+async def replay(df, backtester, speed=None, port=0):
+    """
+    Rejoue un dataframe de candles à travers une socket locale et le mode live.
+
+    :param df: Dataframe de candles brutes indexé par datetime
+    :param backtester: Backtester à piloter
+    :param speed: Facteur d'accélération, voir ReplayFeed
+    :param port: Port du serveur local (0 pour un port libre)
+    :return: LiveRunner après la fin du flux
+    """
+    server = await serve_replay(df, port=port, speed=speed)
+    async with server:
+        host, port = server.sockets[0].getsockname()[:2]
+        runner = LiveRunner(backtester, SocketFeed(host, port))
+        await runner.run()
+    return runner
+
+if __name__ == "__main__":
+    from Backtester import Backtester
+    from loader import load_candles
+    from main import DATA_FILE
+
+    runner = asyncio.run(replay(load_candles(DATA_FILE), Backtester(None)))
+    results = runner.backtester.results()
+
+    print("===== PAPER TRADING TERMINE =====")
+    print(f"Balance finale        : {results['final_balance']:.2f} €")
+    print(f"Nombre de trades      : {results['number_of_trades']}")
+    for name, value in runner.latency_percentiles().items():
+        print(f"Latence {name:<6}        : {value:.1f} µs")
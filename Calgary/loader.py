@@ -0,0 +1,218 @@
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 1
+
+def cache_dir_for(path):
+    """
+    Dossier de cache par défaut d'un fichier de candles : à côté du fichier source.
+
+    :param path: Chemin du fichier CSV
+    """
+    return path + ".cache"
+
+def file_hash(path):
+    """
+    Hash du contenu d'un fichier, lu par blocs.
+
+    :param path: Chemin du fichier
+    :return: str, hash hexadécimal
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def parse_datetime(dates, times):
+    """
+    Construit l'index datetime (int64, nanosecondes) à partir des colonnes 'Date' et 'Timestamp'.
+    Au lieu de concaténer puis parser des millions de chaînes, on ne parse que les
+    valeurs distinctes (quelques milliers de jours, 1440 minutes) et on additionne.
+
+    :param dates: pandas.Series des dates
+    :param times: pandas.Series des heures
+    :return: numpy.ndarray int64 de timestamps en nanosecondes
+    """
+    date_codes, date_values = pd.factorize(dates)
+    time_codes, time_values = pd.factorize(times)
+    date_values = pd.Index(date_values).astype(str)
+    time_values = pd.Index(time_values).astype(str)
+
+    try:
+        days = pd.to_datetime(date_values).as_unit("ns").asi8
+        offsets = pd.to_timedelta(time_values).as_unit("ns").asi8
+    except ValueError:
+        # Heures que to_timedelta ne lit pas (09:30 sans secondes...) : même parsing que
+        # pd.to_datetime(Date + " " + Timestamp), sur les couples date/heure distincts seulement
+        codes, pairs = pd.factorize(date_codes.astype(np.int64) * len(time_values) + time_codes)
+        text = date_values[pairs // len(time_values)] + " " + time_values[pairs % len(time_values)]
+        return pd.to_datetime(text).as_unit("ns").asi8[codes]
+
+    return days[date_codes] + offsets[time_codes]
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(directory, meta):
+    tmp = os.path.join(directory, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(directory, "meta.json"))
+
+def is_fresh(path, directory):
+    """
+    Vérifie que le cache correspond toujours au fichier source : même taille et même mtime,
+    ou sinon même contenu (le hash est alors recalculé et la mtime mise à jour).
+
+    :param path: Chemin du fichier CSV
+    :param directory: Dossier de cache
+    """
+    meta = _read_meta(directory)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+
+    stat = os.stat(path)
+    if meta["size"] != stat.st_size:
+        return False
+    if meta["mtime_ns"] == stat.st_mtime_ns:
+        return True
+
+    # Fichier touché mais peut-être identique (copie, checkout...)
+    if meta["hash"] != file_hash(path):
+        return False
+    meta["mtime_ns"] = stat.st_mtime_ns
+    _write_meta(directory, meta)
+    return True
+
+def convert(path, directory=None):
+    """
+    Convertit un fichier de candles séparé par tabulations en un jeu de fichiers .npy
+    (une colonne par fichier, plus 'datetime' en int64).
+
+    :param path: Chemin du fichier CSV
+    :param directory: Dossier de cache, à côté du fichier par défaut
+    :return: Dossier de cache
+    """
+    directory = directory or cache_dir_for(path)
+    os.makedirs(directory, exist_ok=True)
+
+    stat = os.stat(path)
+    df = pd.read_csv(path, sep="\t")
+    datetime = parse_datetime(df["Date"], df["Timestamp"])
+    df = df.drop(columns=["Date", "Timestamp"])
+
+    np.save(os.path.join(directory, "datetime.npy"), datetime)
+    columns = []
+    for col in df.columns:
+        np.save(os.path.join(directory, f"{col}.npy"), df[col].to_numpy(dtype=np.float64))
+        columns.append(col)
+
+    # meta.json en dernier : un cache sans meta est considéré comme invalide
+    _write_meta(directory, {
+        "version": CACHE_VERSION,
+        "source": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": file_hash(path),
+        "rows": len(datetime),
+        "columns": columns,
+    })
+    return directory
+
+def append(path, directory):
+    """
+    Met à jour le cache quand des lignes ont seulement été ajoutées à la fin du fichier
+    (mise à jour quotidienne) : seules les nouvelles lignes sont parsées, puis ajoutées
+    au bout de chaque colonne. Le début du fichier est vérifié contre le hash du cache.
+
+    :param path: Chemin du fichier CSV
+    :param directory: Dossier de cache
+    :return: True si le cache a été mis à jour, False s'il faut le reconstruire (convert)
+    """
+    meta = _read_meta(directory)
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+    stat = os.stat(path)
+    size = meta["size"]
+    if stat.st_size <= size:
+        return False
+
+    # Un seul passage sur le fichier : hash de l'ancien contenu, puis du fichier complet
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(0)
+        remaining = size
+        while remaining:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                return False
+            h.update(block)
+            remaining -= len(block)
+            last = block[-1:]
+        if h.hexdigest() != meta["hash"] or last != b"\n":
+            return False
+        added = f.read()
+    h.update(added)
+
+    df = pd.read_csv(io.BytesIO(header + added), sep="\t")
+    if [col for col in df.columns if col not in ("Date", "Timestamp")] != meta["columns"]:
+        return False
+    new = {"datetime": parse_datetime(df["Date"], df["Timestamp"])}
+    new.update({col: df[col].to_numpy(dtype=np.float64) for col in meta["columns"]})
+
+    # Toutes les colonnes écrites avant d'en remplacer une ; chaque colonne est coupée à meta["rows"],
+    # une reprise après un échec entre deux remplacements n'ajoute donc pas deux fois les lignes
+    rows = meta["rows"]
+    for col, values in new.items():
+        np.save(os.path.join(directory, f"{col}.tmp.npy"),
+                np.concatenate([np.load(os.path.join(directory, f"{col}.npy"), mmap_mode="r")[:rows], values]))
+    for col in new:
+        os.replace(os.path.join(directory, f"{col}.tmp.npy"), os.path.join(directory, f"{col}.npy"))
+
+    meta.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, hash=h.hexdigest(), rows=rows + len(df))
+    _write_meta(directory, meta)
+    return True
+
+def load_columns(path, directory=None, mmap=False):
+    """
+    Renvoie les colonnes du fichier de candles sous forme de tableaux NumPy,
+    en (re)construisant le cache binaire si besoin (ou en y ajoutant seulement
+    les lignes ajoutées à la fin du fichier, voir append).
+
+    :param path: Chemin du fichier CSV
+    :param directory: Dossier de cache, à côté du fichier par défaut
+    :param mmap: Ouvre les fichiers en memory-map au lieu de les charger en RAM
+    :return: dict colonne -> numpy.ndarray, avec la clé 'datetime' (int64 ns)
+    """
+    directory = directory or cache_dir_for(path)
+    if not is_fresh(path, directory) and not append(path, directory):
+        convert(path, directory)
+
+    mmap_mode = "r" if mmap else None
+    meta = _read_meta(directory)
+    return {col: np.load(os.path.join(directory, f"{col}.npy"), mmap_mode=mmap_mode)
+            for col in ["datetime", *meta["columns"]]}
+
+def load_candles(path, directory=None):
+    """
+    Charge un fichier de candles en dataframe indexé par datetime, comme le faisait main(),
+    mais depuis le cache binaire dès le deuxième lancement.
+
+    :param path: Chemin du fichier CSV (colonnes Date, Timestamp, Open, High, Low, Close, ...)
+    :param directory: Dossier de cache, à côté du fichier par défaut
+    :return: pandas.DataFrame indexé par 'datetime'
+    """
+    columns = load_columns(path, directory)
+    index = pd.DatetimeIndex(columns.pop("datetime").view("datetime64[ns]"), name="datetime")
+    return pd.DataFrame(columns, index=index)
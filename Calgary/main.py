@@ -1,47 +1,30 @@
 import pandas as pd
-import matplotlib.pyplot as plt 
 from Backtester import Backtester
-from maths import bollinger_bands, rsi
+from loader import load_candles
+from metrics import compute_metrics
+from registry import Registry
+from report import render
 import numpy as np
 
 DATA_FILE = "./data/output8.csv"
+CHECKPOINT = DATA_FILE + ".checkpoint" # État du backtest à la fin du dernier lancement
+REPORT = "./data/report.html" # Graphiques du backtest, écrits sans affichage (.png, .svg, .html...)
+REGISTRY = "./data/registry.sqlite" # Tous les runs : paramètres, données, version du code, métriques, journal
 
 def main():
-    df = pd.read_csv(DATA_FILE, sep="\t")
+    # Candles indexées par datetime, relues depuis le cache binaire après le premier lancement
+    df = load_candles(DATA_FILE)
 
-    # Combiner 'Date' + 'Timestamp' en un seul datetime
-    df["datetime"] = pd.to_datetime(df["Date"].astype(str) + " " + df["Timestamp"])
+    # Indicateurs techniques (RSI, Bollinger, SMA) calculés par le Backtester selon la stratégie
+    # Chaque run est enregistré dans le registre ; un run déjà fait sur les mêmes données y est relu
+    bt = Backtester(df, registry=Registry(REGISTRY))
 
-    # Mettre l’index
-    df = df.set_index("datetime")
+    # Reprise depuis le checkpoint : seules les candles ajoutées au fichier depuis le dernier lancement sont traitées
+    results = bt.run(mode="events", checkpoint=CHECKPOINT)
 
-    # Optionnel retirer les anciennes colonnes
-    df = df.drop(columns=["Date", "Timestamp"])
-
-    # Ajout de la colonne RSI pour chaque candle
-    df["RSI"] = rsi(df["Close"])
-
-    # Ajout de la colonne contenant le RSI précédent
-    df['prev_RSI'] = df['RSI'].shift(1)
-
-    df["MoyMob"], df["BB_upper"], df['BB_lower'] = bollinger_bands(df["Close"], 21)
-
-    df['prev_MoyMob'] = df["MoyMob"].shift(5)
-    
-    # Ajout de colonnes en décalé pour que pour chaque candle on garde certaines infos de la candle précédente
-    df['prev_close'] = df['Close'].shift(1)
-    df['prev_BB_lower'] = df['BB_lower'].shift(1)
-    df['prev_BB_upper'] = df['BB_upper'].shift(1)
-
-    # Moyennes mobiles
-    df['SMA50'] = df['Close'].rolling(window=50).mean()
-    df['SMA200'] = df['Close'].rolling(window=200).mean()
-
-    df = df.dropna()
-
-    bt = Backtester(df)
-
-    results = bt.run()
+    # Capital à chaque candle : balance + marge + PnL latent de la position ouverte à la clôture
+    equity = results["equity"]
+    metrics = compute_metrics(results["journal"], equity.to_numpy(), equity.index, results["open_since"])
 
     # ================================
     #     AFFICHAGE DES RESULTATS
@@ -51,7 +34,15 @@ def main():
     print(f"Balance finale        : {results['final_balance']:.2f} €")
     print(f"PNL total             : {results['total_pnl']:.2f} €")
     print(f"Nombre de trades      : {results['number_of_trades']}")
-    print(f"Moyenne du nombre de trades : {results['number_of_trades']/3266} trades/jour")
+    print(f"Moyenne du nombre de trades : {metrics['trades_per_day']} trades/jour")
+    print(f"Drawdown max          : {metrics['max_drawdown']:.2%} ({metrics['max_drawdown_duration']})")
+    print(f"Sharpe / Sortino      : {metrics['sharpe']:.2f} / {metrics['sortino']:.2f}")
+    print(f"Profit factor         : {metrics['profit_factor']:.2f}")
+    print(f"Taux de réussite      : {metrics['win_rate']:.2%}")
+    print(f"Gain moyen / perte moyenne : {metrics['average_win']:.2f} € / {metrics['average_loss']:.2f} €")
+    print(f"Temps en position     : {metrics['exposure']:.2%}")
+    print("-----------------------------------")
+    print(metrics["exit_reasons"].to_string())
     print("-----------------------------------")
     # print("Liste des trades (PNL unitaire) :")
     # for i, pnl in enumerate(results["all_trades"], start=1):
@@ -61,43 +52,10 @@ def main():
     #      GRAPHIQUE DE BALANCE
     # ================================
 
-    plt.figure(figsize=(12, 5))
-    plt.plot(bt.balance_history, label="Balance", linewidth=1.5)
-    plt.title("Évolution de la balance pendant le backtest")
-    plt.xlabel("Nombre de candles")
-    plt.ylabel("Balance (€)")
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
-
-    # balance = np.array(bt.balance_history, dtype=float)
-    # price = df["Close"].values.astype(float)
-    # min_len = min(len(balance), len(price))
-    # balance = balance[-min_len:]
-    # price = price[-min_len:]
-    # assert balance[0] > 0, "Balance initiale invalide"
-    # assert price[0] > 0, "Prix initial invalide"
-
-    # balance_norm = balance / balance[0] * 100
-    # price_norm = price / price[0] * 100
-
-    # plt.figure(figsize=(12, 5))
-
-    # plt.plot(balance_norm, label="Stratégie (base 100)", linewidth=1.5)
-    # plt.plot(price_norm, label="Or (base 100)", linewidth=1, alpha=0.7)
-
-    # plt.title("Performance relative : stratégie vs or")
-    # plt.xlabel("Nombre de candles")
-    # plt.ylabel("Base 100")
-    # plt.grid(True)
-    # plt.legend()
-    # plt.tight_layout()
-    # plt.show()
-
-
-
-
+    # Balance, performance relative stratégie vs or (base 100) et trades sur le prix,
+    # sous-échantillonnés et écrits dans un fichier : pas de fenêtre, fonctionne sur un serveur
+    render(REPORT, equity.index, equity.to_numpy(), results["journal"], df["Close"].to_numpy()[::bt.equity_stride])
+    print(f"Rapport               : {REPORT}")
 
 
 if __name__ == "__main__":
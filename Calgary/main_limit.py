@@ -1,196 +1,40 @@
-import pandas as pd
-import matplotlib.pyplot as plt 
+from Backtester import Backtester
+from loader import load_candles
+from metrics import compute_metrics
+from orders import FillModel
+from registry import Registry
+from report import render
+from strategies import LimitEntry
 
 DATA_FILE = "./data/XAUUSD.csv"
+CHECKPOINT = DATA_FILE + ".limit.checkpoint" # État du backtest à la fin du dernier lancement
+REPORT = "./data/report_limit.html" # Graphiques du backtest, écrits sans affichage
+REGISTRY = "./data/registry.sqlite" # Tous les runs : paramètres, données, version du code, métriques, journal
 
 BALANCE = 50 # Balance totale du compte
 LEVERAGE = 20 # Levier
 MARGIN_TRADE = 25 # Argent engagé dans les trades (50% de la balance)
-
-def rsi(close_series, window = 13):
-    """
-    Fonction de calcul du RSI.
-
-    :@param close_series: pandas.Series, colone des prix de cloture
-    :@param window: Int, Fenetre temporelle du calcul
-    :@return: pandas.Series, Relative Strength Index
-    """
-    # calcule la différence d'un jour à l'autre
-    delta = close_series.diff()
-
-    # On isole les jours positifs et les jours négatifs
-    gain = (delta.where(delta > 0, 0)).rolling(window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window).mean()
-
-    # ratio
-    rs = gain / loss
-
-    rsi = 100 - (100 / (1 + rs))
-
-    return rsi
-
-
-def bollinger_bands(close_series, period=30, num_std=2):
-    """
-    Calcule les bandes de Bollinger.
-    
-    close_series : DataFrame contenant une colonne 'Close'
-    period : période de la moyenne mobile (ex : 20)
-    num_std : nombre d'écarts-types (ex : 2)
-    """
-    
-    # Moyenne mobile
-    ma = close_series.rolling(window=period).mean()
-    
-    # Écart-type
-    std = close_series.rolling(window=period).std()
-    
-    # Bandes
-    upper = ma + num_std * std
-    lower = ma - num_std * std
-    
-    return ma, upper, lower
-
-class Backtester: 
-    def __init__(self, df, balance=BALANCE, leverage=LEVERAGE, margin_per_trade=MARGIN_TRADE): 
-        self.dataframe = df 
-        self.balance = balance 
-        self.balance_history = []
-        self.leverage = leverage 
-        self.margin_per_trade = margin_per_trade # Calcul de la valeur notionnelle totale contrôlée 
-        self.position_size = margin_per_trade * leverage 
-
-        self.position = None # si je suis actuellement dans un trade 
-        self.entry_price = None # si oui, à combien suis-je entrée 
-        self.stoploss = None # le stop loss est fixe et calculé à la prise de position 
-        self.units = None # quantité d'or contrôlée 
-        self.trades = [] # log des trades cloturés
-        self.limit = None
-
-    def on_candle(self, candle):
-        open_ = candle["Open"]
-        close = candle["Close"]
-        prev_close = candle["prev_close"]
-        high = candle["High"]
-        low = candle["Low"]
-        rsi = candle["RSI"]
-        prev_rsi = candle["prev_RSI"]
-        moymob = candle["MoyMob"]
-        bbupper = candle["BB_upper"]
-        bblower = candle["BB_lower"]
-        prev_bblower = candle["prev_BB_lower"]
-
-        # Conditions d'achat
-        rsi_buy_ok = (prev_rsi < 30) and (rsi > 30)
-        price_buy_ok = (prev_close < prev_bblower) and (close > bblower)
-        shouldibuy = rsi_buy_ok and price_buy_ok
-
-        # Conditions de vente
-        # tp_price = (bbupper + moymob)/2 # TP au milieu entre la moyenne mobile et BB Upper
-        tp_price = bbupper + 0.05
-
-        rsi_sell_ok = (prev_rsi > 70) and (rsi < 70)
-        price_sell_ok = close >= tp_price
-        take_profit = rsi_sell_ok or price_sell_ok
-
-        # === OUVERTURE DE POSITION ===
-        if self.position is None:
-            if self.limit != None:
-                if low < self.limit:
-                    self.position = "long"
-                    self.entry_price = self.limit
-                    self.limit = None
-
-                    self.stoploss = self.entry_price * (1 - 0.002) # Stop 0.2% sous le prix de cloture (prix d'entrée)
-                    # self.stoploss = bblower * (1 - 0.0005)  # Stop 0.05% sous BB_lower
-                    self.units = self.position_size / self.entry_price
-
-                    # On immobilise 25€
-                    self.balance -= self.margin_per_trade
-                else:
-                    if close >= moymob:
-                        self.limit = None
-            else:
-                if shouldibuy == True:
-                    self.limit = bblower
-            
-
-        # === STOP LOSS ===
-        elif self.position == "long" and low <= self.stoploss:
-            pnl = (self.stoploss - self.entry_price) * self.units
-
-            self.balance += self.margin_per_trade  # marge restituée
-            self.balance += pnl                    # PnL du trade
-            self.trades.append(pnl)
-
-            print(f"{candle.name} --- stop loss --- prix d'entrée : {self.entry_price} --- {self.balance} ---")
-
-            # Reset
-            self.position = None
-            self.entry_price = None
-            self.units = None
-            
-
-        # === TAKE PROFIT ===
-        elif self.position == "long" and take_profit == True:
-            pnl = (close - self.entry_price) * self.units
-
-            self.balance += self.margin_per_trade  # marge restituée
-            self.balance += pnl                    # PnL du trade
-            self.trades.append(pnl)
-
-            print(f"{candle.name} --- take profit --- prix d'entrée : {self.entry_price} --- {self.balance} ---")
-
-            # Reset
-            self.position = None
-            self.entry_price = None
-            self.units = None
-        
-        # Log de la balance actuelle pour le graphique
-        self.balance_history.append(self.balance)
-
-
-    def run(self):
-        for _, candle in self.dataframe.iterrows():
-            self.on_candle(candle)
-
-        return {
-            "final_balance": self.balance,
-            "total_pnl": sum(self.trades),
-            "number_of_trades": len(self.trades),
-            "all_trades": self.trades
-        }
-
+STOP_PCT = 0.002 # Stop 0.2% sous le prix d'entrée
+TP_OFFSET = 0.05 # Take profit 5 centimes au dessus de BB_upper
 
 def main():
-    df = pd.read_csv(DATA_FILE, sep="\t")
-
-    # Combiner 'Date' + 'Timestamp' en un seul datetime
-    df["datetime"] = pd.to_datetime(df["Date"].astype(str) + " " + df["Timestamp"])
-
-    # Mettre l’index
-    df = df.set_index("datetime")
-
-    # Optionnel retirer les anciennes colonnes
-    df = df.drop(columns=["Date", "Timestamp"])
-
-    # Ajout de la colonne RSI pour chaque candle
-    df["RSI"] = rsi(df["Close"])
+    # Candles indexées par datetime, relues depuis le cache binaire après le premier lancement
+    df = load_candles(DATA_FILE)
 
-    # Ajout de la colonne contenant le RSI précédent
-    df['prev_RSI'] = df['RSI'].shift(1)
+    # Les indicateurs (RSI 13, Bollinger 30) sont calculés par le Backtester selon les colonnes de la stratégie
+    bt = Backtester(df, balance=BALANCE, leverage=LEVERAGE, spread=0, margin_per_trade=MARGIN_TRADE,
+                    strategy=LimitEntry(stop_pct=STOP_PCT, tp_offset=TP_OFFSET),
+                    # Exécution intrabar réaliste : stop actif dès l'entrée, gaps, take profit au repos, stop d'abord si ambigu
+                    fill_model=FillModel(ambiguity="stop_first"),
+                    # Chaque run est enregistré dans le registre ; un run déjà fait sur les mêmes données y est relu
+                    registry=Registry(REGISTRY))
 
-    df["MoyMob"], df["BB_upper"], df['BB_lower'] = bollinger_bands(df["Close"])
+    # Reprise depuis le checkpoint : seules les candles ajoutées au fichier depuis le dernier lancement sont traitées
+    results = bt.run(mode="events", checkpoint=CHECKPOINT)
 
-    # Ajout de colonnes en décalé pour que pour chaque candle on garde certaines infos de la candle précédente
-    df['prev_close'] = df['Close'].shift(1)
-    df['prev_BB_lower'] = df['BB_lower'].shift(1)
-
-    df = df.dropna()
-
-    bt = Backtester(df)
-
-    results = bt.run()
+    # Capital à chaque candle : balance + marge + PnL latent de la position ouverte à la clôture
+    equity = results["equity"]
+    metrics = compute_metrics(results["journal"], equity.to_numpy(), equity.index, results["open_since"])
 
     # ================================
     #     AFFICHAGE DES RESULTATS
@@ -200,7 +44,15 @@ def main():
     print(f"Balance finale        : {results['final_balance']:.2f} €")
     print(f"PNL total             : {results['total_pnl']:.2f} €")
     print(f"Nombre de trades      : {results['number_of_trades']}")
-    print(f"Moyenne du nombre de trades : {results['number_of_trades']/3266} trades/jour")
+    print(f"Moyenne du nombre de trades : {metrics['trades_per_day']} trades/jour")
+    print(f"Drawdown max          : {metrics['max_drawdown']:.2%} ({metrics['max_drawdown_duration']})")
+    print(f"Sharpe / Sortino      : {metrics['sharpe']:.2f} / {metrics['sortino']:.2f}")
+    print(f"Profit factor         : {metrics['profit_factor']:.2f}")
+    print(f"Taux de réussite      : {metrics['win_rate']:.2%}")
+    print(f"Gain moyen / perte moyenne : {metrics['average_win']:.2f} € / {metrics['average_loss']:.2f} €")
+    print(f"Temps en position     : {metrics['exposure']:.2%}")
+    print("-----------------------------------")
+    print(metrics["exit_reasons"].to_string())
     print("-----------------------------------")
     # print("Liste des trades (PNL unitaire) :")
     # for i, pnl in enumerate(results["all_trades"], start=1):
@@ -210,15 +62,9 @@ def main():
     #      GRAPHIQUE DE BALANCE
     # ================================
 
-    plt.figure(figsize=(12, 5))
-    plt.plot(bt.balance_history, label="Balance", linewidth=1.5)
-    plt.title("Évolution de la balance pendant le backtest")
-    plt.xlabel("Nombre de candles")
-    plt.ylabel("Balance (€)")
-    plt.grid(True)
-    plt.legend()
-    plt.tight_layout()
-    plt.show()
+    # Capital à chaque candle, PnL latent compris : les drawdowns en position sont visibles
+    render(REPORT, equity.index, equity.to_numpy(), results["journal"], df["Close"].to_numpy()[::bt.equity_stride])
+    print(f"Rapport               : {REPORT}")
 
 
 if __name__ == "__main__":
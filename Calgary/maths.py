@@ -39,4 +39,66 @@ def bollinger_bands(close_series, period=25, num_std=2):
     upper = ma + num_std * std
     lower = ma - num_std * std
     
-    return ma, upper, lower
\ No newline at end of file
+    return ma, upper, lower
+
+def sma(close_series, window):
+    """
+    Moyenne mobile simple.
+
+    :@param close_series: pandas.Series, colone des prix de cloture
+    :@param window: Int, Fenetre temporelle du calcul
+    :@return: pandas.Series, moyenne mobile
+    """
+    return close_series.rolling(window=window).mean()
+
+def warmup_length(rsi_window=13, bb_period=21):
+    """
+    Nombre de candles nécessaires avant que toutes les colonnes de add_indicators soient définies
+    (SMA200, prev_MoyMob décalée de 5, prev_RSI).
+
+    :param rsi_window: Fenêtre du RSI
+    :param bb_period: Période des bandes de Bollinger
+    """
+    return max(200, bb_period + 5, rsi_window + 2)
+
+def add_indicators(df, rsi_window=13, bb_period=21, bb_num_std=2, cache=None, dropna=True):
+    """
+    Ajoute au dataframe les colonnes utilisées par le Backtester
+    (RSI, bandes de Bollinger, SMA50/200 et les colonnes décalées prev_*),
+    puis retire les lignes de chauffe incomplètes.
+
+    :param df: Dataframe indexé par datetime avec les colonnes Open/High/Low/Close
+    :param rsi_window: Fenêtre du RSI
+    :param bb_period: Période des bandes de Bollinger
+    :param bb_num_std: Nombre d'écarts-types des bandes de Bollinger
+    :param cache: cache.IndicatorCache optionnel, pour ne pas recalculer les mêmes colonnes
+    :param dropna: Retire les lignes incomplètes (False pour garder l'alignement avec df)
+    :return: Nouveau dataframe prêt pour le backtest
+    """
+    df = df.copy()
+
+    if cache is not None:
+        _rsi, _bollinger_bands, _sma = cache.rsi, cache.bollinger_bands, cache.sma
+    else:
+        _rsi, _bollinger_bands, _sma = rsi, bollinger_bands, sma
+
+    # Ajout de la colonne RSI pour chaque candle
+    df["RSI"] = _rsi(df["Close"], rsi_window)
+
+    # Ajout de la colonne contenant le RSI précédent
+    df['prev_RSI'] = df['RSI'].shift(1)
+
+    df["MoyMob"], df["BB_upper"], df['BB_lower'] = _bollinger_bands(df["Close"], bb_period, bb_num_std)
+
+    df['prev_MoyMob'] = df["MoyMob"].shift(5)
+
+    # Ajout de colonnes en décalé pour que pour chaque candle on garde certaines infos de la candle précédente
+    df['prev_close'] = df['Close'].shift(1)
+    df['prev_BB_lower'] = df['BB_lower'].shift(1)
+    df['prev_BB_upper'] = df['BB_upper'].shift(1)
+
+    # Moyennes mobiles
+    df['SMA50'] = _sma(df['Close'], 50)
+    df['SMA200'] = _sma(df['Close'], 200)
+
+    return df.dropna() if dropna else df
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+DAY_NS = 86_400 * 10**9
+YEAR_NS = 365.25 * DAY_NS
+
+def _as_ns(index):
+    """
+    Index datetime (DatetimeIndex, datetime64 ou int64 ns) en tableau int64 de nanosecondes.
+    """
+    if isinstance(index, pd.DatetimeIndex):
+        return index.as_unit("ns").asi8
+    index = np.asarray(index)
+    if np.issubdtype(index.dtype, np.datetime64):
+        return index.astype("datetime64[ns]").view(np.int64)
+    return index.astype(np.int64)
+
+def periods_per_year(index):
+    """
+    Nombre de barres par an, pour annualiser Sharpe et Sortino : nombre de barres divisé par la
+    durée couverte en années. Les nuits, week-ends et jours fériés sans cotation sont donc comptés
+    (l'écart médian entre deux barres donnerait 525 960 barres minutes par an, pas ~370 000).
+
+    :param index: Index datetime des barres (DatetimeIndex, datetime64 ou int64 ns)
+    :return: float, NaN si l'index couvre moins de deux dates distinctes
+    """
+    index = _as_ns(index)
+    span = index[-1] - index[0] if len(index) > 1 else 0
+    return (len(index) - 1) * YEAR_NS / span if span > 0 else np.nan
+
+def max_drawdown(equity, index=None):
+    """
+    Drawdown maximal et sa durée, sur le dernier axe (une courbe, ou une matrice de courbes
+    issue d'un sweep, une ligne par combinaison).
+
+    :param equity: numpy.ndarray de courbes de capital, shape (..., n)
+    :param index: Index datetime des barres (optionnel) pour mesurer la durée en nanosecondes
+    :return: (drawdown max en fraction négative, durée max sous le dernier plus haut, en barres ou en ns)
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity, axis=-1)
+    drawdown = (equity / peak - 1).min(axis=-1)
+
+    # Durée : nombre de barres depuis le dernier plus haut, remis à zéro à chaque nouveau plus haut
+    n = equity.shape[-1]
+    positions = np.broadcast_to(np.arange(n), equity.shape)
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, positions, 0), axis=-1)
+    if index is None:
+        duration = (positions - last_peak).max(axis=-1)
+    else:
+        index_ns = _as_ns(index)
+        duration = (index_ns[positions] - index_ns[last_peak]).max(axis=-1)
+
+    return drawdown, duration
+
+def sharpe_sortino(equity, periods=1.0):
+    """
+    Ratios de Sharpe et de Sortino des rendements barre à barre (taux sans risque nul), sur le dernier axe.
+
+    :param equity: numpy.ndarray de courbes de capital, shape (..., n)
+    :param periods: Nombre de barres par an pour annualiser, voir periods_per_year
+    :return: (sharpe, sortino)
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    returns = np.diff(equity, axis=-1) / equity[..., :-1]
+    mean = returns.mean(axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = mean / returns.std(axis=-1, ddof=1) * np.sqrt(periods)
+        downside = np.sqrt((np.minimum(returns, 0) ** 2).mean(axis=-1))
+        sortino = mean / downside * np.sqrt(periods)
+
+    return sharpe, sortino
+
+def trade_stats(pnl):
+    """
+    Statistiques des trades, sur le dernier axe.
+
+    :param pnl: numpy.ndarray des PnL des trades
+    :return: dict profit_factor, win_rate, average_win, average_loss
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    wins = pnl > 0
+    losses = pnl < 0
+    gross_win = np.where(wins, pnl, 0).sum(axis=-1)
+    gross_loss = -np.where(losses, pnl, 0).sum(axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "profit_factor": gross_win / gross_loss,
+            "win_rate": wins.sum(axis=-1) / pnl.shape[-1],
+            "average_win": gross_win / wins.sum(axis=-1),
+            "average_loss": -gross_loss / losses.sum(axis=-1),
+        }
+
+def exit_breakdown(trades, labels):
+    """
+    Répartition des trades par raison de sortie (stop loss, take profit...).
+
+    :param trades: dict colonne -> numpy.ndarray du journal (TradeJournal.arrays)
+    :param labels: Noms des raisons de sortie (TradeJournal.labels)
+    :return: pandas.DataFrame indexé par raison : count, pnl, win_rate
+    """
+    codes = trades["label"].astype(np.intp)
+    pnl = trades["pnl"]
+    size = len(labels)
+    count = np.bincount(codes, minlength=size)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        table = pd.DataFrame({
+            "count": count,
+            "pnl": np.bincount(codes, weights=pnl, minlength=size),
+            "win_rate": np.bincount(codes, weights=pnl > 0, minlength=size) / count,
+        }, index=pd.Index(labels, name="label"))
+
+    return table[table["count"] > 0]
+
+def realized_equity(journal, index, initial_balance):
+    """
+    Courbe de capital réalisé barre à barre, reconstruite depuis le journal : à chaque barre,
+    la balance après le dernier trade clôturé (la marge et le PnL latent des positions
+    ouvertes ne sont pas comptés).
+
+    :param journal: TradeJournal du backtest
+    :param index: Index datetime des barres
+    :param initial_balance: Balance de départ
+    :return: numpy.ndarray float64, une valeur par barre
+    """
+    trades = journal.arrays()
+    closed = np.searchsorted(trades["exit_time"], _as_ns(index), side="right")
+    return np.r_[initial_balance, trades["balance"]][closed]
+
+def compute_metrics(journal, equity, index, open_since=None):
+    """
+    Métriques de performance d'un backtest, calculées en NumPy sans boucle sur les barres ni les trades.
+
+    :param journal: TradeJournal du backtest
+    :param equity: Courbe de capital barre à barre
+    :param index: Index datetime aligné sur equity
+    :param open_since: Date d'entrée de la position encore ouverte à la dernière barre (results["open_since"]),
+        comptée dans l'exposition jusqu'à cette barre
+    :return: dict nom de métrique -> valeur, et "exit_reasons" (dataframe, voir exit_breakdown)
+    """
+    trades = journal.arrays()
+    index_ns = _as_ns(index)
+    equity = np.asarray(equity, dtype=np.float64)
+
+    drawdown, duration = max_drawdown(equity, index_ns)
+    sharpe, sortino = sharpe_sortino(equity, periods_per_year(index_ns))
+
+    span = index_ns[-1] - index_ns[0]
+    in_market = (trades["exit_time"] - trades["entry_time"]).sum()
+    if open_since is not None:
+        in_market += index_ns[-1] - pd.Timestamp(open_since).value
+    days = np.unique(index_ns // DAY_NS).size
+
+    metrics = {
+        "number_of_trades": len(trades["pnl"]),
+        "total_pnl": float(trades["pnl"].sum()),
+        "max_drawdown": float(drawdown),
+        "max_drawdown_duration": pd.Timedelta(int(duration), unit="ns"),
+        "sharpe": float(sharpe),
+        "sortino": float(sortino),
+        "exposure": float(in_market / span) if span else np.nan,
+        "trading_days": days,
+        "trades_per_day": len(trades["pnl"]) / days,
+    }
+    metrics.update({name: float(value) for name, value in trade_stats(trades["pnl"]).items()})
+    metrics["exit_reasons"] = exit_breakdown(trades, journal.labels)
+    return metrics
@@ -0,0 +1,175 @@
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from Backtester import BALANCE, LEVERAGE, MARGIN_RATIO
+
+SIMULATIONS = 10_000 # Nombre de séquences de trades simulées
+CHUNK = 256 # Séquences simulées ensemble dans un worker (une matrice CHUNK x nombre de trades)
+RUIN = 0.5 # Perte, en part de la balance de départ, considérée comme une ruine
+METHODS = ("bootstrap", "block", "shuffle")
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Rendements des trades, attachés une fois par worker
+_returns = None
+
+def trade_returns(journal, margin_ratio=MARGIN_RATIO, leverage=LEVERAGE):
+    """
+    Rendement de chaque trade du journal sur la balance, avec le dimensionnement composé de
+    Backtester.open_position : marge = balance * margin_ratio, unités = marge * levier / prix d'entrée.
+    Un trade multiplie donc la balance par 1 + margin_ratio * levier * variation du prix.
+
+    Les prix du journal incluent déjà le spread. Le rendement ne dépend pas de la balance : on peut
+    rejouer les trades dans un autre ordre, ou avec un autre margin_ratio ou levier que le backtest.
+
+    :param journal: TradeJournal du backtest
+    :param margin_ratio: Part de la balance immobilisée en marge à chaque trade
+    :param leverage: Levier
+    :return: numpy.ndarray float64, un rendement par trade
+    """
+    trades = journal.arrays()
+    move = trades["direction"] * (trades["exit_price"] - trades["entry_price"]) / trades["entry_price"]
+    return margin_ratio * leverage * move
+
+def resample(rng, n, size, method="bootstrap", block=None):
+    """
+    Indices de trades de size séquences de n trades.
+
+    :param rng: numpy.random.Generator
+    :param n: Nombre de trades de l'historique
+    :param size: Nombre de séquences
+    :param method: "bootstrap" (tirage avec remise), "block" (blocs circulaires de trades consécutifs,
+        qui gardent la corrélation entre trades voisins) ou "shuffle" (permutation des mêmes trades)
+    :param block: Longueur des blocs de la méthode "block"
+    :return: numpy.ndarray int64 de shape (size, n)
+    """
+    if method == "bootstrap":
+        return rng.integers(0, n, size=(size, n))
+    if method == "shuffle":
+        return rng.permuted(np.broadcast_to(np.arange(n), (size, n)), axis=1)
+
+    count = -(-n // block)
+    starts = rng.integers(0, n, size=(size, count, 1))
+    return ((starts + np.arange(block)) % n).reshape(size, count * block)[:, :n]
+
+def paths(returns, index, balance=BALANCE, ruin=RUIN):
+    """
+    Rejoue des séquences de trades avec une balance composée et mesure chaque courbe.
+
+    :param returns: Rendements des trades, voir trade_returns
+    :param index: Indices des trades de chaque séquence, shape (séquences, trades)
+    :param balance: Balance de départ
+    :param ruin: Perte, en part de la balance de départ, considérée comme une ruine
+    :return: (balance finale, drawdown max en fraction négative, ruine), un élément par séquence
+    """
+    # Un trade qui perd plus que la balance la met à zéro, et elle y reste
+    equity = np.maximum(1 + returns[index], 0)
+    np.cumprod(equity, axis=1, out=equity)
+
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, 1, out=peak) # la balance de départ est le premier plus haut
+    ruined = equity.min(axis=1) <= 1 - ruin
+    drawdown = np.divide(equity, peak, out=peak).min(axis=1) - 1
+    return balance * equity[:, -1], drawdown, ruined
+
+def _init_worker(returns):
+    global _returns
+    _returns = returns
+
+def _simulate(task):
+    """
+    Un lot de séquences, dans un worker.
+
+    :param task: (graine du lot, nombre de séquences, méthode, longueur de bloc, balance, ruine)
+    """
+    seed, size, method, block, balance, ruin = task
+    rng = np.random.default_rng(seed)
+    return paths(_returns, resample(rng, len(_returns), size, method, block), balance, ruin)
+
+def monte_carlo(returns, simulations=SIMULATIONS, method="bootstrap", block=None, balance=BALANCE, ruin=RUIN, seed=None,
+                processes=None, chunk=CHUNK):
+    """
+    Distribution des résultats d'une stratégie sur des séquences de trades rééchantillonnées.
+
+    Chaque lot de chunk séquences est simulé d'un coup en NumPy : une matrice d'indices de trades,
+    puis le produit cumulé des rendements. Les lots sont répartis entre processus. Chaque lot a sa
+    propre graine, dérivée de seed : le résultat ne dépend pas du nombre de processus.
+
+    Avec "shuffle", les séquences contiennent les mêmes trades : la balance finale est toujours celle
+    du backtest (produit des rendements) et seuls le chemin et le drawdown changent.
+
+    :param returns: Rendements des trades, voir trade_returns
+    :param simulations: Nombre de séquences
+    :param method: "bootstrap", "block" ou "shuffle", voir resample
+    :param block: Longueur des blocs de la méthode "block", racine cubique du nombre de trades par défaut
+    :param balance: Balance de départ
+    :param ruin: Perte, en part de la balance de départ, considérée comme une ruine
+    :param seed: Graine du générateur aléatoire, pour des résultats reproductibles
+    :param processes: Nombre de processus, tous les coeurs par défaut ; 1 pour tout simuler dans ce processus
+    :param chunk: Nombre de séquences par lot
+    :return: dict "final_balance" et "max_drawdown" (numpy.ndarray, une valeur par séquence),
+        "ruined" (booléens), "risk_of_ruin" (part des séquences ruinées) et "observed"
+        (balance finale et drawdown max de la séquence du backtest)
+    """
+    if method not in METHODS:
+        raise ValueError(f"monte_carlo : method must be one of {METHODS}")
+    returns = np.ascontiguousarray(returns, dtype=np.float64)
+    n = len(returns)
+    if n == 0:
+        raise ValueError("monte_carlo : no trade to resample")
+    if method == "block":
+        block = block or max(1, round(n ** (1 / 3)))
+        if not 1 <= block <= n:
+            raise ValueError(f"monte_carlo : block must be between 1 and {n}")
+
+    sizes = [min(chunk, simulations - start) for start in range(0, simulations, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, size, method, block, balance, ruin) for s, size in zip(seeds, sizes)]
+
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(tasks) == 1:
+        _init_worker(returns)
+        parts = [_simulate(task) for task in tasks]
+    else:
+        with Pool(min(processes, len(tasks)), initializer=_init_worker, initargs=(returns,)) as pool:
+            parts = pool.map(_simulate, tasks)
+
+    final, drawdown, ruined = (np.concatenate(part) for part in zip(*parts))
+    observed_final, observed_drawdown, _ = paths(returns, np.arange(n)[None], balance, ruin)
+    return {
+        "final_balance": final,
+        "max_drawdown": drawdown,
+        "ruined": ruined,
+        "risk_of_ruin": float(ruined.mean()),
+        "observed": {"final_balance": float(observed_final[0]), "max_drawdown": float(observed_drawdown[0])},
+    }
+
+def summary(result, quantiles=QUANTILES):
+    """
+    Quantiles des distributions d'un monte_carlo.
+
+    :param result: Résultat de monte_carlo
+    :param quantiles: Quantiles à calculer
+    :return: pandas.DataFrame indexé par quantile : final_balance, max_drawdown
+    """
+    return pd.DataFrame({
+        "final_balance": np.quantile(result["final_balance"], quantiles),
+        "max_drawdown": np.quantile(result["max_drawdown"], quantiles),
+    }, index=pd.Index(quantiles, name="quantile"))
+
+if __name__ == "__main__":
+    from Backtester import Backtester
+    from loader import load_candles
+    from main import CHECKPOINT, DATA_FILE
+
+    bt = Backtester(load_candles(DATA_FILE))
+    results = bt.run(mode="events", checkpoint=CHECKPOINT)
+    returns = trade_returns(results["journal"], bt.margin_ratio, bt.leverage)
+
+    for method in METHODS:
+        result = monte_carlo(returns, method=method, balance=bt.initial_balance, seed=0)
+        print(f"===== {method} : {SIMULATIONS} séquences de {len(returns)} trades =====")
+        print(summary(result).to_string())
+        print(f"Risque de ruine (perte de {RUIN:.0%}) : {result['risk_of_ruin']:.2%}")
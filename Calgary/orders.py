@@ -0,0 +1,177 @@
+import numpy as np
+
+from signals import first_true
+
+# Règles de résolution quand le stop et l'objectif sont touchés dans la même barre
+AMBIGUITY_RULES = ("stop_first", "target_first", "open_distance")
+
+class FillModel:
+    def __init__(self, ambiguity="stop_first", gaps=True, same_bar_stop=True, intrabar_target=True, lower=None):
+        """
+        Règles d'exécution des ordres en attente (limite d'entrée, stop, objectif) à l'intérieur
+        d'une barre OHLC.
+
+        :param ambiguity: Règle quand stop et objectif sont touchés dans la même barre :
+            "stop_first" (pessimiste), "target_first" (optimiste) ou "open_distance"
+            (le niveau le plus proche de l'open est touché en premier)
+        :param gaps: Une barre qui ouvre au delà d'un niveau est exécutée à l'open et non au niveau
+        :param same_bar_stop: Le stop est actif dès la barre d'exécution de la limite d'entrée
+        :param intrabar_target: L'objectif est un ordre limite au repos (niveau de la barre précédente),
+            exécuté dès que le high/low le touche ; sinon il n'est évalué qu'à la clôture
+        :param lower: Barres d'une unité de temps inférieure pour trancher les barres ambiguës,
+            dict "datetime" (int64 ns), "High", "Low" ; l'index des barres doit être donné à Executor
+        """
+        if ambiguity not in AMBIGUITY_RULES:
+            raise ValueError(f"FillModel : ambiguity must be one of {AMBIGUITY_RULES}")
+        self.ambiguity = ambiguity
+        self.gaps = gaps
+        self.same_bar_stop = same_bar_stop
+        self.intrabar_target = intrabar_target
+        self.lower = lower
+
+# Exécution de main_limit.py avant ce module : limite exécutée au prix limite, stop inactif sur la barre
+# d'entrée et exécuté au prix du stop, take profit évalué seulement à la clôture
+LEGACY = FillModel(gaps=False, same_bar_stop=False, intrabar_target=False)
+
+class Executor:
+    def __init__(self, arrays, model=None, index=None):
+        """
+        Exécution vectorisée des ordres en attente : chaque recherche d'événement
+        (exécution, annulation, stop, objectif) est un masque NumPy sur une fenêtre de barres,
+        il n'y a pas de boucle Python par barre.
+
+        :param arrays: dict colonne -> numpy.ndarray avec Open/High/Low/Close
+        :param model: FillModel, FillModel() par défaut
+        :param index: Index des barres en int64 ns, requis avec model.lower
+        """
+        self.model = model or FillModel()
+        self.open = arrays["Open"]
+        self.high = arrays["High"]
+        self.low = arrays["Low"]
+        self.close = arrays["Close"]
+        self.n = len(self.close)
+
+        if self.model.lower is not None:
+            if index is None:
+                raise ValueError("Executor : index is required with a lower timeframe")
+            # Tranche de barres fines de chaque barre : [bounds[i], bounds[i + 1])
+            self.bounds = np.searchsorted(self.model.lower["datetime"], np.r_[index, np.iinfo(np.int64).max])
+
+    def entry_limit(self, price, direction, start, cancel=None):
+        """
+        Cherche l'exécution d'une limite d'entrée placée à la clôture de la barre start - 1.
+
+        :param price: Prix limite
+        :param direction: "long" (achat sous le marché) ou "short" (vente au dessus)
+        :param start: Première barre où l'ordre est actif
+        :param cancel: Masque booléen des barres dont la clôture annule l'ordre s'il n'est pas exécuté
+        :return: (barre, prix d'exécution) ou (barre, None) si annulé, (None, None) si rien avant la fin
+        """
+        if direction == "long":
+            touched = lambda a, b: self.low[a:b] < price
+        else:
+            touched = lambda a, b: self.high[a:b] > price
+
+        if cancel is None:
+            mask = touched
+        else:
+            mask = lambda a, b: touched(a, b) | cancel[a:b]
+
+        j = first_true(mask, start, self.n)
+        if j is None:
+            return None, None
+        if not touched(j, j + 1)[0]:
+            return j, None
+        return j, self._through(price, direction == "long", j)
+
+    def exit(self, direction, stop, start, target=None, close_exit=None, entry_bar=None):
+        """
+        Cherche la sortie d'une position : stop, objectif intrabar ou sortie à la clôture.
+
+        :param direction: "long" ou "short"
+        :param stop: Niveau du stop
+        :param start: Première barre à examiner
+        :param target: numpy.ndarray des niveaux d'objectif par barre (le niveau de la barre k
+            est celui calculé à la clôture de k), None sans objectif intrabar
+        :param close_exit: Masque des barres dont la clôture déclenche la sortie
+        :param entry_bar: Barre d'exécution de l'entrée ; le stop y est testé si model.same_bar_stop
+        :return: (barre, prix, "stop loss" | "take profit") ou (None, None, None)
+        """
+        long = direction == "long"
+
+        # Barre d'entrée : le prix a déjà traversé la limite, donc un stop touché l'est après l'entrée
+        if entry_bar is not None and self.model.same_bar_stop and self._touched(stop, not long, entry_bar, entry_bar + 1)[0]:
+            return entry_bar, self._through(stop, long, entry_bar, gap=False), "stop loss"
+
+        use_target = target is not None and self.model.intrabar_target
+
+        def mask(a, b):
+            hits = self._touched(stop, not long, a, b)
+            if use_target:
+                hits = hits | self._touched(target[a - 1:b - 1], long, a, b)
+            if close_exit is not None:
+                hits = hits | close_exit[a:b]
+            return hits
+
+        j = first_true(mask, max(start, 1) if use_target else start, self.n)
+        if j is None:
+            return None, None, None
+
+        stop_hit = self._touched(stop, not long, j, j + 1)[0]
+        target_level = target[j - 1] if use_target else None
+        target_hit = use_target and self._touched(target_level, long, j, j + 1)[0]
+
+        if stop_hit and target_hit:
+            stop_hit = self.resolve(j, stop, target_level, long) == "stop"
+        if stop_hit:
+            return j, self._through(stop, long, j), "stop loss"
+        if target_hit:
+            return j, self._through(target_level, not long, j), "take profit"
+        return j, float(self.close[j]), "take profit"
+
+    def resolve(self, j, stop, target, long):
+        """
+        Tranche une barre où stop et objectif sont touchés : d'abord avec les barres fines
+        si elles sont disponibles, sinon avec la règle model.ambiguity.
+
+        :return: "stop" ou "target"
+        """
+        lower = self.model.lower
+        if lower is not None:
+            a, b = self.bounds[j], self.bounds[j + 1]
+            if b > a:
+                low, high = lower["Low"][a:b], lower["High"][a:b]
+                stop_hits = low <= stop if long else high >= stop
+                target_hits = high >= target if long else low <= target
+                first_stop = np.argmax(stop_hits) if stop_hits.any() else b - a
+                first_target = np.argmax(target_hits) if target_hits.any() else b - a
+                if first_stop != first_target:
+                    return "stop" if first_stop < first_target else "target"
+
+        if self.model.ambiguity == "stop_first":
+            return "stop"
+        if self.model.ambiguity == "target_first":
+            return "target"
+        open_ = self.open[j]
+        return "stop" if abs(open_ - stop) <= abs(target - open_) else "target"
+
+    def _touched(self, level, upward, a, b):
+        """
+        Masque des barres a..b-1 qui touchent level par le haut (upward) ou par le bas.
+        """
+        if upward:
+            return self.high[a:b] >= level
+        return self.low[a:b] <= level
+
+    def _through(self, level, falling, j, gap=None):
+        """
+        Prix d'exécution d'un ordre au niveau level sur la barre j : le niveau lui-même,
+        ou l'open si la barre a ouvert au delà (gap) et que model.gaps est actif.
+
+        :param falling: True si l'ordre est touché par un prix qui baisse (achat limite, stop de long)
+        """
+        gap = self.model.gaps if gap is None else gap
+        if not gap:
+            return float(level)
+        open_ = float(self.open[j])
+        return min(open_, float(level)) if falling else max(open_, float(level))
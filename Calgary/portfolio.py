@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+from Backtester import BALANCE, LEVERAGE, MARGIN_RATIO, SPREAD, Backtester
+from journal import TradeJournal
+from strategies import MeanReversion
+from variants import per_variant
+
+END = np.iinfo(np.int64).max # Pas d'événement à venir
+
+def per_instrument(value, symbols):
+    """
+    Paramètre scalaire, une valeur par instrument (liste dans l'ordre de symbols)
+    ou dict symbole -> valeur, en tableau float64 indexé par instrument.
+    """
+    if isinstance(value, dict):
+        missing = [symbol for symbol in symbols if symbol not in value]
+        if missing:
+            raise ValueError(f"per_instrument : no value for {missing}")
+        value = [value[symbol] for symbol in symbols]
+    return per_variant(value, len(symbols))
+
+def run_portfolio(frames, strategy=None, balance=BALANCE, leverage=LEVERAGE, spread=SPREAD, margin_ratio=MARGIN_RATIO, cache=None):
+    """
+    Backtest d'une stratégie sur plusieurs instruments (or, argent, indices...) avec un seul compte :
+    la balance et la marge sont partagées, chaque entrée immobilise margin_ratio de la balance libre
+    à cet instant, comme Backtester.open_position.
+
+    Les indicateurs et les masques de signaux sont calculés une fois par instrument, sur ses propres
+    candles. L'état des positions (sens, prix d'entrée, stop, unités, marge, prochain événement) est
+    rangé dans des tableaux NumPy indexés par instrument, et la passe avance d'événement en événement
+    sur l'axe de temps commun : le coût croît avec le nombre de trades, pas avec le nombre d'instruments
+    multiplié par le nombre de candles. À une même date, les sorties sont traitées avant les entrées
+    (la marge restituée est disponible), les instruments dans l'ordre de frames.
+
+    Avec un seul instrument, les trades sont exactement ceux de Backtester.run("events").
+
+    :param frames: dict symbole -> dataframe de candles (brutes ou préparées), indexé par datetime
+    :param strategy: MeanReversion commune, ou dict symbole -> MeanReversion ; MeanReversion() par défaut
+    :param balance: Balance de départ du compte
+    :param leverage: Levier, scalaire ou par instrument (liste ou dict)
+    :param spread: Spread en dollars, scalaire ou par instrument (liste ou dict)
+    :param margin_ratio: Part de la balance libre immobilisée en marge à chaque trade
+    :param cache: cache.IndicatorCache optionnel
+    :return: dict "final_balance", "total_pnl", "number_of_trades" et "instruments" (pandas.DataFrame
+        indexé par symbole : total_pnl, number_of_trades, journal ; la balance du journal est celle du compte)
+    """
+    symbols = list(frames)
+    m = len(symbols)
+    if m == 0:
+        raise ValueError("run_portfolio : no instrument given")
+    if strategy is None:
+        strategy = MeanReversion()
+    strategies = [strategy[symbol] for symbol in symbols] if isinstance(strategy, dict) else [strategy] * m
+    if any(type(s) is not MeanReversion for s in strategies):
+        raise ValueError("run_portfolio : only MeanReversion strategies are supported")
+
+    # Colonnes, dates et signaux de chaque instrument
+    arrays, index, times, signals, entries = [], [], [], [], []
+    for symbol, s in zip(symbols, strategies):
+        columns, idx = Backtester(frames[symbol], strategy=s, cache=cache).prepare()
+        masks = s.signals(None, columns)
+        arrays.append(columns)
+        index.append(idx)
+        times.append(pd.DatetimeIndex(idx).as_unit("ns").asi8)
+        signals.append(masks)
+        entries.append(np.flatnonzero(masks["long_entry"] | masks["short_entry"]))
+
+    def next_entry(k, start):
+        e = np.searchsorted(entries[k], start)
+        return int(entries[k][e]) if e < len(entries[k]) else len(times[k])
+
+    def schedule(k, bar):
+        next_bar[k] = bar
+        next_time[k] = times[k][bar] if bar < len(times[k]) else END
+
+    # État des instruments, une case par instrument ; la balance libre est celle du compte
+    half_spread = per_instrument(spread, symbols) / 2
+    leverage = per_instrument(leverage, symbols)
+    position = np.zeros(m, dtype=np.int8) # 0 à plat, 1 long, -1 short
+    entry_price = np.full(m, np.nan)
+    stoploss = np.full(m, np.nan)
+    units = np.full(m, np.nan)
+    margin_used = np.zeros(m)
+    entry_bar = np.zeros(m, dtype=np.int64)
+    exit_price = np.full(m, np.nan)
+    next_bar = np.zeros(m, dtype=np.int64) # prochain événement, en candle de l'instrument
+    next_time = np.full(m, END, dtype=np.int64) # et sa date, sur l'axe de temps commun
+    exit_label = [None] * m
+    pnl_total = np.zeros(m)
+    trade_count = np.zeros(m, dtype=np.int64)
+    journals = [TradeJournal() for _ in range(m)]
+    for k in range(m):
+        schedule(k, next_entry(k, 0))
+
+    while True:
+        t = int(next_time.min())
+        if t == END:
+            break
+        due = np.flatnonzero(next_time == t)
+
+        # === SORTIES, trouvées à l'ouverture ===
+        for k in due[position[due] != 0]:
+            i = int(next_bar[k])
+            short = position[k] < 0
+            price = float(exit_price[k])
+            pnl = float((entry_price[k] - price) * units[k] if short else (price - entry_price[k]) * units[k])
+            balance += margin_used[k] # marge restituée
+            balance += pnl # pnl du trade
+            pnl_total[k] += pnl
+            trade_count[k] += 1
+            journals[k].record(index[k][entry_bar[k]], index[k][i], "short" if short else "long", float(entry_price[k]),
+                               price, float(units[k]), pnl, exit_label[k], float(balance))
+
+            position[k] = 0
+            margin_used[k] = 0.0
+            schedule(k, next_entry(k, i + 1))
+
+        # === ENTRÉES, au marché à la clôture, sur la balance libre ===
+        for k in due[position[due] == 0]:
+            if next_time[k] != t:
+                continue # vient de sortir à cette date, sa prochaine entrée est plus loin
+            i = int(next_bar[k])
+            s, masks, columns = strategies[k], signals[k], arrays[k]
+            short = bool(masks["short_entry"][i])
+            direction = "short" if short else "long"
+            close = columns["Close"][i]
+            price = float(close - half_spread[k] if short else close + half_spread[k])
+            reference = float(columns["BB_upper"][i] if short else columns["BB_lower"][i])
+
+            margin = float(balance * margin_ratio)
+            position[k] = -1 if short else 1
+            entry_price[k] = price
+            entry_bar[k] = i
+            margin_used[k] = margin
+            units[k] = margin * leverage[k] / price
+            balance -= margin
+            stoploss[k] = s.stop_price(price, reference, direction, s.stop_pct, float(half_spread[k]))
+
+            j, exit_price[k], exit_label[k] = s.find_exit(columns, masks, direction, price, float(stoploss[k]), float(half_spread[k]), i + 1)
+            schedule(k, len(times[k]) if j is None else j)
+
+    # Positions encore ouvertes : la marge reste immobilisée, comme dans Backtester
+    return {
+        "final_balance": balance,
+        "total_pnl": float(pnl_total.sum()),
+        "number_of_trades": int(trade_count.sum()),
+        "instruments": pd.DataFrame({
+            "total_pnl": pnl_total,
+            "number_of_trades": trade_count,
+            "journal": journals,
+        }, index=pd.Index(symbols, name="symbol")),
+    }
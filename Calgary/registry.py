@@ -0,0 +1,320 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from journal import CAPACITY, TradeJournal
+from metrics import compute_metrics
+
+REGISTRY_FILE = "./data/registry.sqlite" # Registre des backtests par défaut
+OHLC = ("Open", "High", "Low", "Close")
+
+# État de fin de run restauré quand un résultat est servi depuis le registre
+STATE = ("position", "entry_price", "stoploss", "units", "margin_used", "position_size", "entry_time", "limit")
+TIMESTAMPS = ("entry_time",) # Attributs de STATE relus en pandas.Timestamp
+# Modules dont dépend le résultat d'un backtest, hashés dans code_version (pas les scripts de lancement)
+MODULES = ("Backtester", "cache", "columns", "journal", "maths", "metrics", "orders", "registry", "signals",
+           "strategies", "streaming", "timeframes")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    params TEXT NOT NULL,
+    params_hash TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    rows INTEGER,
+    start TEXT,
+    end TEXT,
+    final_balance REAL,
+    total_pnl REAL,
+    number_of_trades INTEGER,
+    metrics TEXT,
+    state TEXT,
+    journal TEXT,
+    equity TEXT,
+    UNIQUE (params_hash, data_hash, code_version)
+)
+"""
+
+COLUMNS = ("created", "mode", "params", "params_hash", "data_hash", "code_version", "rows", "start", "end",
+           "final_balance", "total_pnl", "number_of_trades", "metrics", "state", "journal", "equity")
+
+def array_hash(values):
+    """
+    Empreinte d'un tableau (type, forme et contenu) : les barres fines d'un FillModel entrent dans
+    la clé d'un run sans que leurs valeurs soient écrites dans le JSON des paramètres.
+
+    :param values: numpy.ndarray
+    :return: str, hash hexadécimal
+    """
+    values = np.ascontiguousarray(values)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{values.dtype.str}{values.shape}".encode())
+    h.update(values.view(np.uint8) if values.dtype != object else repr(values.tolist()).encode())
+    return h.hexdigest()
+
+def _jsonable(value):
+    """
+    Conversion JSON des valeurs que json ne connaît pas (scalaires NumPy, dates). Les tableaux,
+    séries et dataframes (bougies d'un FillModel) sont remplacés par leur empreinte.
+    """
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return str(value)
+    if isinstance(value, pd.DataFrame):
+        return data_hash(value)
+    if isinstance(value, pd.Series):
+        return array_hash(np.asarray(value.index)) + array_hash(value.to_numpy())
+    if isinstance(value, np.ndarray):
+        return array_hash(value)
+    raise TypeError(f"registry : cannot store a {type(value).__name__}")
+
+def canonical(params):
+    """
+    Paramètres en JSON canonique (clés triées, sans espaces) : deux combinaisons égales donnent la même chaîne.
+    """
+    return json.dumps(params, sort_keys=True, separators=(",", ":"), default=_jsonable)
+
+def _hash(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+def data_hash(df):
+    """
+    Empreinte d'un dataframe de candles : index et prix OHLC (les indicateurs en découlent).
+
+    :param df: Dataframe de candles indexé par datetime
+    :return: str, hash hexadécimal
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.ascontiguousarray(pd.DatetimeIndex(df.index).as_unit("ns").asi8).view(np.uint8))
+    for col in OHLC:
+        if col in df.columns:
+            h.update(col.encode())
+            h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).view(np.uint8))
+    return h.hexdigest()
+
+def code_version(directory=None):
+    """
+    Version du code du backtester : empreinte des sources des modules de MODULES. Un résultat n'est servi
+    que pour le code qui l'a produit ; modifier une règle de la stratégie invalide les anciens runs,
+    modifier un script de lancement (main.py, ...) non.
+
+    :param directory: Dossier des sources, celui de ce module par défaut
+    :return: str, hash hexadécimal
+    """
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.blake2b(digest_size=16)
+    for module in MODULES:
+        h.update(module.encode())
+        with open(os.path.join(directory, module + ".py"), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def _metrics(results):
+    """
+    Métriques d'un run (voir metrics.compute_metrics) en dict JSON, la répartition par sortie en dict.
+    """
+    equity = results["equity"]
+    metrics = compute_metrics(results["journal"], equity.to_numpy(), equity.index, results["open_since"])
+    metrics["exit_reasons"] = metrics["exit_reasons"].to_dict(orient="index")
+    return metrics
+
+class Registry:
+    def __init__(self, path=REGISTRY_FILE):
+        """
+        Registre SQLite des backtests : paramètres, empreinte des données, version du code, métriques
+        et référence du journal de chaque run. Un run déjà fait (mêmes paramètres, mêmes données, même
+        code) est servi depuis le registre au lieu d'être simulé à nouveau.
+
+        Les journaux et courbes de capital des runs sont écrits à côté de la base, dans <path>.runs/.
+
+        :param path: Fichier de la base SQLite
+        """
+        self.path = path
+        self.directory = path + ".runs"
+        self.code_version = code_version()
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL") # lectures pendant qu'un autre processus écrit
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def key(self, backtester, mode, data=None):
+        """
+        Clé d'un backtest dans le registre.
+
+        :param backtester: Backtester configuré (paramètres, stratégie, modèle d'exécution)
+        :param mode: Mode du run ("pandas", "numpy" ou "events") : un run n'est servi que pour le mode qui l'a produit
+        :param data: Empreinte des données si déjà calculée (sweep : une fois pour toutes les combinaisons)
+        :return: (paramètres en JSON canonique, hash des paramètres, hash des données)
+        """
+        params = canonical({**backtester.parameters(), "mode": mode})
+        return params, _hash(params), data if data is not None else data_hash(backtester.dataframe)
+
+    def lookup(self, keys):
+        """
+        Runs déjà enregistrés pour ces clés, avec la version courante du code, en une requête.
+
+        :param keys: Liste de clés, voir key
+        :return: dict hash des paramètres -> ligne (dict colonne -> valeur), pour les clés trouvées
+        """
+        found = {}
+        by_data = {}
+        for params, params_hash, data in keys:
+            by_data.setdefault(data, []).append(params_hash)
+        for data, hashes in by_data.items():
+            for lo in range(0, len(hashes), 500): # limite du nombre de paramètres d'une requête SQLite
+                chunk = hashes[lo:lo + 500]
+                cursor = self.connection.execute(
+                    f"SELECT * FROM runs WHERE data_hash = ? AND code_version = ? AND params_hash IN ({','.join('?' * len(chunk))})",
+                    [data, self.code_version, *chunk])
+                names = [column[0] for column in cursor.description]
+                for row in cursor:
+                    row = dict(zip(names, row))
+                    found[row["params_hash"]] = row
+        return found
+
+    def serve(self, backtester, key):
+        """
+        Restaure dans le backtester le résultat d'un run déjà enregistré avec son journal : balance,
+        trades, journal, courbe de capital et position encore ouverte à la fin.
+
+        :param backtester: Backtester à restaurer
+        :param key: Clé du run, voir key
+        :return: Les résultats (Backtester.results), ou None si le run n'est pas dans le registre
+        """
+        row = self.lookup([key]).get(key[1])
+        if row is None or row["journal"] is None or row["equity"] is None or not os.path.isdir(row["journal"]):
+            self.misses += 1
+            return None
+
+        # Copie en mémoire : les trades suivants ne doivent pas s'écrire dans le dossier du run enregistré
+        stored = TradeJournal.load(row["journal"])
+        arrays = stored.arrays()
+        journal = TradeJournal(capacity=max(len(stored), CAPACITY))
+        journal.labels = stored.labels
+        for name, values in arrays.items():
+            journal.columns[name][:len(values)] = values
+        journal.count = len(stored)
+        with np.load(row["equity"]) as equity:
+            backtester.equity = equity["values"]
+        backtester._times = backtester.dataframe.index
+        backtester.marked = len(backtester.dataframe)
+        backtester.journal = journal
+        backtester.trades = arrays["pnl"].tolist()
+        backtester.balance = row["final_balance"]
+        for name, value in json.loads(row["state"]).items():
+            setattr(backtester, name, pd.Timestamp(value) if name in TIMESTAMPS and value is not None else value)
+        self.hits += 1
+        return backtester.results()
+
+    def _insert(self, rows, replace):
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self.connection: # une seule transaction
+            self.connection.executemany(
+                f"{verb} INTO runs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [tuple(row[name] for name in COLUMNS) for row in rows])
+
+    def _row(self, key, mode, df, final_balance, total_pnl, number_of_trades, metrics=None, state=None, journal=None, equity=None):
+        params, params_hash, data = key
+        return {
+            "created": pd.Timestamp.now().isoformat(timespec="seconds"),
+            "mode": mode,
+            "params": params,
+            "params_hash": params_hash,
+            "data_hash": data,
+            "code_version": self.code_version,
+            "rows": len(df),
+            "start": str(df.index[0]) if len(df) else None,
+            "end": str(df.index[-1]) if len(df) else None,
+            "final_balance": float(final_balance),
+            "total_pnl": float(total_pnl),
+            "number_of_trades": int(number_of_trades),
+            "metrics": None if metrics is None else json.dumps(metrics, default=_jsonable),
+            "state": None if state is None else json.dumps(state, default=_jsonable),
+            "journal": journal,
+            "equity": equity,
+        }
+
+    def record(self, backtester, results, key, mode):
+        """
+        Enregistre un run du Backtester : paramètres, métriques, position restante, et une copie de son
+        journal (lots au format de TradeJournal.flush) et de sa courbe de capital dans le dossier du registre.
+        Le run reste servi tel quel même si le dossier du journal est réutilisé par un autre run.
+
+        :param backtester: Backtester qui vient de tourner
+        :param results: Ses résultats (Backtester.results)
+        :param key: Clé du run, voir key
+        :param mode: Mode du run, celui de la clé
+        """
+        run = os.path.join(self.directory, _hash(key[1] + key[2] + self.code_version))
+        os.makedirs(run, exist_ok=True)
+
+        for path in glob.glob(os.path.join(run, "trades-*.npz")):
+            os.remove(path) # run remplacé
+        journal = backtester.journal
+        if journal.directory is None:
+            # Même format qu'un lot de TradeJournal.flush, relu par TradeJournal.load
+            tmp = os.path.join(run, "trades.tmp.npz")
+            np.savez(tmp, labels=np.array(journal.labels), **journal.arrays())
+            os.replace(tmp, os.path.join(run, f"trades-{0:012d}.npz"))
+        else:
+            # Lots déjà écrits par le journal, copiés sans les relire
+            for path in journal.files:
+                shutil.copyfile(path, os.path.join(run, "trades.tmp.npz"))
+                os.replace(os.path.join(run, "trades.tmp.npz"), os.path.join(run, os.path.basename(path)))
+
+        equity = os.path.join(run, "equity.npz")
+        np.savez(os.path.join(run, "equity.tmp.npz"), values=backtester.equity)
+        os.replace(os.path.join(run, "equity.tmp.npz"), equity)
+
+        self._insert([self._row(key, mode, backtester.dataframe, results["final_balance"], results["total_pnl"],
+                                results["number_of_trades"], _metrics(results),
+                                {name: getattr(backtester, name) for name in STATE}, run, equity)], replace=True)
+
+    def record_many(self, df, keys, rows, mode="sweep"):
+        """
+        Enregistre les résultats d'un sweep en une seule transaction (sans journal : run_variants
+        ne garde que les résultats). Les runs déjà enregistrés, avec leur journal, sont gardés.
+
+        :param df: Dataframe de candles du sweep
+        :param keys: Clés des combinaisons, voir key
+        :param rows: Résultats, un dict final_balance / total_pnl / number_of_trades par combinaison
+        :param mode: Origine des runs
+        """
+        self._insert([self._row(key, mode, df, row["final_balance"], row["total_pnl"], row["number_of_trades"],
+                                {name: row[name] for name in ("final_balance", "total_pnl", "number_of_trades")})
+                      for key, row in zip(keys, rows)], replace=False)
+
+    def runs(self):
+        """
+        Tous les runs du registre, une ligne par run, paramètres et métriques dépliés en colonnes
+        (params.<nom>, metrics.<nom>).
+
+        :return: pandas.DataFrame trié par date d'enregistrement
+        """
+        table = pd.read_sql_query("SELECT * FROM runs ORDER BY id", self.connection)
+        params = pd.json_normalize([json.loads(p) for p in table["params"]], sep=".").add_prefix("params.")
+        metrics = pd.json_normalize([json.loads(m) if m else {} for m in table["metrics"]], sep=".", max_level=0)
+        metrics = metrics.drop(columns=["exit_reasons", *[c for c in metrics.columns if c in table.columns]], errors="ignore").add_prefix("metrics.")
+        return pd.concat([table.drop(columns=["params", "metrics", "state"]), params, metrics], axis=1)
@@ -0,0 +1,242 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+POINTS = 4000 # Points dessinés au plus par courbe, après sous-échantillonnage
+MARKERS = 2000 # Entrées (et sorties) de trades dessinées au plus
+METHODS = ("minmax", "lttb")
+FIGSIZE = (12, 5) # Taille d'un panneau, en pouces
+DPI = 100
+
+def minmax(y, points=POINTS):
+    """
+    Indices des points gardés par bucketing min/max : la série est coupée en (points - 2) / 2 buckets
+    de même taille, et chaque bucket garde son minimum et son maximum (plus le premier et le dernier
+    point de la série). Les pics et les creux restent visibles, en une passe NumPy sans boucle.
+
+    :param y: numpy.ndarray des valeurs (les NaN sont ignorés)
+    :param points: Nombre de points voulus, au plus (au moins 4)
+    :return: numpy.ndarray int64 d'indices croissants
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= points:
+        return np.arange(n)
+    buckets = max((points - 2) // 2, 1)
+    size = -(-n // buckets)
+    # Dernier bucket complété avec la dernière valeur : ses indices, hors série, sont ramenés à n - 1
+    padded = np.empty(buckets * size)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    padded = padded.reshape(buckets, size)
+    missing = np.isnan(padded)
+    low = np.argmin(np.where(missing, np.inf, padded), axis=1)
+    high = np.argmax(np.where(missing, -np.inf, padded), axis=1)
+    start = np.arange(buckets) * size
+    indices = np.concatenate(([0], start + low, start + high, [n - 1]))
+    return np.unique(np.minimum(indices, n - 1))
+
+def lttb(x, y, points=POINTS):
+    """
+    Indices des points gardés par Largest-Triangle-Three-Buckets : un point par bucket, celui qui forme
+    le plus grand triangle avec le point gardé dans le bucket précédent et la moyenne du bucket suivant.
+    Le minimum et le maximum de la série remplacent le point choisi dans leur bucket.
+    Plus fidèle à l'allure de la courbe que minmax pour un même nombre de points, mais avec une boucle
+    Python sur les buckets (chaque bucket est traité en NumPy).
+
+    :param x: numpy.ndarray des abscisses (datetime64 ou nombres)
+    :param y: numpy.ndarray des valeurs
+    :param points: Nombre de points voulus (au moins 3)
+    :return: numpy.ndarray int64 d'indices croissants
+    """
+    x = np.asarray(x)
+    x = (x.view(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x).astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= points or points < 3:
+        return np.arange(n)
+
+    # Premier et dernier point gardés, les autres répartis en points - 2 buckets
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    # Centre de gravité de chaque bucket (le bucket suivant du dernier est le dernier point)
+    sum_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sum_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.r_[sum_x / counts, x[-1]]
+    mean_y = np.r_[sum_y / counts, y[-1]]
+
+    indices = np.empty(points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for k in range(points - 2):
+        lo, hi = edges[k], edges[k + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[previous] - mean_x[k + 1]) * (by - y[previous]) - (x[previous] - bx) * (mean_y[k + 1] - y[previous]))
+        previous = lo + int(np.nanargmax(area)) if not np.isnan(area).all() else lo
+        indices[k + 1] = previous
+
+    # Extrêmes globaux : un bucket qui contient les deux prend aussi la place de son voisin
+    if not np.isnan(y).all():
+        extremes = sorted({int(np.nanargmin(y)), int(np.nanargmax(y))} - {0, n - 1})
+        slots = [int(np.searchsorted(edges, e, side="right")) for e in extremes] # bucket k -> indices[k + 1]
+        if len(slots) == 2 and slots[0] == slots[1]:
+            if slots[1] < points - 2:
+                slots[1] += 1
+            elif slots[0] > 1:
+                slots[0] -= 1
+        for slot, e in zip(slots, extremes):
+            indices[slot] = e
+    return indices
+
+def downsample(x, y, points=POINTS, method="minmax"):
+    """
+    Sous-échantillonne une courbe pour l'affichage, en gardant sa forme.
+
+    :param x: Abscisses (index datetime ou tableau)
+    :param y: Valeurs
+    :param points: Nombre de points voulus
+    :param method: "minmax" (rapide, garde les extrêmes) ou "lttb"
+    :return: (x, y) sous-échantillonnés
+    """
+    x, y = np.asarray(x), np.asarray(y, dtype=np.float64)
+    if method == "minmax":
+        indices = minmax(y, points)
+    elif method == "lttb":
+        indices = lttb(x, y, points)
+    else:
+        raise ValueError(f"Méthode de sous-échantillonnage inconnue : {method}, attendu une de {METHODS}")
+    return x[indices], y[indices]
+
+def thin(times, markers=MARKERS, start=None, end=None):
+    """
+    Indices d'au plus markers événements (entrées ou sorties de trades), le premier de chaque
+    intervalle de temps : sur des dizaines de milliers de trades, les marqueurs restent lisibles.
+
+    :param times: numpy.ndarray int64 des dates en nanosecondes, croissantes
+    :param markers: Nombre maximum de marqueurs
+    :param start: Début de la période affichée (ns), la première date par défaut
+    :param end: Fin de la période affichée (ns), la dernière date par défaut
+    :return: numpy.ndarray int64 d'indices
+    """
+    n = len(times)
+    if n <= markers:
+        return np.arange(n)
+    start = times[0] if start is None else start
+    end = times[-1] if end is None else end
+    buckets = ((times - start) / max(end - start, 1) * (markers - 1)).astype(np.int64)
+    return np.unique(buckets, return_index=True)[1]
+
+def _times(values):
+    return np.asarray(values, dtype=np.int64).view("datetime64[ns]")
+
+def _trades(ax, trades, markers):
+    """
+    Entrées (triangles, vers le haut pour un long, vers le bas pour un short) et sorties
+    (croix vertes si gagnantes, rouges sinon) aux prix d'exécution du journal.
+    """
+    keep = thin(trades["entry_time"], markers)
+    entry_time, entry_price = _times(trades["entry_time"][keep]), trades["entry_price"][keep]
+    exit_time, exit_price = _times(trades["exit_time"][keep]), trades["exit_price"][keep]
+    long = trades["direction"][keep] > 0
+    win = trades["pnl"][keep] > 0
+    ax.scatter(entry_time[long], entry_price[long], marker="^", s=18, color="tab:green", label="Entrée long", zorder=3)
+    ax.scatter(entry_time[~long], entry_price[~long], marker="v", s=18, color="tab:red", label="Entrée short", zorder=3)
+    ax.scatter(exit_time[win], exit_price[win], marker="x", s=14, color="tab:green", label="Sortie gagnante", zorder=3)
+    ax.scatter(exit_time[~win], exit_price[~win], marker="x", s=14, color="tab:red", label="Sortie perdante", zorder=3)
+
+def figure(index, equity, journal=None, prices=None, price_label="Or", points=POINTS, method="minmax", markers=MARKERS):
+    """
+    Figure du rapport de backtest, sans affichage (matplotlib.figure.Figure, aucun backend interactif) :
+        - la courbe de capital
+        - si prices est donné : stratégie et prix en base 100 sur la même échelle
+        - si prices et journal sont donnés : le prix avec les entrées et sorties des trades
+          (sans prices, les sorties sont marquées sur la courbe de capital)
+    Chaque courbe est sous-échantillonnée à points points, chaque série de marqueurs à markers marqueurs.
+
+    :param index: Index datetime des barres
+    :param equity: Courbe de capital barre à barre, alignée sur index
+    :param journal: TradeJournal du backtest (optionnel)
+    :param prices: Prix de clôture alignés sur index (optionnel)
+    :param price_label: Nom de l'actif dans les légendes
+    :param points: Points dessinés au plus par courbe
+    :param method: Sous-échantillonnage, "minmax" ou "lttb"
+    :param markers: Marqueurs de trades dessinés au plus
+    :return: matplotlib.figure.Figure
+    """
+    times = np.asarray(pd.DatetimeIndex(index).as_unit("ns").asi8).view("datetime64[ns]")
+    equity = np.asarray(equity, dtype=np.float64)
+    prices = None if prices is None else np.asarray(prices, dtype=np.float64)
+    trades = journal.arrays() if journal is not None and len(journal) else None
+
+    panels = 1 + (prices is not None) + (prices is not None and trades is not None)
+    fig = Figure(figsize=(FIGSIZE[0], FIGSIZE[1] * panels), dpi=DPI)
+    axes = fig.subplots(panels, 1, sharex=True, squeeze=False)[:, 0]
+
+    ax = axes[0]
+    ax.plot(*downsample(times, equity, points, method), label="Balance", linewidth=1.2)
+    if trades is not None and prices is None:
+        keep = thin(trades["exit_time"], markers)
+        ax.scatter(_times(trades["exit_time"][keep]), trades["balance"][keep], marker=".", s=8, color="black", label="Trades", zorder=3)
+    ax.set_title("Évolution de la balance pendant le backtest")
+    ax.set_ylabel("Balance (€)")
+
+    if prices is not None:
+        ax = axes[1]
+        ax.plot(*downsample(times, equity / equity[0] * 100, points, method), label="Stratégie (base 100)", linewidth=1.2)
+        ax.plot(*downsample(times, prices / prices[0] * 100, points, method), label=f"{price_label} (base 100)", linewidth=1, alpha=0.7)
+        ax.set_title(f"Performance relative : stratégie vs {price_label.lower()}")
+        ax.set_ylabel("Base 100")
+
+        if trades is not None:
+            ax = axes[2]
+            ax.plot(*downsample(times, prices, points, method), label=price_label, color="grey", linewidth=0.8)
+            _trades(ax, trades, markers)
+            ax.set_title("Entrées et sorties des trades")
+            ax.set_ylabel("Prix")
+
+    for ax in axes:
+        ax.grid(True)
+        ax.legend(loc="upper left")
+    fig.tight_layout()
+    return fig
+
+def save(fig, path):
+    """
+    Écrit une figure dans un fichier, selon son extension : image (.png, .svg, .pdf...) ou page
+    .html autonome (figure en SVG intégré).
+
+    :param fig: matplotlib.figure.Figure
+    :param path: Chemin du fichier
+    :return: path
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.splitext(path)[1].lower() in (".html", ".htm"):
+        svg = io.StringIO()
+        fig.savefig(svg, format="svg")
+        title = fig.axes[0].get_title() if fig.axes else ""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{title}</title></head>\n<body>\n")
+            f.write(svg.getvalue()[svg.getvalue().index("<svg"):])
+            f.write("</body></html>\n")
+    else:
+        fig.savefig(path)
+    return path
+
+def render(path, index, equity, journal=None, prices=None, **options):
+    """
+    Construit la figure du rapport (voir figure) et l'écrit dans path, sans affichage.
+
+    :param path: Fichier de sortie (.png, .svg, .pdf, .html...)
+    :param index: Index datetime des barres
+    :param equity: Courbe de capital barre à barre
+    :param journal: TradeJournal du backtest (optionnel)
+    :param prices: Prix de clôture alignés sur index (optionnel)
+    :param options: Paramètres de figure (price_label, points, method, markers)
+    :return: path
+    """
+    return save(figure(index, equity, journal, prices, **options), path)
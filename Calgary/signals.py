@@ -0,0 +1,76 @@
+import numpy as np
+
+RSI_LOW = 30 # Seuil de survente
+RSI_HIGH = 70 # Seuil de surachat
+TP_OFFSET = 0.05 # Take profit "band" : en dollars au delà de la bande opposée
+TREND = ("SMA50", "SMA200") # Moyennes rapide et lente du filtre de tendance
+
+def compute_signals(arrays, rsi_low=RSI_LOW, rsi_high=RSI_HIGH, take_profit="moymob", tp_offset=TP_OFFSET, trend=TREND):
+    """
+    Calcule en une fois, sur toutes les colonnes, les conditions d'entrée et de sortie
+    évaluées par Backtester.on_candle. Les NaN donnent False, comme en Python scalaire.
+
+    :param arrays: dict colonne -> numpy.ndarray, voir Backtester.to_arrays
+    :param rsi_low: Seuil bas du RSI
+    :param rsi_high: Seuil haut du RSI
+    :param take_profit: "moymob" (la clôture revient sur la moyenne mobile) ou "band"
+        (la clôture dépasse BB_upper + tp_offset pour un long, BB_lower - tp_offset pour un short)
+    :param tp_offset: Décalage du take profit "band", en dollars
+    :param trend: Colonnes (moyenne rapide, moyenne lente) du filtre de tendance, éventuellement
+        d'une unité de temps supérieure ("SMA50_H4", "SMA200_H4")
+    :return: dict de masques booléens "long_entry", "short_entry", "long_exit", "short_exit"
+        (les sorties sont les take profit à la clôture)
+    """
+    close = arrays["Close"]
+    rsi = arrays["RSI"]
+    prev_rsi = arrays["prev_RSI"]
+    moymob = arrays["MoyMob"]
+
+    # Notion de trend
+    trend_haussier = arrays[trend[0]] >= arrays[trend[1]]
+
+    # Croisements du RSI
+    rsi_cross_up = (prev_rsi < rsi_low) & (rsi > rsi_low) # passe au dessus de 30
+    rsi_cross_down = (prev_rsi > rsi_high) & (rsi < rsi_high) # repasse sous 70
+
+    # Croisements des bandes de Bollinger
+    price_long_ok = (arrays["prev_close"] < arrays["prev_BB_lower"]) & (close > arrays["BB_lower"])
+    price_short_ok = (arrays["prev_close"] > arrays["prev_BB_upper"]) & (close < arrays["BB_upper"])
+
+    # Niveaux de take profit
+    if take_profit == "moymob":
+        tp_long = tp_short = moymob
+    elif take_profit == "band":
+        tp_long = arrays["BB_upper"] + tp_offset
+        tp_short = arrays["BB_lower"] - tp_offset
+    else:
+        raise ValueError("compute_signals : take_profit must be 'moymob' or 'band'")
+
+    return {
+        "long_entry": rsi_cross_up & price_long_ok & trend_haussier,
+        "short_entry": rsi_cross_down & price_short_ok & ~trend_haussier,
+        "long_exit": rsi_cross_down | (close >= tp_long),
+        "short_exit": rsi_cross_up | (close <= tp_short),
+    }
+
+def first_true(mask, start, stop, window=64):
+    """
+    Renvoie le premier indice >= start où mask est vrai, ou None.
+    Parcourt le tableau par fenêtres de taille croissante pour ne pas
+    matérialiser tout le reste du tableau quand l'événement est proche.
+
+    :param mask: Fonction (a, b) -> masque booléen des barres a..b-1
+    :param start: Premier indice à tester
+    :param stop: Borne de fin exclue
+    :param window: Taille de la première fenêtre
+    """
+    a = start
+    while a < stop:
+        b = min(a + window, stop)
+        hits = mask(a, b)
+        j = int(np.argmax(hits))
+        if hits[j]:
+            return a + j
+        a = b
+        window *= 2
+    return None
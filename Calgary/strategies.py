@@ -0,0 +1,399 @@
+import numpy as np
+
+from orders import Executor
+from signals import RSI_HIGH, RSI_LOW, TP_OFFSET, TREND, compute_signals, first_true
+from timeframes import TIMEFRAMES
+
+STOPS = ("band", "entry") # Référence du stop de MeanReversion
+TAKE_PROFITS = ("moymob", "band") # Niveau de take profit de MeanReversion
+
+class Strategy:
+    """
+    Interface d'une stratégie pour Backtester.
+
+    Une stratégie déclare les colonnes d'indicateurs qu'elle lit (columns, calculées à la demande
+    par le Backtester avec ses paramètres rsi_window/bb_period/bb_num_std) et fournit :
+    - on_candle(bt, candle) : la logique candle par candle (modes "pandas" et live) ;
+    - signals(bt, arrays) : ses masques d'entrée et de sortie sur toutes les candles,
+      au minimum "long_entry" et "short_entry" ;
+    - enter / exit : l'exécution d'une entrée et la recherche de la sortie pour le mode "events" ;
+    - stop_level : le stop fixé à l'entrée ;
+    - close_price : le prix d'une sortie au marché à la clôture (fin de fenêtre du walk-forward...).
+    Une stratégie à ordres en attente (pending_orders) les exécute en mode "events" selon bt.fill_model ;
+    son on_candle n'applique que les règles d'exécution orders.LEGACY.
+    """
+    columns = ("Open", "High", "Low", "Close")
+    pending_orders = False
+    rsi_window = 13
+    bb_period = 21
+    bb_num_std = 2
+    stop_pct = 0.009
+
+    def on_candle(self, bt, candle):
+        raise NotImplementedError
+
+    def signals(self, bt, arrays):
+        raise NotImplementedError
+
+    def enter(self, bt, executor, arrays, signals, i, direction):
+        """
+        Exécute l'entrée signalée à la clôture de la candle i.
+
+        :return: (candle d'exécution, prix, niveau de référence du stop), (candle, None, None) si
+            l'ordre est annulé, (None, None, None) s'il reste en attente à la fin des données
+        """
+        raise NotImplementedError
+
+    def exit(self, bt, executor, arrays, signals, start, entry_bar=None):
+        """
+        Cherche la sortie de la position ouverte de bt à partir de la candle start.
+
+        :return: (candle, prix d'exécution, raison) ou (None, None, None)
+        """
+        raise NotImplementedError
+
+    def stop_level(self, bt, entry_price, reference, direction):
+        raise NotImplementedError
+
+    def close_price(self, bt, close, direction):
+        """
+        Prix de sortie d'une position clôturée au marché à la clôture close, comme ses sorties sur signal.
+        """
+        raise NotImplementedError
+
+class MeanReversion(Strategy):
+    """
+    Retour à la moyenne sur croisement du RSI et des bandes de Bollinger, entrée au marché à la clôture,
+    filtrée par la tendance SMA50/SMA200 ; stop sous/au dessus de la bande d'entrée, sortie sur la moyenne mobile.
+    Les variantes de stop, de take profit et le trailing stop sont des paramètres (voir variants.run_variants).
+    La tendance peut être lue sur une unité de temps supérieure (trend_timeframe), ses colonnes
+    sont alors "SMA50_H1"/"SMA200_H1"... au lieu de SMA50/SMA200.
+    """
+    columns = (
+        "Open", "High", "Low", "Close", "prev_close",
+        "RSI", "prev_RSI",
+        "MoyMob", "prev_MoyMob", "BB_upper", "prev_BB_upper", "BB_lower", "prev_BB_lower",
+        "SMA50", "SMA200",
+    )
+    trend = TREND # Colonnes (rapide, lente) du filtre de tendance
+
+    def __init__(self, rsi_window=13, bb_period=21, bb_num_std=2, stop_pct=0.009, rsi_low=RSI_LOW, rsi_high=RSI_HIGH,
+                 stop="band", take_profit="moymob", tp_offset=TP_OFFSET, trailing=False, trend_timeframe=None):
+        """
+        :param rsi_window: Fenêtre du RSI
+        :param bb_period: Période des bandes de Bollinger
+        :param bb_num_std: Nombre d'écarts-types des bandes de Bollinger
+        :param stop_pct: Distance relative du stop, depuis la bande d'entrée ou le prix d'entrée selon stop
+        :param rsi_low: Seuil de survente
+        :param rsi_high: Seuil de surachat
+        :param stop: "band" (stop au delà de BB_lower/BB_upper) ou "entry" (stop au delà du prix d'entrée)
+        :param take_profit: "moymob" ou "band", voir signals.compute_signals
+        :param tp_offset: Décalage du take profit "band", en dollars
+        :param trailing: Sortie "trailing stop" quand la moyenne mobile repasse du mauvais côté
+            du prix d'entrée en allant contre la position
+        :param trend_timeframe: Unité de temps des SMA50/SMA200 du filtre de tendance ("H1", "H4"...,
+            voir timeframes.TIMEFRAMES), celle des candles par défaut
+        """
+        if stop not in STOPS:
+            raise ValueError(f"MeanReversion : stop must be one of {STOPS}")
+        if take_profit not in TAKE_PROFITS:
+            raise ValueError(f"MeanReversion : take_profit must be one of {TAKE_PROFITS}")
+        if trend_timeframe is not None and trend_timeframe not in TIMEFRAMES:
+            raise ValueError(f"MeanReversion : trend_timeframe must be one of {tuple(TIMEFRAMES)}")
+        self.rsi_window = rsi_window
+        self.bb_period = bb_period
+        self.bb_num_std = bb_num_std
+        self.stop_pct = stop_pct
+        self.rsi_low = rsi_low
+        self.rsi_high = rsi_high
+        self.stop = stop
+        self.take_profit = take_profit
+        self.tp_offset = tp_offset
+        self.trailing = trailing
+        self.trend_timeframe = trend_timeframe
+        if trend_timeframe is not None:
+            self.trend = tuple(f"{col}_{trend_timeframe}" for col in TREND)
+            self.columns = tuple(col for col in MeanReversion.columns if col not in TREND) + self.trend
+
+    def on_candle(self, bt, candle):
+        open_ = candle["Open"]
+        close = candle["Close"]
+        prev_close = candle["prev_close"]
+        high = candle["High"]
+        low = candle["Low"]
+        rsi = candle["RSI"]
+        prev_rsi = candle["prev_RSI"]
+        moymob = candle["MoyMob"] # Moyenne mobile, exact milieu entre BB lower et BB upper
+        prev_moymob = candle['prev_MoyMob']
+        bbupper = candle["BB_upper"]
+        prev_bbupper = candle["prev_BB_upper"]
+        bblower = candle["BB_lower"]
+        prev_bblower = candle["prev_BB_lower"]
+
+        # Notion de trend
+        sma50 = candle[self.trend[0]]
+        sma200 = candle[self.trend[1]]
+
+        trend_haussier = sma50 >= sma200
+
+        # Notion de pente de la moyenne mobile, pour les conditions de sortie
+        slope = moymob - prev_moymob 
+
+        #### Conditions de long
+        # Si le RSI passe de inférieur à 30 à supérieur à 30
+        rsi_long_ok = (prev_rsi < self.rsi_low) and (rsi > self.rsi_low)
+        # Et que le prix croise la BB lower par le bas
+        price_long_ok = (prev_close < prev_bblower) and (close > bblower)
+        # Alors on considère qu'on est en position longue
+        shouldibuy = rsi_long_ok and price_long_ok and trend_haussier
+
+        # Conditions de vente de la position longue
+        # take profit en variable car ajustable
+        tp_long = moymob if self.take_profit == "moymob" else bbupper + self.tp_offset #- (moymob*0.001)
+
+        # Si le RSI croise la barre des 70 par le dessus 
+        rsi_sell_ok = (prev_rsi > self.rsi_high) and (rsi < self.rsi_high)
+        # Et que le prix (close) a atteint le take profit définit plus haut
+        price_sell_ok = close >= tp_long
+        # Alors on cloture la position longue
+        take_profit_long = rsi_sell_ok or price_sell_ok
+
+        #### Conditions de short
+        # Si le RSI croise la barre des 70 par le dessus 
+        rsi_short_ok = (prev_rsi > self.rsi_high) and (rsi < self.rsi_high)
+        # Et que le prix croise la BB upper par le dessus 
+        price_short_ok = (prev_close > prev_bbupper) and (close < bbupper)
+        # Alors on considère qu'on est en position short
+        shouldisell = rsi_short_ok and price_short_ok and not trend_haussier
+
+        # conditions d'achat de la position short 
+        # Take profit en variable car ajustable
+        tp_short = moymob if self.take_profit == "moymob" else bblower - self.tp_offset #+ (moymob*0.001)
+
+        # Si le RSI croise la barre des 30 par le dessous 
+        rsi_buy_ok = (prev_rsi < self.rsi_low) and (rsi > self.rsi_low)
+        # Et que le prix a atteint le take profit 
+        price_buy_ok = close <= tp_short
+        # Alors on cloture la position short
+        take_profit_short = rsi_buy_ok or price_buy_ok
+
+        # Position en cours ?
+        if bt.position is None:
+            # === OUVERTURE DE POSITION SHORT ===
+            if shouldisell == True:
+                direction = "short"
+
+                exec_price = bt.get_execution_price(close, direction, "entry")
+                bt.open_position(exec_price, bbupper, direction, candle.name)
+
+            # === OUVERTURE DE POSITION LONG ===
+            elif shouldibuy == True:
+                direction = "long"
+
+                exec_price = bt.get_execution_price(close, direction, "entry")
+                bt.open_position(exec_price, bblower, "long", candle.name)
+        # Si oui, on va gérer notre position en cours
+        else:
+            if bt.position == "short":
+                exec_price = bt.get_execution_price(close, "long", "exit") # prix d'execution de sortie du short au prix ASK
+                # === STOP LOSS SHORT ===
+                if exec_price >= bt.stoploss:
+                    bt.exit_trade("stop loss", "short", exec_price, candle.name)
+
+                # === TRAILING STOP ===
+                # Si la moymob est supérieure au prix d'entrée du short et que la moyenne mobile est en train de monter
+                elif self.trailing and moymob > bt.entry_price and slope > 0:
+                    bt.exit_trade("trailing stop", "short", exec_price, candle.name)
+
+                # === TAKE PROFIT SHORT ===
+                elif take_profit_short == True:
+                    bt.exit_trade("take profit", "short", exec_price, candle.name)
+
+            elif bt.position == "long":
+                exec_price = bt.get_execution_price(close, "short", "exit") # prix d'execution de sortie du long au prix BID
+                # === STOP LOSS LONG ===
+                if exec_price <= bt.stoploss:
+                    bt.exit_trade("stop loss", "long", exec_price, candle.name)
+                
+                # === TRAILING STOP ===
+                # Si la moymob est inférieure au prix d'entrée du long et que la moyenne mobile est en train de chuter
+                elif self.trailing and moymob < bt.entry_price and slope < 0:
+                    bt.exit_trade("trailing stop", "long", exec_price, candle.name)
+
+                # === TAKE PROFIT LONG ===
+                elif take_profit_long == True:
+                    bt.exit_trade("take profit", "long", exec_price, candle.name)
+
+    def signals(self, bt, arrays):
+        return compute_signals(arrays, self.rsi_low, self.rsi_high, self.take_profit, self.tp_offset, self.trend)
+
+    def enter(self, bt, executor, arrays, signals, i, direction):
+        # Entrée au marché à la clôture, au prix get_execution_price(close, direction, "entry")
+        close = float(arrays["Close"][i])
+        half_spread = bt.spread / 2
+        if direction == "short":
+            return i, close - half_spread, float(arrays["BB_upper"][i])
+        return i, close + half_spread, float(arrays["BB_lower"][i])
+
+    def exit(self, bt, executor, arrays, signals, start, entry_bar=None):
+        return self.find_exit(arrays, signals, bt.position, bt.entry_price, bt.stoploss, bt.spread / 2, start)
+
+    def find_exit(self, arrays, signals, direction, entry_price, stoploss, half_spread, start):
+        """
+        Cherche la sortie d'une position à partir de la candle start : stop, trailing stop et take profit
+        évalués à la clôture, au prix que on_candle obtient via get_execution_price.
+
+        :return: (candle, prix d'exécution, raison) ou (None, None, None)
+        """
+        close = arrays["Close"]
+        short = direction == "short"
+
+        # Prix de sortie calculés sur la seule fenêtre examinée, pas sur toute la colonne
+        if short:
+            stop_hit = lambda a, b: close[a:b] - half_spread >= stoploss
+        else:
+            stop_hit = lambda a, b: close[a:b] + half_spread <= stoploss
+        take_profit = signals["short_exit" if short else "long_exit"]
+
+        if self.trailing:
+            moymob, prev_moymob = arrays["MoyMob"], arrays["prev_MoyMob"]
+            if short:
+                trail = lambda a, b: (moymob[a:b] > entry_price) & (moymob[a:b] > prev_moymob[a:b])
+            else:
+                trail = lambda a, b: (moymob[a:b] < entry_price) & (moymob[a:b] < prev_moymob[a:b])
+            j = first_true(lambda a, b: stop_hit(a, b) | trail(a, b) | take_profit[a:b], start, len(close))
+        else:
+            trail = None
+            j = first_true(lambda a, b: stop_hit(a, b) | take_profit[a:b], start, len(close))
+
+        if j is None:
+            return None, None, None
+        price = float(close[j] - half_spread if short else close[j] + half_spread)
+        if stop_hit(j, j + 1)[0]:
+            return j, price, "stop loss"
+        if trail is not None and trail(j, j + 1)[0]:
+            return j, price, "trailing stop"
+        return j, price, "take profit"
+
+    def stop_level(self, bt, entry_price, reference, direction):
+        return self.stop_price(entry_price, reference, direction, bt.stop_pct, bt.spread / 2)
+
+    def close_price(self, bt, close, direction):
+        # Comme on_candle : un short sort à get_execution_price(close, "long", "exit"), un long à l'inverse
+        return close - bt.spread / 2 if direction == "short" else close + bt.spread / 2
+
+    def stop_price(self, entry_price, reference, direction, stop_pct, half_spread):
+        """
+        Stop fixé à l'entrée, spread compris.
+
+        :param reference: Bande de Bollinger d'entrée (BB_upper pour un short, BB_lower pour un long)
+        """
+        # intégration du spread pour le calcul des stops
+        if direction in ("short", "Short"):
+            # On définit un stop loss dès l'entrée en position
+            # return entry_price - ((bt.balance*0.005)/bt.units) # Stop quand on a perdu 0.5% de la balance totale
+            if self.stop == "entry":
+                return entry_price * (1 + stop_pct) + half_spread # ex: stop 0.36% au dessus du prix d'entrée
+            return reference * (1 + stop_pct) + half_spread  # Stop 0.9% au dessus de BB_upper par défaut
+        elif direction in ("long", "Long"):
+            # return entry_price + ((bt.balance*0.005)/bt.units) # Stop quand on a perdu 0.5% de la balance totale
+            if self.stop == "entry":
+                return entry_price * (1 - stop_pct) - half_spread # ex: stop 0.36% sous le prix d'entrée
+            return reference * (1 - stop_pct) - half_spread  # Stop 0.9% sous BB_lower par défaut
+        raise ValueError("stop_loss : direction must be 'long' or 'short'")
+
+class LimitEntry(Strategy):
+    """
+    Stratégie de main_limit.py : sur croisement du RSI et de BB_lower, limite d'achat posée sur BB_lower,
+    annulée si le prix revient sur la moyenne mobile ; stop sous le prix d'entrée, take profit au dessus de BB_upper.
+    """
+    columns = ("Open", "High", "Low", "Close", "prev_close", "RSI", "prev_RSI", "MoyMob", "BB_upper", "BB_lower", "prev_BB_lower")
+    pending_orders = True
+
+    def __init__(self, rsi_window=13, bb_period=30, bb_num_std=2, stop_pct=0.002, tp_offset=0.05, rsi_low=RSI_LOW, rsi_high=RSI_HIGH):
+        """
+        :param rsi_window: Fenêtre du RSI
+        :param bb_period: Période des bandes de Bollinger
+        :param bb_num_std: Nombre d'écarts-types des bandes de Bollinger
+        :param stop_pct: Distance relative du stop sous le prix d'entrée
+        :param tp_offset: Take profit en dollars au dessus de BB_upper
+        :param rsi_low: Seuil de survente
+        :param rsi_high: Seuil de surachat
+        """
+        self.rsi_window = rsi_window
+        self.bb_period = bb_period
+        self.bb_num_std = bb_num_std
+        self.stop_pct = stop_pct
+        self.tp_offset = tp_offset
+        self.rsi_low = rsi_low
+        self.rsi_high = rsi_high
+
+    def on_candle(self, bt, candle):
+        close = candle["Close"]
+        prev_close = candle["prev_close"]
+        low = candle["Low"]
+        rsi = candle["RSI"]
+        prev_rsi = candle["prev_RSI"]
+        moymob = candle["MoyMob"]
+        bbupper = candle["BB_upper"]
+        bblower = candle["BB_lower"]
+        prev_bblower = candle["prev_BB_lower"]
+
+        # Conditions d'achat
+        rsi_buy_ok = (prev_rsi < self.rsi_low) and (rsi > self.rsi_low)
+        price_buy_ok = (prev_close < prev_bblower) and (close > bblower)
+        shouldibuy = rsi_buy_ok and price_buy_ok
+
+        # Conditions de vente
+        # tp_price = (bbupper + moymob)/2 # TP au milieu entre la moyenne mobile et BB Upper
+        tp_price = bbupper + self.tp_offset
+
+        rsi_sell_ok = (prev_rsi > self.rsi_high) and (rsi < self.rsi_high)
+        price_sell_ok = close >= tp_price
+        take_profit = rsi_sell_ok or price_sell_ok
+
+        # === OUVERTURE DE POSITION ===
+        if bt.position is None:
+            if bt.limit is not None:
+                if low < bt.limit:
+                    bt.open_position(bt.limit, bt.limit, "long", candle.name)
+                    bt.limit = None
+                elif close >= moymob:
+                    bt.limit = None
+            elif shouldibuy == True:
+                bt.limit = bblower
+
+        # === STOP LOSS ===
+        elif bt.position == "long" and low <= bt.stoploss:
+            bt.exit_trade("stop loss", "long", bt.stoploss, candle.name)
+
+        # === TAKE PROFIT ===
+        elif bt.position == "long" and take_profit == True:
+            bt.exit_trade("take profit", "long", close, candle.name)
+
+    def signals(self, bt, arrays):
+        close = arrays["Close"]
+        rsi, prev_rsi = arrays["RSI"], arrays["prev_RSI"]
+        target = arrays["BB_upper"] + self.tp_offset
+
+        return {
+            "long_entry": (prev_rsi < self.rsi_low) & (rsi > self.rsi_low) & (arrays["prev_close"] < arrays["prev_BB_lower"]) & (close > arrays["BB_lower"]),
+            "short_entry": np.zeros(len(close), dtype=bool),
+            "long_exit": ((prev_rsi > self.rsi_high) & (rsi < self.rsi_high)) | (close >= target),
+            "target": target,
+            "cancel": close >= arrays["MoyMob"],
+        }
+
+    def enter(self, bt, executor, arrays, signals, i, direction):
+        # Limite posée sur BB_lower à la clôture de i, active à partir de la candle suivante
+        j, price = executor.entry_limit(float(arrays["BB_lower"][i]), "long", i + 1, signals["cancel"])
+        return j, price, price
+
+    def exit(self, bt, executor, arrays, signals, start, entry_bar=None):
+        return executor.exit("long", bt.stoploss, start, signals["target"], signals["long_exit"], entry_bar)
+
+    def stop_level(self, bt, entry_price, reference, direction):
+        return entry_price * (1 - bt.stop_pct) # Stop 0.2% sous le prix d'entrée par défaut
+
+    def close_price(self, bt, close, direction):
+        return close # Take profit sur signal à la clôture, sans spread
@@ -0,0 +1,288 @@
+from collections import deque
+from math import copysign, nan, sqrt
+from sys import float_info
+
+# Colonnes produites par StrategyIndicators
+COLUMNS = (
+    "Open", "High", "Low", "Close", "prev_close",
+    "RSI", "prev_RSI",
+    "MoyMob", "prev_MoyMob", "BB_upper", "prev_BB_upper", "BB_lower", "prev_BB_lower",
+    "SMA50", "SMA200",
+)
+
+# Une somme des carrés qui perd plus que ce facteur sur un ajout ou un retrait est recalculée
+# (il ne reste que 3 chiffres significatifs), même seuil que pandas
+INV_COND_TOL = float_info.epsilon * 1e3
+
+class RollingMean:
+    def __init__(self, window):
+        """
+        Moyenne glissante mise à jour en O(1), qui reproduit au bit près pandas.Series.rolling().mean() :
+        mêmes sommes compensées (Kahan) pour les ajouts et les retraits, même traitement des
+        fenêtres de valeurs identiques et du signe. L'état ne dépend que des valeurs déjà vues,
+        il peut donc être sauvegardé puis repris (voir Backtester.checkpoint).
+
+        :param window: Nombre de valeurs de la fenêtre
+        """
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.nobs = 0
+        self.total = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.neg_ct = 0
+        self.same = 0 # nombre de valeurs identiques consécutives
+        self.prev = None
+
+    def push(self, x):
+        """
+        Ajoute une valeur (et retire la plus ancienne si la fenêtre est pleine).
+
+        :return: Moyenne de la fenêtre, NaN tant qu'elle n'est pas pleine
+        """
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.compensation_remove
+                t = self.total + y
+                self.compensation_remove = t - self.total - y
+                self.total = t
+                self.neg_ct -= copysign(1.0, old) < 0
+        self.values.append(x)
+
+        if self.prev is None:
+            self.prev = x
+        if x == x:
+            self.nobs += 1
+            y = x - self.compensation_add
+            t = self.total + y
+            self.compensation_add = t - self.total - y
+            self.total = t
+            self.neg_ct += copysign(1.0, x) < 0
+            self.same = self.same + 1 if x == self.prev else 1
+            self.prev = x
+
+        if self.nobs < self.window:
+            return nan
+        mean = self.total / self.nobs
+        if self.same >= self.nobs:
+            return self.prev
+        if self.neg_ct == 0 and mean < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and mean > 0:
+            return 0.0
+        return mean
+
+class RollingVariance:
+    def __init__(self, window):
+        """
+        Variance glissante (ddof=1) mise à jour en O(1), qui reproduit au bit près
+        pandas.Series.rolling().var() (pandas 3) : algorithme de Welford avec sommes compensées,
+        et recalcul sur toute la fenêtre quand un ajout ou un retrait fait perdre presque tous
+        les chiffres significatifs de la somme des carrés (par exemple à la sortie d'une fenêtre
+        de valeurs identiques).
+
+        :param window: Nombre de valeurs de la fenêtre
+        """
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0 # somme des carrés des écarts à la moyenne
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.unstable = False
+
+    def _add(self, x):
+        if x != x:
+            return
+        prev_ssqdm = self.ssqdm
+        self.nobs += 1
+        prev_mean = self.mean - self.compensation_add
+        y = x - self.compensation_add
+        t = y - self.mean
+        self.compensation_add = t + self.mean - y
+        self.mean = self.mean + t / self.nobs
+        self.ssqdm = self.ssqdm + (x - prev_mean) * (x - self.mean)
+        if prev_ssqdm * INV_COND_TOL > self.ssqdm:
+            self.unstable = True
+
+    def _remove(self, x):
+        if x != x:
+            return
+        prev_ssqdm = self.ssqdm
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean - self.compensation_remove
+            y = x - self.compensation_remove
+            t = y - self.mean
+            self.compensation_remove = t + self.mean - y
+            self.mean = self.mean - t / self.nobs
+            self.ssqdm = self.ssqdm - (x - prev_mean) * (x - self.mean)
+            if prev_ssqdm * INV_COND_TOL > self.ssqdm:
+                self.unstable = True
+        else:
+            self.mean = 0.0
+            self.ssqdm = 0.0
+            self.unstable = False
+
+    def push(self, x):
+        """
+        Ajoute une valeur (et retire la plus ancienne si la fenêtre est pleine).
+
+        :return: Variance de la fenêtre, NaN tant qu'elle n'est pas pleine
+        """
+        if len(self.values) == self.window:
+            self._remove(self.values[0])
+        self.values.append(x)
+        self._add(x)
+
+        if self.unstable:
+            # Somme des carrés repartie de zéro sur les valeurs de la fenêtre, comme pandas
+            self.nobs = 0
+            self.mean = self.ssqdm = self.compensation_add = self.compensation_remove = 0.0
+            for value in self.values:
+                self._add(value)
+            self.unstable = False
+
+        if self.nobs < self.window or self.nobs < 2:
+            return nan
+        return self.ssqdm / (self.nobs - 1)
+
+class SMA:
+    def __init__(self, window):
+        """
+        Moyenne mobile simple incrémentale, équivalent de maths.sma.
+
+        :param window: Fenêtre de la moyenne
+        """
+        self.rolling = RollingMean(window)
+
+    def update(self, close):
+        """
+        :param close: Prix de clôture de la nouvelle candle
+        :return: Moyenne mobile, NaN tant que la fenêtre n'est pas pleine
+        """
+        return self.rolling.push(close)
+
+class BollingerBands:
+    def __init__(self, period=25, num_std=2):
+        """
+        Bandes de Bollinger incrémentales, équivalent de maths.bollinger_bands.
+
+        :param period: Période de la moyenne mobile
+        :param num_std: Nombre d'écarts-types
+        """
+        self.num_std = num_std
+        self.mean = RollingMean(period)
+        self.variance = RollingVariance(period)
+
+    def update(self, close):
+        """
+        :param close: Prix de clôture de la nouvelle candle
+        :return: (moyenne mobile, bande haute, bande basse), NaN tant que la fenêtre n'est pas pleine
+        """
+        ma = self.mean.push(close)
+        variance = self.variance.push(close)
+        if ma != ma:
+            return nan, nan, nan
+
+        std = sqrt(max(variance, 0.0))
+        return ma, ma + self.num_std * std, ma - self.num_std * std
+
+class RSI:
+    def __init__(self, window=13):
+        """
+        RSI incrémental, équivalent exact de maths.rsi (moyennes simples des hausses et des baisses).
+
+        :param window: Fenêtre temporelle du calcul
+        """
+        self.gains = RollingMean(window)
+        self.losses = RollingMean(window)
+        self.prev_close = None
+
+    def update(self, close):
+        """
+        :param close: Prix de clôture de la nouvelle candle
+        :return: RSI, NaN tant que la fenêtre n'est pas pleine
+        """
+        # La première candle n'a pas de variation : pandas la compte comme 0 dans les moyennes
+        delta = nan if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+
+        # delta.where(delta > 0, 0) et -delta.where(delta < 0, 0), qui donne -0.0 hors baisses
+        gain = self.gains.push(delta if delta > 0 else 0.0)
+        loss = self.losses.push(-delta if delta < 0 else -0.0)
+        if gain != gain or loss != loss:
+            return nan
+
+        if loss == 0:
+            return nan if gain == 0 else 100.0
+        return 100 - (100 / (1 + gain / loss))
+
+class StrategyIndicators:
+    def __init__(self, rsi_window=13, bb_period=21, bb_num_std=2, columns=COLUMNS):
+        """
+        Version incrémentale de maths.add_indicators : produit, candle par candle,
+        les colonnes lues par les stratégies, avec exactement les valeurs du calcul
+        sur tout le dataframe.
+
+        :param rsi_window: Fenêtre du RSI
+        :param bb_period: Période des bandes de Bollinger
+        :param bb_num_std: Nombre d'écarts-types des bandes de Bollinger
+        :param columns: Colonnes qui doivent être définies pour qu'une candle soit produite
+            (strategy.columns), toutes par défaut
+        """
+        self.rsi = RSI(rsi_window)
+        self.bollinger = BollingerBands(bb_period, bb_num_std)
+        self.sma50 = SMA(50)
+        self.sma200 = SMA(200)
+        self.columns = tuple(columns)
+        unknown = set(self.columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"StrategyIndicators : no incremental version of {sorted(unknown)}")
+        self.moymob_history = deque([nan] * 6, maxlen=6) # pour prev_MoyMob, décalée de 5
+        self.prev = {"Close": nan, "RSI": nan, "BB_lower": nan, "BB_upper": nan}
+
+    def warm(self, closes):
+        """
+        Fait avancer les indicateurs sur un historique de clôtures sans produire de candles,
+        par exemple pour se placer à la fin d'un backtest déjà calculé sur tout le dataframe.
+
+        :param closes: Itérable de prix de clôture
+        """
+        for close in closes:
+            rsi = self.rsi.update(close)
+            moymob, bbupper, bblower = self.bollinger.update(close)
+            self.moymob_history.append(moymob)
+            self.sma50.update(close)
+            self.sma200.update(close)
+            self.prev = {"Close": close, "RSI": rsi, "BB_lower": bblower, "BB_upper": bbupper}
+
+    def update(self, open_, high, low, close):
+        """
+        :return: dict colonne -> valeur pour la candle, ou None tant qu'une des colonnes
+            demandées est encore indéfinie (l'équivalent du dropna de Backtester.prepare)
+        """
+        rsi = self.rsi.update(close)
+        moymob, bbupper, bblower = self.bollinger.update(close)
+        self.moymob_history.append(moymob)
+
+        row = {
+            "Open": open_, "High": high, "Low": low, "Close": close,
+            "RSI": rsi, "prev_RSI": self.prev["RSI"],
+            "MoyMob": moymob, "BB_upper": bbupper, "BB_lower": bblower,
+            "prev_MoyMob": self.moymob_history[0],
+            "prev_close": self.prev["Close"],
+            "prev_BB_lower": self.prev["BB_lower"],
+            "prev_BB_upper": self.prev["BB_upper"],
+            "SMA50": self.sma50.update(close),
+            "SMA200": self.sma200.update(close),
+        }
+        self.prev = {"Close": close, "RSI": rsi, "BB_lower": bblower, "BB_upper": bbupper}
+
+        # NaN != NaN
+        if any(row[col] != row[col] for col in self.columns):
+            return None
+        return row
@@ -0,0 +1,208 @@
+import itertools
+import os
+from contextlib import contextmanager
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from cache import IndicatorCache
+from Backtester import Backtester, LEVERAGE, MARGIN_RATIO, SPREAD, STOP_PCT
+from loader import load_candles
+from registry import Registry, data_hash
+from strategies import MeanReversion
+from variants import run_variants
+
+OHLC = ("Open", "High", "Low", "Close")
+
+# Paramètres acceptés dans une grille et leur valeur par défaut
+DEFAULTS = {
+    "rsi_window": 13,
+    "bb_period": 21,
+    "bb_num_std": 2,
+    "stop_pct": STOP_PCT,
+    "spread": SPREAD,
+    "leverage": LEVERAGE,
+    "margin_ratio": MARGIN_RATIO,
+    "stop": "band",
+    "take_profit": "moymob",
+    "tp_offset": 0.05,
+    "trailing": False,
+    "trend_timeframe": None,
+}
+
+# Résultats d'une combinaison
+RESULTS = ("final_balance", "total_pnl", "number_of_trades")
+
+# Paramètres qui changent les colonnes d'indicateurs (les autres ne touchent que la simulation)
+INDICATOR_PARAMS = ("rsi_window", "bb_period", "bb_num_std", "trend_timeframe")
+
+# Données partagées, attachées une fois par worker
+_shm = None
+_candles = None
+_cache = None
+
+def indicator_key(params):
+    """
+    Clé de tri et de regroupement des combinaisons qui lisent les mêmes colonnes d'indicateurs
+    (None, l'unité de temps des candles, est rangé avant les unités de temps supérieures).
+    """
+    return tuple("" if params[name] is None else params[name] for name in INDICATOR_PARAMS)
+
+def parameter_grid(grid):
+    """
+    Produit cartésien d'une grille de paramètres, complété par les valeurs par défaut.
+    Les combinaisons sont triées par paramètres d'indicateurs pour que les tâches
+    qui partagent les mêmes colonnes se suivent.
+
+    :param grid: dict paramètre -> liste de valeurs (ex: {"stop_pct": [0.002, 0.009]})
+    :return: Liste de dicts, une combinaison complète par élément
+    """
+    unknown = set(grid) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"parameter_grid : unknown parameters {sorted(unknown)}")
+
+    names = list(grid)
+    combos = [{**DEFAULTS, **dict(zip(names, values))} for values in itertools.product(*(grid[name] for name in names))]
+    combos.sort(key=indicator_key)
+    return combos
+
+@contextmanager
+def shared_candles(df):
+    """
+    Place les prix OHLC et l'index du dataframe dans un bloc de mémoire partagée,
+    libéré à la sortie du bloc with. Les workers l'attachent avec _init_worker.
+
+    :param df: Dataframe de candles brutes (Open/High/Low/Close), indexé par datetime
+    :return: (nom du bloc, nombre de candles)
+    """
+    n = len(df)
+    shm = shared_memory.SharedMemory(create=True, size=(len(OHLC) + 1) * max(n, 1) * 8)
+    try:
+        block = np.ndarray((len(OHLC) + 1, n), dtype=np.float64, buffer=shm.buf)
+        for k, col in enumerate(OHLC):
+            block[k] = df[col].to_numpy(dtype=np.float64)
+        block[len(OHLC)].view(np.int64)[:] = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+        del block
+        yield shm.name, n
+    finally:
+        shm.close()
+        shm.unlink()
+
+def _init_worker(name, n, cache_dir):
+    """
+    Attache le bloc de mémoire partagée contenant les prix et l'index,
+    et crée le cache d'indicateurs du worker.
+
+    :param name: Nom du bloc de mémoire partagée
+    :param n: Nombre de candles
+    :param cache_dir: Dossier du cache disque d'indicateurs, partagé entre workers (optionnel)
+    """
+    global _shm, _candles, _cache
+    _cache = IndicatorCache(directory=cache_dir)
+    _shm = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((len(OHLC) + 1, n), dtype=np.float64, buffer=_shm.buf)
+    index = pd.DatetimeIndex(block[len(OHLC)].view(np.int64).view("datetime64[ns]"), name="datetime")
+    _candles = pd.DataFrame({col: block[k] for k, col in enumerate(OHLC)}, index=index, copy=False)
+
+def make_strategy(params):
+    """
+    MeanReversion correspondant à une combinaison complète de paramètres.
+    """
+    return MeanReversion(params["rsi_window"], params["bb_period"], params["bb_num_std"], params["stop_pct"],
+                         stop=params["stop"], take_profit=params["take_profit"], tp_offset=params["tp_offset"],
+                         trailing=params["trailing"], trend_timeframe=params["trend_timeframe"])
+
+def make_backtester(params, df=None):
+    """
+    Backtester équivalent à une combinaison (mêmes trades que sa variante dans run_variants).
+    """
+    return Backtester(df, leverage=params["leverage"], spread=params["spread"], margin_ratio=params["margin_ratio"],
+                      strategy=make_strategy(params))
+
+def _run_batch(batch):
+    """
+    Lance, dans un worker, un lot de combinaisons aux mêmes paramètres d'indicateurs :
+    toutes sont simulées en une seule passe par variants.run_variants.
+
+    :param batch: Liste de combinaisons complètes de paramètres
+    :return: Liste de dicts paramètres + résultats
+    """
+    table = run_variants(_candles, [make_strategy(params) for params in batch],
+                         leverage=[params["leverage"] for params in batch],
+                         spread=[params["spread"] for params in batch],
+                         margin_ratio=[params["margin_ratio"] for params in batch], cache=_cache)
+
+    return [{
+        **params,
+        "final_balance": float(table["final_balance"].iloc[k]),
+        "total_pnl": table["total_pnl"].iloc[k],
+        "number_of_trades": int(table["number_of_trades"].iloc[k]),
+    } for k, params in enumerate(batch)]
+
+def batches(combos, size):
+    """
+    Découpe les combinaisons triées en lots d'au plus size éléments qui ne mélangent
+    jamais deux jeux de paramètres d'indicateurs.
+    """
+    for _, group in itertools.groupby(combos, key=indicator_key):
+        group = list(group)
+        for start in range(0, len(group), size):
+            yield group[start:start + size]
+
+def sweep(df, grid, processes=None, cache_dir=None, registry=None):
+    """
+    Lance le Backtester sur toutes les combinaisons d'une grille de paramètres,
+    en parallèle sur un pool de processus. Les prix sont placés une seule fois
+    en mémoire partagée au lieu d'envoyer un dataframe à chaque tâche, et chaque lot
+    de combinaisons aux mêmes indicateurs est simulé en une seule passe (variants.run_variants).
+
+    :param df: Dataframe de candles brutes (Open/High/Low/Close), indexé par datetime
+    :param grid: dict paramètre -> liste de valeurs, voir DEFAULTS pour les noms acceptés
+    :param processes: Nombre de processus, tous les coeurs par défaut
+    :param cache_dir: Dossier du cache disque d'indicateurs (optionnel). Chaque worker garde
+        de toute façon un cache mémoire : seuls stop, take profit, spread, levier et marge changent
+        entre combinaisons voisines, les indicateurs ne sont pas recalculés
+    :param registry: registry.Registry optionnel : les combinaisons déjà simulées sur ces données sont relues
+        en une requête, seules les autres sont simulées, puis enregistrées en une seule transaction
+    :return: pandas.DataFrame, une ligne par combinaison avec final_balance, total_pnl et number_of_trades
+    """
+    combos = parameter_grid(grid)
+    processes = processes or os.cpu_count()
+
+    # Combinaisons déjà dans le registre : mêmes paramètres que le Backtester équivalent en mode "events"
+    # (run_variants en donne exactement les trades), mêmes données
+    known, keys = {}, None
+    if registry is not None:
+        data = data_hash(df)
+        keys = [registry.key(make_backtester(params), "events", data) for params in combos]
+        known = registry.lookup(keys)
+    todo = [params for k, params in enumerate(combos) if keys is None or keys[k][1] not in known]
+
+    rows = []
+    if todo:
+        with shared_candles(df) as (name, n):
+            # Un lot = combinaisons aux mêmes indicateurs, simulées en une seule passe dans un worker
+            size = max(1, len(todo) // (processes * 4))
+            with Pool(processes, initializer=_init_worker, initargs=(name, n, cache_dir)) as pool:
+                rows = [row for rows in pool.map(_run_batch, list(batches(todo, size))) for row in rows]
+
+    if registry is not None:
+        registry.record_many(df, [key for key in keys if key[1] not in known], rows)
+        # Résultats relus et simulés, dans l'ordre des combinaisons
+        simulated = iter(rows)
+        rows = [{**params, **{name: known[key[1]][name] for name in RESULTS}} if key[1] in known else next(simulated)
+                for params, key in zip(combos, keys)]
+
+    return pd.DataFrame(rows, columns=[*DEFAULTS, *RESULTS])
+
+if __name__ == "__main__":
+    from main import DATA_FILE, REGISTRY
+
+    # Les combinaisons déjà simulées sur ces données sont relues depuis le registre
+    table = sweep(load_candles(DATA_FILE), {
+        "stop_pct": [0.001, 0.002, 0.0036, 0.009],
+        "bb_period": [21, 25, 30],
+        "rsi_window": [13, 14],
+    }, registry=Registry(REGISTRY))
+    print(table.sort_values("final_balance", ascending=False).to_string(index=False))
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Unités de temps supérieures utilisables en suffixe de colonne (ex: "SMA50_H1")
+TIMEFRAMES = {
+    "M5": "5min",
+    "M15": "15min",
+    "M30": "30min",
+    "H1": "1h",
+    "H4": "4h",
+    "D1": "1D",
+}
+
+def split(name):
+    """
+    Sépare une colonne d'unité de temps supérieure en (colonne, unité de temps).
+
+    :param name: Nom de colonne, ex: "SMA200_H4" ou "prev_close_H1"
+    :return: ("SMA200", "H4"), ou (name, None) pour une colonne de l'unité de temps des candles
+    """
+    base, _, timeframe = name.rpartition("_")
+    if base and timeframe in TIMEFRAMES:
+        return base, timeframe
+    return name, None
+
+def resample(df, timeframe, step=None):
+    """
+    Construit les bars OHLC d'une unité de temps supérieure en une passe NumPy : les candles sont
+    regroupées par période (alignée sur minuit UTC), puis reduceat donne plus haut et plus bas.
+
+    Chaque bar n'est connue qu'une fois terminée : à sa dernière candle si celle-ci ferme la période
+    (datetime + step atteint la fin de la période), sinon à la première candle de la période suivante.
+    Une dernière bar incomplète n'est jamais publiée.
+
+    :param df: Dataframe de candles (Open/High/Low/Close) trié, indexé par datetime
+    :param timeframe: Clé de TIMEFRAMES ("H1", "H4"...)
+    :param step: Durée d'une candle, écart médian entre deux candles de l'index par défaut
+    :return: (dataframe OHLC indexé par début de période, numpy.ndarray des positions de candles
+        à partir desquelles chaque bar est connue)
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"resample : timeframe must be one of {tuple(TIMEFRAMES)}")
+    ns = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+    n = len(ns)
+    period = pd.Timedelta(TIMEFRAMES[timeframe]).value
+    if step is None:
+        step = int(np.median(np.diff(ns))) if n > 1 else 0
+    else:
+        step = pd.Timedelta(step).value
+
+    bucket = ns // period
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+
+    bars = pd.DataFrame({
+        "Open": df["Open"].to_numpy(dtype=np.float64)[starts],
+        "High": np.maximum.reduceat(df["High"].to_numpy(dtype=np.float64), starts),
+        "Low": np.minimum.reduceat(df["Low"].to_numpy(dtype=np.float64), starts),
+        "Close": df["Close"].to_numpy(dtype=np.float64)[ends],
+    }, index=pd.DatetimeIndex((bucket[starts] * period).view("datetime64[ns]"), name="datetime"))
+
+    complete = ns[ends] + step >= (bucket[starts] + 1) * period
+    return bars, np.where(complete, ends, ends + 1)
+
+def align(values, known_at, n):
+    """
+    Reporte une colonne calculée sur les bars d'une unité de temps supérieure sur les n candles :
+    chaque candle voit la dernière bar terminée au plus tard à sa clôture, jamais la bar en cours.
+
+    :param values: numpy.ndarray, une valeur par bar
+    :param known_at: Positions de candles à partir desquelles chaque bar est connue, voir resample
+    :param n: Nombre de candles
+    :return: numpy.ndarray float64 de n valeurs, NaN avant la première bar terminée
+    """
+    k = np.searchsorted(known_at, np.arange(n), side="right") - 1
+    aligned = np.asarray(values, dtype=np.float64)[np.maximum(k, 0)]
+    aligned[k < 0] = np.nan
+    return aligned
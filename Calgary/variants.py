@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from Backtester import BALANCE, LEVERAGE, MARGIN_RATIO, SPREAD, Backtester
+from journal import TradeJournal
+from strategies import MeanReversion
+
+def per_variant(value, m):
+    """
+    Paramètre scalaire ou un par variante, en tableau float64 de m valeurs.
+    """
+    values = np.asarray(value, dtype=np.float64)
+    if values.ndim and values.shape != (m,):
+        raise ValueError(f"per_variant : expected a scalar or {m} values")
+    return np.array(np.broadcast_to(values, (m,)))
+
+def run_variants(df, strategies, names=None, balance=BALANCE, leverage=LEVERAGE, spread=SPREAD, margin_ratio=MARGIN_RATIO, cache=None):
+    """
+    Simule N variantes de MeanReversion en une seule passe sur les mêmes colonnes.
+
+    Les indicateurs sont calculés une fois, les masques de signaux une fois par jeu de seuils et de
+    take profit. L'état de chaque variante (position, prix d'entrée, stop, unités, marge, balance)
+    est rangé dans des tableaux NumPy indexés par variante. La passe avance d'événement en événement
+    dans l'ordre du temps : à chaque candle où au moins une variante entre ou sort, seules ces
+    variantes sont traitées. Chaque variante donne exactement les trades de Backtester.run("events").
+
+    :param df: Dataframe de candles, brutes ou préparées par add_indicators
+    :param strategies: Liste de MeanReversion ; elles doivent partager rsi_window, bb_period, bb_num_std
+        et trend_timeframe (les mêmes colonnes)
+    :param names: Noms des variantes, leur position dans la liste par défaut
+    :param balance: Balance de départ, scalaire ou une valeur par variante
+    :param leverage: Levier, scalaire ou une valeur par variante
+    :param spread: Spread en dollars, scalaire ou une valeur par variante
+    :param margin_ratio: Part de la balance immobilisée en marge, scalaire ou une valeur par variante
+    :param cache: cache.IndicatorCache optionnel
+    :return: pandas.DataFrame indexé par variante : final_balance, total_pnl, number_of_trades, journal
+    """
+    strategies = list(strategies)
+    m = len(strategies)
+    if m == 0:
+        raise ValueError("run_variants : no strategy given")
+    if any(type(strategy) is not MeanReversion for strategy in strategies):
+        raise ValueError("run_variants : only MeanReversion variants can share a pass")
+    first = strategies[0]
+    params = (first.rsi_window, first.bb_period, first.bb_num_std, first.trend_timeframe)
+    if any((s.rsi_window, s.bb_period, s.bb_num_std, s.trend_timeframe) != params for s in strategies):
+        raise ValueError("run_variants : variants must share rsi_window, bb_period, bb_num_std and trend_timeframe")
+
+    arrays, index = Backtester(df, strategy=first, cache=cache).prepare()
+    close, bb_upper, bb_lower = arrays["Close"], arrays["BB_upper"], arrays["BB_lower"]
+    n = len(close)
+
+    # Masques partagés entre variantes aux mêmes seuils et take profit
+    shared = {}
+    signals, entries = [], []
+    for strategy in strategies:
+        key = (strategy.rsi_low, strategy.rsi_high, strategy.take_profit, strategy.tp_offset)
+        if key not in shared:
+            masks = strategy.signals(None, arrays)
+            shared[key] = (masks, np.flatnonzero(masks["long_entry"] | masks["short_entry"]))
+        signals.append(shared[key][0])
+        entries.append(shared[key][1])
+
+    def next_entry(v, start):
+        k = np.searchsorted(entries[v], start)
+        return int(entries[v][k]) if k < len(entries[v]) else n
+
+    # État des variantes, une case par variante
+    half_spread = per_variant(spread, m) / 2
+    leverage = per_variant(leverage, m)
+    margin_ratio = per_variant(margin_ratio, m)
+    balance = per_variant(balance, m)
+    position = np.zeros(m, dtype=np.int8) # 0 à plat, 1 long, -1 short
+    entry_price = np.full(m, np.nan)
+    stoploss = np.full(m, np.nan)
+    units = np.full(m, np.nan)
+    margin_used = np.full(m, np.nan)
+    entry_bar = np.zeros(m, dtype=np.int64)
+    exit_price = np.full(m, np.nan)
+    next_bar = np.array([next_entry(v, 0) for v in range(m)], dtype=np.int64) # prochain événement
+    exit_label = [None] * m
+    trades = [[] for _ in range(m)]
+    journals = [TradeJournal() for _ in range(m)]
+
+    while True:
+        i = int(next_bar.min())
+        if i >= n:
+            break
+
+        for v in np.flatnonzero(next_bar == i):
+            if position[v] == 0:
+                # === OUVERTURE DE POSITION, au marché à la clôture ===
+                strategy, signals_v = strategies[v], signals[v]
+                short = bool(signals_v["short_entry"][i])
+                direction = "short" if short else "long"
+                price = float(close[i] - half_spread[v] if short else close[i] + half_spread[v])
+                reference = float(bb_upper[i] if short else bb_lower[i])
+
+                margin = float(balance[v] * margin_ratio[v])
+                position[v] = -1 if short else 1
+                entry_price[v] = price
+                entry_bar[v] = i
+                margin_used[v] = margin
+                units[v] = margin * leverage[v] / price
+                balance[v] -= margin
+                stoploss[v] = strategy.stop_price(price, reference, direction, strategy.stop_pct, float(half_spread[v]))
+
+                j, exit_price[v], exit_label[v] = strategy.find_exit(arrays, signals_v, direction, price, float(stoploss[v]), float(half_spread[v]), i + 1)
+                next_bar[v] = n if j is None else j
+            else:
+                # === SORTIE, trouvée à l'ouverture ===
+                short = position[v] < 0
+                price = float(exit_price[v])
+                pnl = float((entry_price[v] - price) * units[v] if short else (price - entry_price[v]) * units[v])
+                balance[v] += margin_used[v] # marge restituée
+                balance[v] += pnl # pnl du trade
+                trades[v].append(pnl)
+                journals[v].record(index[entry_bar[v]], index[i], "short" if short else "long", float(entry_price[v]),
+                                   price, float(units[v]), pnl, exit_label[v], float(balance[v]))
+
+                position[v] = 0
+                next_bar[v] = next_entry(v, i + 1)
+
+    return pd.DataFrame({
+        "final_balance": balance,
+        "total_pnl": [sum(pnls) for pnls in trades],
+        "number_of_trades": [len(pnls) for pnls in trades],
+        "journal": journals,
+    }, index=pd.Index(range(m) if names is None else names, name="variant"))
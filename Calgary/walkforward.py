@@ -0,0 +1,186 @@
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+import sweep
+from Backtester import BALANCE, Backtester
+from columns import LazyColumns
+from maths import add_indicators
+from sweep import _init_worker, batches, indicator_key, make_strategy, parameter_grid, shared_candles
+from variants import run_variants
+
+TRAIN = "90D" # Durée d'une fenêtre d'optimisation (in-sample)
+TEST = "30D" # Durée de la fenêtre de test qui la suit (out-of-sample)
+OBJECTIVES = ("final_balance", "total_pnl", "number_of_trades")
+
+# Indicateurs sur tout l'historique pour les derniers paramètres d'indicateurs vus par le worker
+_key = None
+_frame = None
+
+def windows(index, train=TRAIN, test=TEST, step=None):
+    """
+    Découpe un index datetime en fenêtres glissantes : optimisation sur [debut, debut + train),
+    test sur [debut + train, debut + train + test), puis décalage de step.
+
+    :param index: Index datetime des candles
+    :param train: Durée in-sample (Timedelta ou chaîne pandas, ex: "90D")
+    :param test: Durée out-of-sample
+    :param step: Décalage entre deux fenêtres, test par défaut (fenêtres de test contiguës)
+    :return: Liste de (début in-sample, début out-of-sample, fin out-of-sample) en positions dans l'index
+    """
+    index = pd.DatetimeIndex(index)
+    train, test = pd.Timedelta(train), pd.Timedelta(test)
+    step = test if step is None else pd.Timedelta(step)
+
+    bounds = []
+    start = index[0]
+    while start + train <= index[-1]:
+        lo, mid, hi = index.searchsorted([start, start + train, start + train + test])
+        if hi > mid and mid > lo:
+            bounds.append((int(lo), int(mid), int(hi)))
+        start += step
+    return bounds
+
+def _prepared(params):
+    """
+    Colonnes d'indicateurs sur tout l'historique partagé, calculées une fois par jeu de paramètres
+    d'indicateurs et découpées ensuite pour chaque fenêtre : les fenêtres qui se chevauchent
+    réutilisent les mêmes valeurs, sans chauffe à refaire.
+    """
+    global _key, _frame
+    key = indicator_key(params)
+    if key != _key:
+        indicators = (params["rsi_window"], params["bb_period"], params["bb_num_std"])
+        _frame = add_indicators(sweep._candles, *indicators, cache=sweep._cache, dropna=False)
+        # Colonnes d'unités de temps supérieures : elles aussi chauffées sur tout l'historique
+        columns = LazyColumns(sweep._candles, *indicators, cache=sweep._cache)
+        for col in make_strategy(params).columns:
+            if col not in _frame.columns:
+                _frame[col] = columns[col]
+        _key = key
+    return _frame
+
+def _optimize(task):
+    """
+    Meilleure combinaison d'un lot sur une fenêtre in-sample, dans un worker.
+
+    :param task: (numéro de fenêtre, début, fin, lot de combinaisons aux mêmes indicateurs, objectif)
+    :return: (numéro de fenêtre, combinaison, valeur de l'objectif)
+    """
+    k, lo, hi, batch, objective = task
+    table = run_variants(_prepared(batch[0]).iloc[lo:hi], [make_strategy(params) for params in batch],
+                         leverage=[params["leverage"] for params in batch],
+                         spread=[params["spread"] for params in batch],
+                         margin_ratio=[params["margin_ratio"] for params in batch])
+    best = int(np.argmax(table[objective].to_numpy()))
+    return k, batch[best], float(table[objective].iloc[best])
+
+def _test(task):
+    """
+    Backtest out-of-sample d'une combinaison, dans un worker. Une position encore ouverte
+    à la fin de la fenêtre est clôturée sur la dernière candle ("end of window").
+
+    :param task: (numéro de fenêtre, début, fin, combinaison)
+    :return: (numéro de fenêtre, courbe de capital barre à barre pour une balance BALANCE, nombre de trades)
+    """
+    k, lo, hi, params = task
+    frame = _prepared(params).iloc[lo:hi]
+    bt = Backtester(frame, leverage=params["leverage"], spread=params["spread"],
+                    margin_ratio=params["margin_ratio"], strategy=make_strategy(params))
+    bt.run(mode="events")
+
+    if bt.position is not None:
+        # Sortie au prix des sorties de la stratégie ; comme après toute sortie, la candle de sortie vaut la balance à plat
+        close = float(frame["Close"].iloc[-1])
+        bt.bar = bt.marked = len(frame) - 1
+        bt.exit_trade("end of window", bt.position, bt.strategy.close_price(bt, close, bt.position), frame.index[-1])
+        bt.mark(len(frame))
+
+    results = bt.results()
+    return k, results["equity"].to_numpy(), results["number_of_trades"]
+
+def walk_forward(df, grid, train=TRAIN, test=TEST, step=None, objective="final_balance", balance=BALANCE, processes=None, cache_dir=None):
+    """
+    Optimisation walk-forward : pour chaque fenêtre glissante, la grille est optimisée sur la période
+    in-sample, puis la meilleure combinaison est testée sur la période out-of-sample qui suit.
+    Les fenêtres sont optimisées en parallèle (un lot de combinaisons aux mêmes indicateurs par tâche,
+    voir sweep) et les courbes out-of-sample sont raccordées bout à bout.
+
+    Chaque fenêtre démarre à plat ; la balance est composée d'une fenêtre à l'autre (la marge étant
+    une part de la balance, une fenêtre simulée avec BALANCE est remise à l'échelle de la balance courante).
+
+    :param df: Dataframe de candles brutes (Open/High/Low/Close), indexé par datetime
+    :param grid: dict paramètre -> liste de valeurs, voir sweep.DEFAULTS
+    :param train: Durée in-sample, voir windows
+    :param test: Durée out-of-sample
+    :param step: Décalage entre fenêtres, test par défaut ; plus court que test, les fenêtres de test se chevaucheraient
+    :param objective: Résultat in-sample à maximiser : "final_balance", "total_pnl" ou "number_of_trades"
+    :param balance: Balance au début de la première fenêtre out-of-sample
+    :param processes: Nombre de processus, tous les coeurs par défaut
+    :param cache_dir: Dossier du cache disque d'indicateurs (optionnel)
+    :return: dict "windows" (dataframe, une ligne par fenêtre : dates, paramètres retenus, objectif in-sample,
+        rendement et trades out-of-sample), "equity" (pandas.Series raccordée) et "final_balance"
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"walk_forward : objective must be one of {OBJECTIVES}")
+    if step is not None and pd.Timedelta(step) < pd.Timedelta(test):
+        raise ValueError("walk_forward : step must not be shorter than test, out-of-sample windows would overlap")
+
+    bounds = windows(df.index, train, test, step)
+    if not bounds:
+        raise ValueError("walk_forward : history is shorter than one train window")
+    combos = parameter_grid(grid)
+    processes = processes or os.cpu_count()
+
+    # Tâches triées par indicateurs puis par fenêtre : un worker garde les mêmes colonnes d'une tâche à l'autre
+    size = max(1, len(combos) * len(bounds) // (processes * 4))
+    tasks = [(k, lo, mid, batch, objective) for batch in batches(combos, size) for k, (lo, mid, hi) in enumerate(bounds)]
+
+    with shared_candles(df) as (name, n):
+        with Pool(processes, initializer=_init_worker, initargs=(name, n, cache_dir)) as pool:
+            best = {}
+            for k, params, score in pool.map(_optimize, tasks):
+                if k not in best or score > best[k][1]:
+                    best[k] = (params, score)
+
+            tests = [(k, mid, hi, best[k][0]) for k, (lo, mid, hi) in enumerate(bounds)]
+            tests.sort(key=lambda task: indicator_key(task[3]))
+            tested = sorted(pool.map(_test, tests), key=lambda result: result[0])
+
+    # Raccord des courbes out-of-sample, en composant les rendements des fenêtres
+    pieces, rows = [], []
+    carry = balance
+    for (k, equity, trades), (lo, mid, hi) in zip(tested, bounds):
+        piece = carry * equity / BALANCE
+        pieces.append(piece)
+        rows.append({
+            "train_start": df.index[lo],
+            "test_start": df.index[mid],
+            "test_end": df.index[hi - 1],
+            **best[k][0],
+            f"in_sample_{objective}": best[k][1],
+            "test_return": piece[-1] / carry - 1,
+            "test_trades": trades,
+        })
+        carry = float(piece[-1])
+
+    test_index = np.concatenate([np.arange(mid, hi) for lo, mid, hi in bounds])
+    return {
+        "windows": pd.DataFrame(rows),
+        "equity": pd.Series(np.concatenate(pieces), index=df.index[test_index], name="equity"),
+        "final_balance": carry,
+    }
+
+if __name__ == "__main__":
+    from loader import load_candles
+    from main import DATA_FILE
+
+    result = walk_forward(load_candles(DATA_FILE), {
+        "stop_pct": [0.002, 0.0036, 0.009],
+        "bb_period": [21, 30],
+        "take_profit": ["moymob", "band"],
+    })
+    print(result["windows"].to_string(index=False))
+    print(f"Balance finale out-of-sample : {result['final_balance']:.2f} €")
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Moteur de corrélation pour un univers d'actifs.
+Description :
+    Calcule les corrélations glissantes de Pearson de toutes les paires d'actifs, pour plusieurs
+    fenêtres à la fois, à partir de sommes cumulées (x, y, x², y², xy) : chaque fenêtre est
+    une différence de deux sommes, sans recalcul par fenêtre. Coût O(T·N²) pour T dates et N actifs.
+
+    Corrélations de rang : tau de Kendall (tau-b, algorithme de Knight en O(n log n) par comptage
+    des inversions d'un tri fusion) et rho de Spearman (Pearson des rangs moyens). Leurs versions
+    glissantes ne mettent pas à jour la fenêtre précédente : chaque fenêtre est recalculée à partir
+    des écarts entre ses observations, sans tri, pour toutes les dates à la fois en NumPy, en O(n·fenêtre).
+"""
+
+import numpy as np
+import pandas as pd
+
+WINDOWS = (20, 60, 120) # Fenêtres glissantes par défaut, en nombre d'observations
+BLOCK = 2048 # Paires traitées ensemble, pour borner la mémoire des produits xy
+CELLS = 1 << 22 # Rangs (fenêtre x dates) calculés ensemble par rolling_spearman, pour borner la mémoire
+
+def pairs(columns) -> list:
+    """
+    Paires d'actifs, dans l'ordre du dernier axe de rolling_correlation (triangle supérieur).
+
+    :@param columns: Noms des actifs
+    :return: Liste de tuples (actif 1, actif 2)
+    """
+    columns = list(columns)
+    first, second = np.triu_indices(len(columns), 1)
+    return [(columns[i], columns[j]) for i, j in zip(first, second)]
+
+def _window_sums(cumulative: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sommes glissantes sur window observations à partir de sommes cumulées précédées d'une ligne de zéros.
+    Les window - 1 premières lignes, incomplètes, valent NaN.
+    """
+    sums = np.full((cumulative.shape[0] - 1,) + cumulative.shape[1:], np.nan)
+    sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+def rolling_correlation(prices, windows=WINDOWS, dtype=np.float64, block: int = BLOCK) -> np.ndarray:
+    """
+    Corrélation glissante de Pearson de toutes les paires d'actifs, pour plusieurs fenêtres.
+
+    Les séries sont d'abord centrées sur leur moyenne (la corrélation n'en dépend pas) pour limiter
+    les erreurs d'arrondi des sommes cumulées. Comme pandas rolling(window).corr, une fenêtre qui
+    contient un NaN pour l'un des deux actifs donne NaN, et une série constante sur la fenêtre aussi.
+
+    :@param prices: Dataframe (ou tableau T x N) de séries, une colonne par actif
+    :@param windows: Longueurs des fenêtres glissantes
+    :@param dtype: Type du résultat (float32 pour diviser la mémoire par deux)
+    :@param block: Nombre de paires traitées ensemble
+    :return: Tableau de shape (fenêtres, dates, paires), les paires dans l'ordre de pairs(colonnes)
+    """
+    x = np.array(prices, dtype=np.float64)
+    if x.ndim != 2:
+        raise ValueError("rolling_correlation : prices must be two-dimensional (dates x assets)")
+    t, n = x.shape
+    windows = [int(window) for window in windows]
+    if any(window < 2 for window in windows):
+        raise ValueError("rolling_correlation : windows must be at least 2")
+
+    # Valeurs manquantes : exclues des sommes, et comptées pour invalider leurs fenêtres
+    missing = np.isnan(x)
+    with np.errstate(invalid="ignore"):
+        x -= np.nanmean(x, axis=0)
+    x[missing] = 0.0
+
+    def cumulative(values):
+        out = np.zeros((t + 1,) + values.shape[1:])
+        np.cumsum(values, axis=0, out=out[1:])
+        return out
+
+    # Longueur de la suite de valeurs identiques qui finit à chaque date : une fenêtre constante
+    # a une variance nulle, que les sommes cumulées ne donnent qu'aux arrondis près
+    rows = np.arange(t)[:, None]
+    changed = np.ones((t, n), dtype=bool)
+    changed[1:] = x[1:] != x[:-1]
+    run = rows - np.maximum.accumulate(np.where(changed, rows, 0), axis=0) + 1
+
+    # Sommes glissantes par actif, une fois par fenêtre : somme, écart (window·Σx² - (Σx)²), fenêtre invalide
+    sum_x, sum_xx, count_missing = cumulative(x), cumulative(x * x), cumulative(missing.astype(np.float64))
+    stats = []
+    for window in windows:
+        if window > t:
+            stats.append(None) # fenêtre plus longue que l'historique
+            continue
+        sx, sxx, gaps = (_window_sums(s, window) for s in (sum_x, sum_xx, count_missing))
+        spread = window * sxx - sx ** 2
+        with np.errstate(invalid="ignore"):
+            invalid = (gaps != 0) | (run >= window) | ~(spread > 0)
+        stats.append((sx, np.sqrt(np.where(invalid, np.nan, spread)), invalid))
+
+    first, second = np.triu_indices(n, 1)
+    result = np.full((len(windows), t, len(first)), np.nan, dtype=dtype)
+
+    for lo in range(0, len(first), block):
+        i, j = first[lo:lo + block], second[lo:lo + block]
+        sum_xy = cumulative(x[:, i] * x[:, j])
+
+        for k, window in enumerate(windows):
+            if stats[k] is None:
+                continue
+            sx, deviation, invalid = stats[k]
+            corr = _window_sums(sum_xy, window)
+            corr *= window
+            corr -= sx[:, i] * sx[:, j] # covariance (à un facteur window² près)
+            corr /= deviation[:, i] * deviation[:, j]
+            corr[invalid[:, i] | invalid[:, j]] = np.nan
+            np.clip(corr, -1.0, 1.0, out=corr)
+            result[k, :, lo:lo + len(i)] = corr
+
+    return result
+
+def correlation_series(corr: np.ndarray, prices: pd.DataFrame, windows, asset1: str, asset2: str, window: int) -> pd.Series:
+    """
+    Extrait d'un résultat de rolling_correlation la série d'une paire et d'une fenêtre.
+
+    :@param corr: Résultat de rolling_correlation
+    :@param prices: Dataframe passé à rolling_correlation
+    :@param windows: Fenêtres passées à rolling_correlation
+    :@param asset1: Premier actif
+    :@param asset2: Second actif
+    :@param window: Fenêtre voulue
+    :return: Série de corrélation indexée comme prices
+    """
+    columns = list(prices.columns)
+    i, j = sorted((columns.index(asset1), columns.index(asset2)))
+    n = len(columns)
+    pair = i * n - i * (i + 1) // 2 + (j - i - 1) # position de (i, j) dans le triangle supérieur
+    return pd.Series(corr[list(windows).index(window), :, pair], index=prices.index, name=f"{asset1}/{asset2}")
+
+def _pairs_without_nan(x, y) -> tuple:
+    """
+    Deux séries en tableaux float64, sans les observations où l'une des deux manque.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    if x.shape != y.shape or x.ndim != 1:
+        raise ValueError("correlation : x and y must be one-dimensional and of the same length")
+    keep = ~(np.isnan(x) | np.isnan(y))
+    return x[keep], y[keep]
+
+def _tied_pairs(sorted_values: np.ndarray) -> int:
+    """
+    Nombre de paires d'observations égales dans un tableau trié : somme de c(c-1)/2 par groupe d'égalité.
+    """
+    if len(sorted_values) == 0:
+        return 0
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_values)])
+    return int((counts * (counts - 1) // 2).sum())
+
+def inversions(codes: np.ndarray) -> int:
+    """
+    Nombre de paires i < j avec codes[i] > codes[j], par tri fusion ascendant vectorisé : à chaque niveau,
+    les blocs triés de largeur w sont fusionnés deux à deux, et chaque élément de droite compte les éléments
+    de gauche strictement plus grands (searchsorted sur les blocs de gauche décalés bout à bout).
+    O(n log n) : np.sort stable fusionne deux blocs déjà triés en temps linéaire.
+
+    :@param codes: Tableau d'entiers positifs (rangs denses)
+    :return: Nombre d'inversions
+    """
+    n = len(codes)
+    if n < 2:
+        return 0
+    top = int(codes.max()) + 1
+    size = 1 << (n - 1).bit_length()
+    runs = np.full(size, top, dtype=np.int64) # complété par une valeur plus grande que toutes, sans inversion
+    runs[:n] = codes
+
+    total = 0
+    width = 1
+    while width < size:
+        blocks = runs.reshape(-1, 2 * width)
+        offsets = np.arange(len(blocks), dtype=np.int64)[:, None] * (top + 1)
+        left = (blocks[:, :width] + offsets).ravel()
+        right = (blocks[:, width:] + offsets).ravel()
+
+        # Éléments de gauche <= chaque élément de droite, puis ceux qui sont strictement plus grands
+        not_greater = np.searchsorted(left, right, side="right") - np.repeat(np.arange(len(blocks)) * width, width)
+        total += int((width - not_greater).sum())
+
+        runs = np.sort(blocks, axis=1, kind="stable").ravel()
+        width *= 2
+    return total
+
+def kendall_tau(x, y) -> float:
+    """
+    Tau-b de Kendall (comme pandas corr(method="kendall")), algorithme de Knight en O(n log n) :
+    tri par x puis y, paires discordantes = inversions de y, corrections des égalités en x, en y et jointes.
+
+    :@param x: Première série
+    :@param y: Seconde série
+    :return: Tau-b, NaN si l'une des séries est constante ou s'il y a moins de deux observations
+    """
+    x, y = _pairs_without_nan(x, y)
+    n = len(x)
+    if n < 2:
+        return np.nan
+
+    order = np.lexsort((y, x))
+    xs, ys = x[order], y[order]
+    tied_x = _tied_pairs(xs)
+    tied_y = _tied_pairs(np.sort(ys))
+    # Égalités jointes : groupes consécutifs de (x, y) identiques après le tri lexicographique
+    same = np.r_[False, (xs[1:] == xs[:-1]) & (ys[1:] == ys[:-1])]
+    starts = np.flatnonzero(~same)
+    counts = np.diff(np.r_[starts, n])
+    tied_xy = int((counts * (counts - 1) // 2).sum())
+
+    # Les égalités en x sont triées par y croissant : elles ne comptent pas comme inversions
+    discordant = inversions(np.unique(ys, return_inverse=True)[1].ravel())
+
+    total = n * (n - 1) // 2
+    denominator = (total - tied_x) * (total - tied_y)
+    if denominator == 0:
+        return np.nan
+    return (total - tied_x - tied_y + tied_xy - 2 * discordant) / np.sqrt(float(denominator))
+
+def rank(values) -> np.ndarray:
+    """
+    Rangs (à partir de 1) d'une série, les égalités recevant leur rang moyen, comme pandas rank().
+
+    :@param values: Série sans NaN
+    :return: Tableau float64 des rangs
+    """
+    values = np.asarray(values, dtype=np.float64)
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat(starts + (counts + 1) / 2, counts)
+    return ranks
+
+def spearman(x, y) -> float:
+    """
+    Rho de Spearman : corrélation de Pearson des rangs moyens, en O(n log n).
+
+    :@param x: Première série
+    :@param y: Seconde série
+    :return: Rho, NaN si l'une des séries est constante ou s'il y a moins de deux observations
+    """
+    x, y = _pairs_without_nan(x, y)
+    if len(x) < 2:
+        return np.nan
+    rx, ry = rank(x), rank(y)
+    rx -= rx.mean()
+    ry -= ry.mean()
+    denominator = np.sqrt(np.dot(rx, rx) * np.dot(ry, ry))
+    return np.dot(rx, ry) / denominator if denominator > 0 else np.nan
+
+def _windows_with_nan(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    """
+    Pour chaque date, True si la fenêtre qui s'y termine contient un NaN (ou est incomplète).
+    """
+    missing = np.r_[0, np.cumsum(np.isnan(x) | np.isnan(y))]
+    invalid = np.ones(len(x), dtype=bool)
+    invalid[window - 1:] = (missing[window:] - missing[:-window]) > 0
+    return invalid
+
+def rolling_kendall(x, y, window: int) -> np.ndarray:
+    """
+    Tau-b de Kendall glissant, chaque fenêtre recalculée sur toutes ses paires (pas de mise à jour
+    de la fenêtre précédente) : pour chaque écart k entre les deux observations d'une paire, les
+    contributions sign(dx)·sign(dy) et les égalités des paires de la fenêtre sont une différence de
+    sommes cumulées, pour toutes les dates à la fois. Coût O(n·window) en NumPy, sans tri par fenêtre.
+
+    :@param x: Première série
+    :@param y: Seconde série
+    :@param window: Nombre d'observations de la fenêtre
+    :return: Tableau float64 aligné sur x, NaN pour les fenêtres incomplètes ou qui contiennent un NaN
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if window < 2 or window > n:
+        return out
+
+    score = np.zeros(n - window + 1, dtype=np.int64) # concordantes - discordantes
+    tied_x = np.zeros(n - window + 1, dtype=np.int64)
+    tied_y = np.zeros(n - window + 1, dtype=np.int64)
+    ends = np.arange(window - 1, n) # dernière observation de chaque fenêtre
+
+    with np.errstate(invalid="ignore"):
+        for k in range(1, window):
+            dx = x[k:] - x[:-k] # paires (p, p + k), indexées par p
+            dy = y[k:] - y[:-k]
+            # Paires de la fenêtre qui finit en t : p de t - window + 1 à t - k
+            lo, hi = ends - window + 1, ends - k + 1
+            for total, values in ((score, np.sign(dx) * np.sign(dy)), (tied_x, dx == 0), (tied_y, dy == 0)):
+                cumulative = np.r_[0, np.cumsum(np.nan_to_num(values), dtype=np.int64)]
+                total += cumulative[hi] - cumulative[lo]
+
+    pairs_count = window * (window - 1) // 2
+    denominator = (pairs_count - tied_x) * (pairs_count - tied_y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[window - 1:] = np.where(denominator > 0, score / np.sqrt(denominator.astype(np.float64)), np.nan)
+    out[_windows_with_nan(x, y, window)] = np.nan
+    return out
+
+def rolling_spearman(x, y, window: int, cells: int = CELLS) -> np.ndarray:
+    """
+    Rho de Spearman glissant, sans tri ni boucle par date : les rangs de chaque fenêtre sont recalculés
+    (pas de mise à jour de la fenêtre précédente). Le rang centré (rang moyen - (window + 1) / 2)
+    d'une observation p dans une fenêtre vaut 1/2·Σ sign(v_p - v_q) sur les autres observations q de la
+    fenêtre : c'est une somme de signes sur les écarts p - q = ±k, séparée en une partie vers l'avant et une
+    partie vers l'arrière, obtenues pour toutes les dates à la fois en cumulant les écarts k = 1..window - 1.
+    Les rangs doublés sont des entiers, les sommes de produits sont exactes. Coût O(n·window) en NumPy,
+    les dates étant traitées par blocs de cells / window.
+
+    :@param x: Première série
+    :@param y: Seconde série
+    :@param window: Nombre d'observations de la fenêtre
+    :@param cells: Nombre de rangs (fenêtre x dates) gardés en mémoire à la fois
+    :return: Tableau float64 aligné sur x, NaN pour les fenêtres incomplètes ou qui contiennent un NaN
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if window < 2 or window > n:
+        return out
+    invalid = _windows_with_nan(x, y, window)
+    # Un NaN est remplacé par 0 : les fenêtres qui le contiennent sont invalidées
+    values = np.nan_to_num(np.vstack([x, y]))
+
+    block = max(cells // window, 1)
+    for start in range(window - 1, n, block):
+        stop = min(start + block, n)
+        v = values[:, start - window + 1:stop] # observations des fenêtres qui finissent de start à stop - 1
+        m = v.shape[1]
+
+        # backward[k][:, p] = Σ sign(v_p - v_{p-i}) pour i = 1..k
+        backward = np.zeros((window, 2, m), dtype=np.int32)
+        for k in range(1, window):
+            backward[k] = backward[k - 1]
+            backward[k][:, k:] += np.sign(v[:, k:] - v[:, :-k]).astype(np.int32)
+
+        # forward[:, p] = Σ sign(v_p - v_{p+i}) pour i = 1..j ; l'observation p = t - j de la fenêtre
+        # qui finit en t a j observations après elle et window - 1 - j avant
+        forward = np.zeros((2, m), dtype=np.int32)
+        sxy = np.zeros(m - window + 1, dtype=np.int64)
+        sxx = np.zeros(m - window + 1, dtype=np.int64)
+        syy = np.zeros(m - window + 1, dtype=np.int64)
+        for j in range(window):
+            if j:
+                forward[:, :m - j] += np.sign(v[:, :m - j] - v[:, j:]).astype(np.int32)
+            lo, hi = window - 1 - j, m - j
+            ranks = (forward[:, lo:hi] + backward[window - 1 - j][:, lo:hi]).astype(np.int64) # rangs centrés doublés
+            sxy += ranks[0] * ranks[1]
+            sxx += ranks[0] * ranks[0]
+            syy += ranks[1] * ranks[1]
+
+        denominator = np.sqrt(sxx.astype(np.float64) * syy)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[start:stop] = np.where(denominator > 0, sxy / denominator, np.nan)
+
+    out[invalid] = np.nan
+    return out
+
+def main():
+    from market_data import download_prices
+
+    # Or, argent, platine, cuivre et quelques indices
+    tickers = ["GC=F", "SI=F", "PL=F", "HG=F", "^GSPC", "^IXIC", "^STOXX50E", "^N225"]
+    prices = download_prices(tickers, start = "2015-01-01")
+    returns = prices.pct_change(fill_method=None)
+
+    corr = rolling_correlation(returns, WINDOWS)
+
+    # Dernière corrélation de chaque paire, pour chaque fenêtre
+    last = pd.DataFrame(corr[:, -1, :].T, index=pd.MultiIndex.from_tuples(pairs(tickers)), columns=[f"{w}j" for w in WINDOWS])
+    print(last.sort_values(f"{WINDOWS[1]}j", ascending=False).to_string(float_format="{:.2f}".format))
+
+if __name__ == "__main__":
+    main()
@@ -7,29 +7,20 @@ Description :
     calcule leur corrélation et produit une visualisation claire.
 """
 
-import yfinance as yf
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
+import sys
 
-def download_data(ticker: str, start: str = "2015-01-01", end: str = None) -> pd.Series:
-    """
-    Télécharge les prix de clôture d’un actif.
-    
-    :@param ticker: Ticker de l'actif à télécharger (ex: AAPL)
-    :@param start: Date de début de la série à télécharger (format: YYYY-MM-DD)
-    :@param end: Date de fin de la série à télécharger (format: YYYY-MM-DD)
-    :return: Une série de prix de fermeture de l'actif courant sur la période donnée
-    """
-    # On télécharge le dataframe des données de prix de l'actif 
-    dataframe = yf.download(ticker, start=start, end=end, progress=False)
+import pandas as pd
+from matplotlib.figure import Figure
 
-    # On récupère uniquement le prix de cloture de l'actif en une série
-    serie_closeprice = dataframe['Close']
+from correlation import kendall_tau, spearman
+from market_data import download_prices
 
-    # on renomme cette série avec le nom ticker de l'actif courant
-    # serie_closeprice.rename(ticker)
+# Même sous-échantillonnage que les rapports du backtester (Calgary/report.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Calgary"))
+from report import POINTS, downsample
 
-    return serie_closeprice
+PLOT_FILE = "./data/gold_silver_correlation.png" # Graphique écrit par main, hors des fichiers du dépôt
 
 def compute_correlation(series1: pd.Series, series2: pd.Series, window: int = 60) -> pd.Series:
     """
@@ -50,48 +41,61 @@ def compute_correlation(series1: pd.Series, series2: pd.Series, window: int = 60
 
     return coef_correlation
 
-def plot_correlation(prices: pd.DataFrame, rolling_corr: pd.Series):
+def plot_correlation(prices: pd.DataFrame, rolling_corr: pd.Series, path: str = PLOT_FILE, points: int = POINTS, method: str = "minmax") -> str:
     """
-    Affiche les courbes de prix et leur corrélation glissante.
+    Écrit dans un fichier les courbes de prix et leur corrélation glissante (sans affichage,
+    fonctionne sur un serveur sans écran). Chaque courbe est sous-échantillonnée à points points.
 
     :@param prices: dataframe à afficher
     :@param rolling_corr: corrélation glissante
+    :@param path: fichier image à écrire (.png, .svg, .pdf...), son dossier est créé si besoin
+    :@param points: nombre de points dessinés au plus par courbe
+    :@param method: sous-échantillonnage, "minmax" ou "lttb" (voir report.downsample)
+    :return: Le chemin du fichier écrit
     """
-    fig, ax1 = plt.subplots(figsize=(10, 6))
+    fig = Figure(figsize=(10, 6))
+    ax1 = fig.subplots()
 
     ax1.set_title("Corrélation entre l'Or et l'Argent", fontsize=14)
-    ax1.plot(prices.index, prices["GC=F"]/prices["GC=F"].iloc[0], label="Or (normalisé)", color="gold")
-    ax1.plot(prices.index, prices["SI=F"]/prices["SI=F"].iloc[0], label="Argent (normalisé)", color="silver")
+    ax1.plot(*downsample(prices.index, prices["GC=F"]/prices["GC=F"].iloc[0], points, method), label="Or (normalisé)", color="gold")
+    ax1.plot(*downsample(prices.index, prices["SI=F"]/prices["SI=F"].iloc[0], points, method), label="Argent (normalisé)", color="silver")
     ax1.set_ylabel("Prix normalisé")
     ax1.legend(loc="upper left")
 
     ax2 = ax1.twinx()
-    ax2.plot(rolling_corr.index, rolling_corr, color="black", linestyle="solid", label="Corrélation 60j")
+    ax2.plot(*downsample(rolling_corr.index, rolling_corr, points, method), color="black", linestyle="solid", label="Corrélation 60j")
     ax2.set_ylabel("Corrélation")
     ax2.legend(loc="lower right")
 
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(path)
+    return path
 
-def main():
+def main(path: str = PLOT_FILE):
+    """
+    :@param path: fichier où écrire le graphique de corrélation
+    """
     # On télécharge les données de l'or et de l'argent
     # "=F" car on parle des contrats à terme sur l'or et l'argent, Yahoo ne fournissant pas de prix spot sur ces actifs
-    gold = download_data("GC=F", start = "2015-01-01")
-    silver = download_data("SI=F", start = "2015-01-01")
-
-    # On concatène les séries gold et silver et on supprime les valeurs nulles
-    prices = pd.concat([gold, silver], axis=1).dropna()
+    # Un seul appel pour les deux actifs, lus depuis le cache local si déjà téléchargés
+    # On supprime les jours où l'un des deux n'a pas coté
+    prices = download_prices(["GC=F", "SI=F"], start = "2015-01-01").dropna()
 
     # On calcule la corrélation glissante des deux actifs 
     rolling_corr = compute_correlation(prices["GC=F"], prices["SI=F"])
 
-    # On affiche un graphique de visualisation de la corrélation de l'or et de l'argent
-    # plot_correlation(prices, rolling_corr)
+    # On écrit un graphique de visualisation de la corrélation de l'or et de l'argent
+    print(f"Graphique : {plot_correlation(prices, rolling_corr, path)}")
 
     # On calcule simplement le coeffcient de corrélation entre l'or et l'argent et on l'affiche (2 chiffres après la virgule)
-    print(f"Corrélation moyenne Pearson : {prices['GC=F'].corr(prices['SI=F'], method = "pearson"):.2f}")
-    print(f"Corrélation moyenne Kendall's Tau : {prices['GC=F'].corr(prices['SI=F'], method = "kendall"):.2f}")
-    print(f"Corrélation moyenne Spearman: {prices['GC=F'].corr(prices['SI=F'], method = "spearman"):.2f}")
+    # Kendall et Spearman en O(n log n) (le Kendall de pandas compare toutes les paires, en O(n²))
+    print(f"Corrélation moyenne Pearson : {prices['GC=F'].corr(prices['SI=F'], method='pearson'):.2f}")
+    print(f"Corrélation moyenne Kendall's Tau : {kendall_tau(prices['GC=F'], prices['SI=F']):.2f}")
+    print(f"Corrélation moyenne Spearman: {spearman(prices['GC=F'], prices['SI=F']):.2f}")
 
 if __name__ == "__main__":
-    main()
+    # Chemin du graphique en argument, PLOT_FILE par défaut
+    main(*sys.argv[1:2])
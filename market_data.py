@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Données de marché partagées par les scripts d'analyse.
+Description :
+    Télécharge les prix OHLC journaliers (Yahoo Finance par défaut) et les garde dans un
+    cache local en colonnes (un fichier .npy par colonne et par ticker). Seules les périodes
+    absentes du cache sont téléchargées, en un seul appel groupé par période manquante, les
+    appels étant lancés en parallèle. Hors ligne, tout est lu depuis le cache.
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = "./market_data" # Dossier du cache local
+COLUMNS = ("Open", "High", "Low", "Close", "Adj Close", "Volume") # Colonnes conservées
+WORKERS = 4 # Téléchargements simultanés
+OFFLINE = os.environ.get("MARKET_DATA_OFFLINE") == "1" # Mode hors ligne par défaut
+
+class YahooSource:
+    """
+    Source Yahoo Finance : un téléchargement Ticker.history par ticker, les tickers d'une même période
+    en parallèle. yf.download n'est pas utilisé : il range ses résultats dans un état global remis à zéro
+    à chaque appel, deux appels simultanés se mélangeraient.
+    """
+    locks = {} # ticker -> verrou : un seul téléchargement à la fois par ticker, les autres tickers en parallèle
+    guard = threading.Lock() # protège locks
+
+    @classmethod
+    def lock(cls, ticker: str) -> threading.Lock:
+        with cls.guard:
+            return cls.locks.setdefault(ticker, threading.Lock())
+
+    def history(self, ticker: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """
+        :@param ticker: Ticker à télécharger
+        :@param start: Premier jour inclus
+        :@param end: Dernier jour exclu
+        :return: Dataframe OHLC indexé par date (sans fuseau horaire, comme yf.download)
+        """
+        import yfinance as yf
+
+        with self.lock(ticker):
+            frame = yf.Ticker(ticker).history(start=start.strftime("%Y-%m-%d"), end=end.strftime("%Y-%m-%d"),
+                                              auto_adjust=False, actions=False)
+        if isinstance(frame.index, pd.DatetimeIndex) and frame.index.tz is not None:
+            frame.index = frame.index.tz_localize(None)
+        frame.index.name = "Date"
+        return frame.dropna(how="all")
+
+    def fetch(self, tickers: list, start: pd.Timestamp, end: pd.Timestamp) -> dict:
+        """
+        :@param tickers: Tickers à télécharger
+        :@param start: Premier jour inclus
+        :@param end: Dernier jour exclu
+        :return: dict ticker -> dataframe OHLC indexé par date
+        """
+        with ThreadPoolExecutor(max_workers=min(WORKERS, len(tickers))) as pool:
+            frames = pool.map(lambda ticker: self.history(ticker, start, end), tickers)
+            return dict(zip(tickers, frames))
+
+class LocalSource:
+    """
+    Source locale, à la place de Yahoo pour les tests et les runs sans réseau :
+    des dataframes en mémoire ou des fichiers CSV <ticker>.csv (colonne Date + OHLC) d'un dossier.
+    Les appels reçus sont notés dans calls.
+    """
+
+    def __init__(self, frames: dict = None, directory: str = None):
+        """
+        :@param frames: dict ticker -> dataframe OHLC indexé par date
+        :@param directory: Dossier des fichiers <ticker>.csv
+        """
+        self.frames = dict(frames or {})
+        self.directory = directory
+        self.calls = []
+
+    def _frame(self, ticker: str) -> pd.DataFrame:
+        if ticker not in self.frames and self.directory is not None:
+            path = os.path.join(self.directory, f"{ticker}.csv")
+            if os.path.exists(path):
+                self.frames[ticker] = pd.read_csv(path, index_col="Date", parse_dates=True)
+        return self.frames.get(ticker, pd.DataFrame())
+
+    def fetch(self, tickers: list, start: pd.Timestamp, end: pd.Timestamp) -> dict:
+        self.calls.append((list(tickers), start, end))
+        frames = {}
+        for ticker in tickers:
+            frame = self._frame(ticker)
+            frames[ticker] = frame[(frame.index >= start) & (frame.index < end)] if len(frame) else frame
+        return frames
+
+def _day(date) -> pd.Timestamp:
+    date = pd.Timestamp(date)
+    return (date.tz_localize(None) if date.tzinfo else date).normalize()
+
+def _merge(ranges: list) -> list:
+    """
+    Fusionne des périodes [début, fin) qui se chevauchent ou se touchent.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def _missing(ranges: list, start: pd.Timestamp, end: pd.Timestamp) -> list:
+    """
+    Périodes de [start, end) qui ne sont pas couvertes par ranges.
+    """
+    missing = []
+    cursor = start
+    for lo, hi in ranges:
+        lo, hi = pd.Timestamp(lo), pd.Timestamp(hi)
+        if hi <= cursor or lo >= end:
+            continue
+        if lo > cursor:
+            missing.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+class MarketData:
+    def __init__(self, directory: str = CACHE_DIR, source=None, offline: bool = OFFLINE, workers: int = WORKERS):
+        """
+        Cache local de prix journaliers, par ticker : datetime.npy (int64 ns), une colonne .npy par prix
+        et meta.json avec les périodes déjà téléchargées (même celles sans cotation, jours fériés...).
+
+        :@param directory: Dossier du cache
+        :@param source: Source des données (YahooSource par défaut, LocalSource pour les tests)
+        :@param offline: N'appelle jamais la source : seules les données du cache sont renvoyées
+        :@param workers: Nombre de téléchargements lancés en parallèle
+        """
+        self.directory = directory
+        self.source = source if source is not None else YahooSource()
+        self.offline = offline
+        self.workers = workers
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.directory, ticker.replace("/", "_"))
+
+    def _meta(self, ticker: str) -> dict:
+        try:
+            with open(os.path.join(self._path(ticker), "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"ranges": [], "columns": []}
+
+    def read(self, ticker: str) -> pd.DataFrame:
+        """
+        Toutes les lignes en cache d'un ticker.
+
+        :@param ticker: Ticker de l'actif
+        :return: Dataframe OHLC indexé par date, vide si le ticker n'est pas en cache
+        """
+        meta = self._meta(ticker)
+        path = self._path(ticker)
+        if not meta["columns"]:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+        index = pd.DatetimeIndex(np.load(os.path.join(path, "datetime.npy")).view("datetime64[ns]"), name="Date")
+        return pd.DataFrame({col: np.load(os.path.join(path, f"{col}.npy")) for col in meta["columns"]}, index=index)
+
+    def _write(self, ticker: str, frame: pd.DataFrame, ranges: list):
+        """
+        Ajoute des lignes au cache d'un ticker (les lignes déjà présentes aux mêmes dates sont remplacées)
+        et enregistre les périodes couvertes. meta.json est écrit en dernier.
+        """
+        path = self._path(ticker)
+        os.makedirs(path, exist_ok=True)
+        meta = self._meta(ticker)
+
+        frame = frame[[col for col in COLUMNS if col in frame.columns]]
+        if len(frame):
+            index = pd.DatetimeIndex(frame.index, name="Date")
+            frame = frame.set_axis(index.tz_localize(None) if index.tz else index, axis=0)
+            merged = pd.concat([self.read(ticker), frame.astype(np.float64)])
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            columns = [col for col in COLUMNS if col in merged.columns]
+            values = {"datetime": merged.index.as_unit("ns").asi8}
+            values.update({col: merged[col].to_numpy(dtype=np.float64) for col in columns})
+            for col, column in values.items():
+                tmp = os.path.join(path, f"{col}.tmp.npy")
+                np.save(tmp, column)
+                os.replace(tmp, os.path.join(path, f"{col}.npy"))
+            meta["columns"] = columns
+
+        meta["ranges"] = [[str(lo), str(hi)] for lo, hi in _merge(
+            [(pd.Timestamp(lo), pd.Timestamp(hi)) for lo, hi in meta["ranges"]] + list(ranges))]
+        tmp = os.path.join(path, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, "meta.json"))
+
+    def update(self, tickers: list, start="2015-01-01", end=None):
+        """
+        Télécharge les périodes de [start, end) absentes du cache. Les tickers qui manquent la même période
+        sont demandés en un seul appel, et les appels sont lancés en parallèle. Le jour en cours n'est
+        jamais marqué comme couvert : sa barre n'est pas terminée et sera retéléchargée.
+
+        :@param tickers: Tickers des actifs
+        :@param start: Date de début (incluse)
+        :@param end: Date de fin (exclue), aujourd'hui par défaut
+        """
+        if self.offline:
+            return
+        today = pd.Timestamp.today().normalize()
+        start = _day(start)
+        tomorrow = today + pd.Timedelta(days=1)
+        end = tomorrow if end is None else min(_day(end), tomorrow)
+
+        # Tickers regroupés par période manquante
+        requests = {}
+        for ticker in dict.fromkeys(tickers):
+            ranges = [(pd.Timestamp(lo), pd.Timestamp(hi)) for lo, hi in self._meta(ticker)["ranges"]]
+            for period in _missing(ranges, start, end):
+                requests.setdefault(period, []).append(ticker)
+        if not requests:
+            return
+
+        def fetch(item):
+            (lo, hi), group = item
+            return lo, hi, self.source.fetch(group, lo, hi)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(fetch, requests.items()))
+
+        # Écritures dans ce thread : un ticker peut apparaître dans plusieurs périodes
+        for lo, hi, frames in results:
+            for ticker, frame in frames.items():
+                self._write(ticker, frame, [(lo, min(hi, today))] if lo < min(hi, today) else [])
+
+    def prices(self, tickers: list, start="2015-01-01", end=None, column: str = "Close") -> pd.DataFrame:
+        """
+        Prix de plusieurs actifs, une colonne par ticker, téléchargés seulement s'ils manquent au cache.
+
+        :@param tickers: Tickers des actifs
+        :@param start: Date de début (incluse)
+        :@param end: Date de fin (exclue), aujourd'hui par défaut
+        :@param column: Prix à renvoyer ("Close", "Open"...)
+        :return: Dataframe indexé par date, NaN les jours où un actif n'a pas coté
+        """
+        self.update(tickers, start, end)
+        series = []
+        for ticker in tickers:
+            frame = self.ohlc(ticker, start, end, update=False)
+            series.append((frame[column] if column in frame.columns else pd.Series(dtype=np.float64, index=frame.index)).rename(ticker))
+        return pd.concat(series, axis=1)
+
+    def ohlc(self, ticker: str, start="2015-01-01", end=None, update: bool = True) -> pd.DataFrame:
+        """
+        Prix OHLC d'un actif sur [start, end).
+
+        :@param ticker: Ticker de l'actif
+        :@param start: Date de début (incluse)
+        :@param end: Date de fin (exclue), toutes les données en cache par défaut
+        :@param update: Télécharge d'abord les périodes manquantes
+        """
+        if update:
+            self.update([ticker], start, end)
+        frame = self.read(ticker)
+        keep = frame.index >= _day(start)
+        if end is not None:
+            keep &= frame.index < _day(end)
+        return frame[keep]
+
+def download_prices(tickers: list, start: str = "2015-01-01", end: str = None, column: str = "Close") -> pd.DataFrame:
+    """
+    Prix de clôture de plusieurs actifs, depuis le cache local CACHE_DIR.
+
+    :@param tickers: Tickers des actifs (ex: ["GC=F", "SI=F"])
+    :@param start: Date de début de la série (format: YYYY-MM-DD)
+    :@param end: Date de fin de la série (format: YYYY-MM-DD)
+    :@param column: Prix à renvoyer
+    :return: Un dataframe de prix, une colonne par ticker
+    """
+    return MarketData().prices(tickers, start, end, column)
+
+def download_data(ticker: str, start: str = "2015-01-01", end: str = None) -> pd.Series:
+    """
+    Prix de clôture d'un actif, depuis le cache local CACHE_DIR.
+
+    :@param ticker: Ticker de l'actif à télécharger (ex: AAPL)
+    :@param start: Date de début de la série à télécharger (format: YYYY-MM-DD)
+    :@param end: Date de fin de la série à télécharger (format: YYYY-MM-DD)
+    :return: Une série de prix de fermeture nommée par le ticker
+    """
+    return download_prices([ticker], start, end)[ticker]
@@ -0,0 +1,29 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Les modules sont importés par leur nom, comme quand les scripts sont lancés depuis leur dossier
+sys.path[:0] = [os.path.join(ROOT, "Calgary"), ROOT]
+
+def make_candles(n=20000, seed=0, start="2020-01-01"):
+    """
+    Candles minute synthétiques (marche aléatoire autour de 2000, prix arrondis au centime),
+    indexées par datetime comme loader.load_candles.
+    """
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 0.6, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.random(n) * 0.5
+    low = np.minimum(open_, close) - rng.random(n) * 0.5
+    index = pd.date_range(start, periods=n, freq="min", name="datetime")
+    return pd.DataFrame({"Open": open_.round(2), "High": high.round(2), "Low": low.round(2), "Close": close.round(2)},
+                        index=index)
+
+@pytest.fixture(scope="session")
+def candles():
+    return make_candles()
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+import maths
+from cache import IndicatorCache
+
+def test_hit_and_miss(candles):
+    cache = IndicatorCache()
+    close = candles["Close"]
+    first = cache.rsi(close, 13)
+    second = cache.rsi(close, 13)
+    assert (cache.hits, cache.misses) == (1, 1)
+    pd.testing.assert_series_equal(first, maths.rsi(close, 13), check_names=False)
+    pd.testing.assert_series_equal(first, second)
+
+    # Autres paramètres : autre entrée
+    ma, upper, lower = cache.bollinger_bands(close, 21, 2)
+    cache.bollinger_bands(close, 25, 2)
+    assert cache.misses == 3
+    expected = maths.bollinger_bands(close, 21, 2)
+    for column, reference in zip((ma, upper, lower), expected):
+        pd.testing.assert_series_equal(column, reference, check_names=False)
+
+def test_entries_are_read_only(candles):
+    cache = IndicatorCache()
+    values = cache.sma(candles["Close"], 50).to_numpy()
+    assert not values.flags.writeable
+
+def test_lru_eviction(candles):
+    close = candles["Close"]
+    column = len(close) * 8
+    cache = IndicatorCache(max_bytes=2 * column)
+    cache.sma(close, 10)
+    cache.sma(close, 20)
+    cache.sma(close, 10) # 10 redevient la plus récente
+    cache.sma(close, 30) # évince 20
+    assert cache.nbytes == 2 * column
+    hits = cache.hits
+    cache.sma(close, 10)
+    assert cache.hits == hits + 1
+    misses = cache.misses
+    cache.sma(close, 20)
+    assert cache.misses == misses + 1
+
+def test_stale_entry_after_data_change(candles):
+    cache = IndicatorCache()
+    close = candles["Close"]
+    cache.sma(close, 50)
+    changed = close.copy()
+    changed.iloc[-1] += 1.0
+    result = cache.sma(changed, 50)
+    assert cache.misses == 2
+    assert result.iloc[-1] == maths.sma(changed, 50).iloc[-1] != maths.sma(close, 50).iloc[-1]
+
+def test_disk_entries_reused(tmp_path, candles):
+    close = candles["Close"]
+    IndicatorCache(directory=str(tmp_path)).bollinger_bands(close, 21, 2)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    cache = IndicatorCache(directory=str(tmp_path))
+    ma, upper, lower = cache.bollinger_bands(close, 21, 2)
+    assert (cache.hits, cache.misses) == (1, 0)
+    np.testing.assert_array_equal(upper.to_numpy(), maths.bollinger_bands(close, 21, 2)[1].to_numpy())
+
+def test_resampled_bars_shared_by_dataset(tmp_path, candles):
+    from columns import LazyColumns
+    from timeframes import resample
+
+    cache = IndicatorCache()
+    first = LazyColumns(candles, cache=cache)["SMA50_H1"]
+    misses = cache.misses
+    # Autre LazyColumns sur les mêmes candles : bars et SMA relues depuis le cache
+    second = LazyColumns(candles.copy(), cache=cache)["SMA50_H1"]
+    assert cache.misses == misses
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_array_equal(first, LazyColumns(candles)["SMA50_H1"])
+
+    # Mêmes prix à d'autres dates : autres bars
+    shifted = candles.set_index(candles.index + pd.Timedelta("30min"))
+    bars, known_at = cache.resample(shifted, "H1")
+    expected, expected_known = resample(shifted, "H1")
+    pd.testing.assert_frame_equal(bars, expected)
+    np.testing.assert_array_equal(known_at, expected_known)
+    assert cache.misses == misses + 1
+
+    # Cache disque
+    IndicatorCache(directory=str(tmp_path)).resample(candles, "H4")
+    disk = IndicatorCache(directory=str(tmp_path))
+    bars, known_at = disk.resample(candles, "H4")
+    assert (disk.hits, disk.misses) == (1, 0)
+    pd.testing.assert_frame_equal(bars, resample(candles, "H4")[0])
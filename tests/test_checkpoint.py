@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Backtester import Backtester
+from conftest import make_candles
+from journal import TradeJournal
+from maths import add_indicators
+from streaming import COLUMNS, StrategyIndicators
+from strategies import LimitEntry, MeanReversion
+
+def flat_candles():
+    """
+    Candles avec des séries de clôtures identiques plus longues que la fenêtre de Bollinger.
+    """
+    df = make_candles(seed=1)
+    close = df["Close"].to_numpy().copy()
+    for start, length in ((3000, 30), (7000, 21), (9000, 60), (14000, 25)):
+        close[start:start + length] = close[start]
+    df["Close"] = close
+    df["High"] = np.maximum(df["High"], close)
+    df["Low"] = np.minimum(df["Low"], close)
+    return df
+
+def test_streaming_indicators_match_full_computation():
+    df = flat_candles()
+    expected = add_indicators(df[["Open", "High", "Low", "Close"]].copy(), 13, 21, 2)
+
+    indicators = StrategyIndicators(13, 21, 2)
+    rows = [row for row in (indicators.update(*values) for values in df[["Open", "High", "Low", "Close"]].itertuples(index=False)) if row is not None]
+    streamed = pd.DataFrame(rows, index=expected.index)
+    for col in COLUMNS:
+        assert np.array_equal(streamed[col].to_numpy(), expected[col].to_numpy()), col
+
+@pytest.mark.parametrize("strategy", [MeanReversion(), MeanReversion(trailing=True), LimitEntry()], ids=["default", "trailing", "limit"])
+def test_resume_matches_full_run(tmp_path, strategy):
+    df = flat_candles()
+    full = Backtester(df, strategy=strategy).run(mode="events")
+
+    checkpoint = str(tmp_path / "run.checkpoint")
+    for stop in (5000, 12000, len(df)):
+        bt = Backtester(df.iloc[:stop], strategy=strategy, journal=TradeJournal(capacity=16, directory=str(tmp_path / "journal")))
+        results = bt.run(mode="events", checkpoint=checkpoint)
+
+    assert full["number_of_trades"] > 0
+    assert results["all_trades"] == full["all_trades"]
+    assert results["final_balance"] == full["final_balance"]
+    assert results["journal"].to_frame().equals(full["journal"].to_frame())
+    assert results["equity"].equals(full["equity"])
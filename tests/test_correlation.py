@@ -0,0 +1,140 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import (correlation_series, inversions, kendall_tau, pairs, rolling_correlation, rolling_kendall,
+                         rolling_spearman, spearman)
+
+def brute_kendall(x, y):
+    """
+    Tau-b de Kendall par comparaison de toutes les paires d'observations.
+    """
+    keep = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[keep], y[keep]
+    concordant = discordant = tied_x = tied_y = 0
+    for i, j in itertools.combinations(range(len(x)), 2):
+        sx, sy = np.sign(x[i] - x[j]), np.sign(y[i] - y[j])
+        concordant += sx * sy > 0
+        discordant += sx * sy < 0
+        tied_x += sx == 0
+        tied_y += sy == 0
+    total = len(x) * (len(x) - 1) // 2
+    denominator = np.sqrt(float((total - tied_x) * (total - tied_y)))
+    return (concordant - discordant) / denominator if denominator else np.nan
+
+def series(seed, n=300, levels=None):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=n) if levels is None else rng.integers(0, levels, n).astype(np.float64)
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(400, 4)).cumsum(axis=0), columns=list("ABCD"))
+    df.iloc[50:53, 1] = np.nan
+    df.iloc[100:130, 2] = 7.0 # série constante sur plus d'une fenêtre
+    df["D"] = df["A"] * 2 + rng.normal(scale=0.1, size=400) # très corrélée à A
+    return df
+
+def test_rolling_correlation_matches_pandas(prices):
+    windows = (5, 20, 60)
+    corr = rolling_correlation(prices, windows)
+    assert corr.shape == (3, len(prices), 6)
+    for window in windows:
+        for a, b in pairs(prices.columns):
+            expected = prices[a].rolling(window).corr(prices[b])
+            # pandas donne ±inf ou un bruit d'arrondi sur une fenêtre constante, rolling_correlation NaN
+            constant = (prices[a].rolling(window).std() == 0) | (prices[b].rolling(window).std() == 0)
+            expected[constant] = np.nan
+            result = correlation_series(corr, prices, windows, a, b, window)
+            np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), atol=1e-9)
+
+def test_rolling_correlation_window_longer_than_history(prices):
+    corr = rolling_correlation(prices.iloc[:10], (5, 20))
+    assert np.isnan(corr[1]).all()
+    assert not np.isnan(corr[0, 4:]).all()
+
+def test_inversions_brute_force():
+    rng = np.random.default_rng(3)
+    for n in (0, 1, 2, 7, 64, 100):
+        codes = rng.integers(0, 10, n)
+        expected = sum(codes[i] > codes[j] for i, j in itertools.combinations(range(n), 2))
+        assert inversions(codes) == expected
+
+@pytest.mark.parametrize("x_levels, y_levels", [(None, None), (5, None), (None, 4), (3, 3), (2, 2)],
+                         ids=["no_ties", "ties_x", "ties_y", "ties_both", "binary"])
+def test_kendall_tau_b_with_ties(x_levels, y_levels):
+    x, y = series(1, levels=x_levels), series(2, levels=y_levels)
+    y = np.where(np.arange(len(y)) % 3 == 0, x, y) # égalités jointes quand x et y ont les mêmes niveaux
+    x[[10, 20]] = np.nan
+    assert kendall_tau(x, y) == pytest.approx(brute_kendall(x, y), abs=1e-12)
+
+def test_kendall_tau_matches_pandas():
+    pytest.importorskip("scipy") # pandas corr(method="kendall") passe par scipy
+    x, y = series(1, levels=4), series(2, levels=6)
+    expected = pd.DataFrame({"x": x, "y": y}).corr(method="kendall").loc["x", "y"]
+    assert kendall_tau(x, y) == pytest.approx(expected, abs=1e-12)
+
+def test_kendall_tau_degenerate():
+    assert np.isnan(kendall_tau([1.0, 1.0, 1.0], [1.0, 2.0, 3.0]))
+    assert np.isnan(kendall_tau([1.0], [2.0]))
+    assert kendall_tau([1.0, 2.0, 3.0], [3.0, 2.0, 1.0]) == pytest.approx(-1.0)
+
+@pytest.mark.parametrize("levels", [None, 5, 2])
+def test_spearman_matches_pandas(levels):
+    x, y = series(4, levels=levels), series(5, levels=levels)
+    x[7] = np.nan
+    expected = pd.DataFrame({"x": x, "y": y}).corr(method="spearman").loc["x", "y"]
+    assert spearman(x, y) == pytest.approx(expected, abs=1e-12)
+
+def test_pearson_matches_pandas_corr(prices):
+    # Fenêtre couvrant tout l'historique : la dernière valeur est la corrélation de l'échantillon
+    complete = prices.dropna()
+    corr = rolling_correlation(complete, (len(complete),))
+    expected = complete.corr(method="pearson")
+    for k, (a, b) in enumerate(pairs(complete.columns)):
+        assert corr[0, -1, k] == pytest.approx(expected.loc[a, b], abs=1e-12)
+
+def brute_rolling(function, x, y, window):
+    """
+    Corrélation recalculée sur chaque fenêtre, NaN si elle contient un NaN.
+    """
+    out = np.full(len(x), np.nan)
+    for t in range(window - 1, len(x)):
+        wx, wy = x[t - window + 1:t + 1], y[t - window + 1:t + 1]
+        if not (np.isnan(wx).any() or np.isnan(wy).any()):
+            out[t] = function(wx, wy)
+    return out
+
+def pandas_spearman(x, y):
+    # DataFrame.corr a son propre Spearman, Series.corr passe par scipy
+    return pd.DataFrame({"x": x, "y": y}).corr(method="spearman").loc["x", "y"]
+
+@pytest.mark.parametrize("levels", [None, 6, 2], ids=["no_ties", "ties", "binary"])
+@pytest.mark.parametrize("window", [2, 5, 30])
+def test_rolling_kendall_brute_force(levels, window):
+    x, y = series(6, 200, levels), series(7, 200, levels)
+    x[[40, 41, 120]] = np.nan
+    y[90] = np.nan
+    x[150:150 + window] = 1.0 # fenêtre constante : NaN
+    np.testing.assert_allclose(rolling_kendall(x, y, window), brute_rolling(brute_kendall, x, y, window), atol=1e-12)
+
+@pytest.mark.parametrize("levels", [None, 6, 2], ids=["no_ties", "ties", "binary"])
+@pytest.mark.parametrize("window", [2, 5, 30])
+def test_rolling_spearman_brute_force(levels, window):
+    x, y = series(8, 200, levels), series(9, 200, levels)
+    x[[40, 41, 120]] = np.nan
+    y[90] = np.nan
+    x[150:150 + window] = 1.0
+    expected = brute_rolling(pandas_spearman, x, y, window)
+    np.testing.assert_allclose(rolling_spearman(x, y, window), expected, atol=1e-12)
+    # Dates traitées par petits blocs : même résultat
+    np.testing.assert_allclose(rolling_spearman(x, y, window, cells=3 * window), expected, atol=1e-12)
+
+def test_rolling_short_history():
+    x, y = series(1, 10), series(2, 10)
+    for function in (rolling_kendall, rolling_spearman):
+        assert np.isnan(function(x, y, 11)).all()
+        assert np.isnan(function(x, y, 1)).all()
+        np.testing.assert_allclose(function(x, y, 10)[-1], (kendall_tau if function is rolling_kendall else spearman)(x, y))
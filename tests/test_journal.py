@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from journal import TradeJournal
+
+def record(journal, n, label="stop loss"):
+    for k in range(n):
+        when = pd.Timestamp("2020-01-01") + pd.Timedelta(minutes=k)
+        journal.record(when, when, "long", 2000.0, 2000.0 + k, 1.0, float(k), label, 50.0 + k)
+
+def test_directory_reused_by_a_new_journal(tmp_path):
+    record(TradeJournal(capacity=4, directory=tmp_path), 10)
+    journal = TradeJournal(capacity=4, directory=tmp_path)
+    record(journal, 5)
+
+    assert len(journal) == 5
+    assert len(journal.to_frame()) == 5
+    journal.flush()
+    assert journal.to_frame()["pnl"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert len(TradeJournal.load(tmp_path).to_frame()) == 5
+
+def test_batches_decoded_with_their_own_labels(tmp_path):
+    journal = TradeJournal(capacity=2, directory=tmp_path)
+    record(journal, 2, "signal")
+    record(journal, 2, "take profit")
+    journal.flush()
+
+    # Un lot écrit avec une autre table de labels que celle du journal qui le relit
+    np.savez(tmp_path / "trades-000000000004.npz", labels=np.array(["fin de session"]),
+             **{name: values[:1] for name, values in journal.arrays().items()} | {"label": np.zeros(1, dtype=np.int8)})
+    loaded = TradeJournal.load(tmp_path)
+    assert loaded.to_frame()["label"].tolist() == ["signal", "signal", "take profit", "take profit", "fin de session"]
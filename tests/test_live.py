@@ -0,0 +1,18 @@
+import asyncio
+
+from Backtester import Backtester
+from live import replay
+
+def test_replay_matches_events(candles):
+    df = candles.iloc[:6000]
+    expected = Backtester(df).run(mode="events")
+
+    # Les bars passent par le serveur local et la socket, les indicateurs sont mis à jour bar par bar
+    runner = asyncio.run(replay(df, Backtester(None)))
+    results = runner.backtester.results()
+
+    assert results["number_of_trades"] == expected["number_of_trades"] > 0
+    assert results["all_trades"] == expected["all_trades"]
+    assert results["final_balance"] == expected["final_balance"]
+    assert runner.backtester.journal.to_frame().equals(expected["journal"].to_frame())
+    assert len(runner.latencies) == len(df)
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import loader
+
+def write_candles(path, dates, times, mode="w", header=True):
+    rng = np.random.default_rng(len(dates))
+    close = 100 + np.cumsum(rng.normal(0, 1, len(dates)))
+    df = pd.DataFrame({"Date": dates, "Timestamp": times, "Open": close, "High": close + 1,
+                       "Low": close - 1, "Close": close})
+    df.to_csv(path, sep="\t", index=False, mode=mode, header=header)
+
+def expected_index(path):
+    df = pd.read_csv(path, sep="\t")
+    return pd.DatetimeIndex(pd.to_datetime(df["Date"] + " " + df["Timestamp"])).as_unit("ns").asi8
+
+def test_parse_datetime_hh_mm_ss():
+    dates = pd.Series(["2020.01.02", "2020.01.02", "2020.01.03"])
+    times = pd.Series(["09:30:00", "09:31:00", "09:30:00"])
+    expected = pd.DatetimeIndex(pd.to_datetime(dates + " " + times)).as_unit("ns").asi8
+    np.testing.assert_array_equal(loader.parse_datetime(dates, times), expected)
+
+def test_parse_datetime_hh_mm():
+    # to_timedelta refuse '09:30' : retour au parsing des couples date/heure
+    dates = pd.Series(["2020.01.02", "2020.01.02", "2020.01.03", "2020.01.02"])
+    times = pd.Series(["09:30", "09:31", "09:30", "09:30"])
+    expected = pd.DatetimeIndex(pd.to_datetime(dates + " " + times)).as_unit("ns").asi8
+    np.testing.assert_array_equal(loader.parse_datetime(dates, times), expected)
+
+def test_append_is_idempotent(tmp_path, monkeypatch):
+    path = str(tmp_path / "candles.csv")
+    directory = str(tmp_path / "cache")
+    write_candles(path, ["2020.01.02"] * 3, ["09:30:00", "09:31:00", "09:32:00"])
+    loader.convert(path, directory)
+    write_candles(path, ["2020.01.03"] * 2, ["09:30:00", "09:31:00"], mode="a", header=False)
+
+    # Échec au milieu des remplacements : une partie des colonnes est déjà à jour, pas meta.json
+    replace = os.replace
+    calls = []
+    def failing_replace(src, dst):
+        calls.append(dst)
+        if len(calls) == 3:
+            raise OSError("disque plein")
+        replace(src, dst)
+    monkeypatch.setattr(loader.os, "replace", failing_replace)
+    try:
+        loader.append(path, directory)
+    except OSError:
+        pass
+    monkeypatch.setattr(loader.os, "replace", replace)
+
+    columns = loader.load_columns(path, directory)
+    np.testing.assert_array_equal(columns["datetime"], expected_index(path))
+    assert all(len(values) == 5 for values in columns.values())
+    np.testing.assert_array_equal(columns["Close"], pd.read_csv(path, sep="\t")["Close"].to_numpy())
@@ -0,0 +1,103 @@
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from market_data import LocalSource, MarketData, YahooSource
+
+def daily(seed, start="2020-01-01", end="2021-01-01"):
+    index = pd.bdate_range(start, end, inclusive="left", name="Date").as_unit("ns")
+    close = 100 + np.cumsum(np.random.default_rng(seed).normal(0, 1, len(index)))
+    return pd.DataFrame({"Open": close - 0.5, "High": close + 1, "Low": close - 1, "Close": close}, index=index)
+
+@pytest.fixture
+def source():
+    return LocalSource({"GC=F": daily(0), "SI=F": daily(1)})
+
+def test_miss_then_hit(tmp_path, source):
+    data = MarketData(str(tmp_path), source)
+    first = data.prices(["GC=F", "SI=F"], "2020-01-01", "2020-07-01")
+    # Une seule requête groupée pour les deux tickers qui manquent la même période
+    assert source.calls == [(["GC=F", "SI=F"], pd.Timestamp("2020-01-01"), pd.Timestamp("2020-07-01"))]
+
+    second = data.prices(["GC=F", "SI=F"], "2020-01-01", "2020-07-01")
+    assert len(source.calls) == 1
+    pd.testing.assert_frame_equal(first, second)
+    expected = source.frames["GC=F"]["Close"]
+    pd.testing.assert_series_equal(first["GC=F"], expected[expected.index < "2020-07-01"], check_names=False, check_freq=False)
+
+def test_incremental_append(tmp_path, source):
+    data = MarketData(str(tmp_path), source)
+    data.prices(["GC=F"], "2020-01-01", "2020-04-01")
+    frame = data.ohlc("GC=F", "2020-01-01", "2020-09-01")
+
+    # Seule la période ajoutée est demandée
+    assert source.calls[-1] == (["GC=F"], pd.Timestamp("2020-04-01"), pd.Timestamp("2020-09-01"))
+    expected = source.frames["GC=F"]
+    pd.testing.assert_frame_equal(frame, expected[expected.index < "2020-09-01"], check_freq=False)
+
+    # Période plus ancienne et plus récente : deux requêtes, le milieu est relu depuis le cache
+    calls = len(source.calls)
+    data.ohlc("GC=F", "2019-12-01", "2020-10-01")
+    assert source.calls[calls:] == [(["GC=F"], pd.Timestamp("2019-12-01"), pd.Timestamp("2020-01-01")),
+                                    (["GC=F"], pd.Timestamp("2020-09-01"), pd.Timestamp("2020-10-01"))]
+
+def test_days_without_quotes_are_cached(tmp_path, source):
+    data = MarketData(str(tmp_path), source)
+    # Un week-end : aucune ligne, mais la période est couverte
+    assert data.ohlc("GC=F", "2020-01-04", "2020-01-06").empty
+    data.ohlc("GC=F", "2020-01-04", "2020-01-06")
+    assert len(source.calls) == 1
+
+def test_offline_reads_only_the_cache(tmp_path, source):
+    MarketData(str(tmp_path), source).prices(["GC=F"], "2020-01-01", "2020-03-01")
+    offline = LocalSource()
+    prices = MarketData(str(tmp_path), offline, offline=True).prices(["GC=F", "SI=F"], "2020-01-01", "2020-06-01")
+
+    assert offline.calls == []
+    assert prices["GC=F"].notna().sum() == len(source.frames["GC=F"].loc[:"2020-02-29"])
+    assert prices["SI=F"].isna().all()
+
+def test_csv_directory_source(tmp_path):
+    frame = daily(2)
+    frame.to_csv(tmp_path / "HG=F.csv")
+    data = MarketData(str(tmp_path / "cache"), LocalSource(directory=str(tmp_path)))
+    np.testing.assert_allclose(data.ohlc("HG=F", "2020-01-01", "2021-01-01")["Close"].to_numpy(), frame["Close"].to_numpy())
+
+def test_yahoo_locks_per_ticker(monkeypatch):
+    active, peak, guard = {}, {}, threading.Lock()
+
+    class Ticker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def history(self, start, end, auto_adjust, actions):
+            with guard:
+                active[self.ticker] = active.get(self.ticker, 0) + 1
+                peak[self.ticker] = max(peak.get(self.ticker, 0), active[self.ticker])
+                peak["all"] = max(peak.get("all", 0), sum(active.values()))
+            time.sleep(0.05)
+            with guard:
+                active[self.ticker] -= 1
+            # Comme yfinance : dates dans le fuseau de la place de cotation
+            frame = daily(0, start, end)
+            frame.index = frame.index.tz_localize("America/New_York")
+            return frame
+
+    monkeypatch.setitem(sys.modules, "yfinance", types.SimpleNamespace(Ticker=Ticker))
+    source = YahooSource()
+    start, end = pd.Timestamp("2020-01-01"), pd.Timestamp("2020-02-01")
+    with ThreadPoolExecutor(3) as pool:
+        results = list(pool.map(lambda tickers: source.fetch(tickers, start, end), [["GC=F", "SI=F"], ["GC=F"], ["SI=F"]]))
+
+    # Deux tickers téléchargés en même temps, jamais deux fois le même ticker à la fois
+    assert peak["GC=F"] == peak["SI=F"] == 1
+    assert peak["all"] >= 2
+    frame = results[0]["GC=F"]
+    assert frame.index.tz is None and frame.index[0] == start
+    assert list(results[0]) == ["GC=F", "SI=F"]
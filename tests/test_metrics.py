@@ -0,0 +1,51 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from journal import TradeJournal
+from metrics import compute_metrics, max_drawdown, periods_per_year, sharpe_sortino
+
+# Cinq barres journalières : +10 %, -10 %, +2/9, -1/11
+EQUITY = np.array([100.0, 110.0, 99.0, 121.0, 110.0])
+INDEX = pd.date_range("2021-01-04", periods=5, freq="D", name="datetime").as_unit("ns")
+RETURNS = [0.1, -0.1, 2 / 9, -1 / 11]
+
+def journal():
+    journal = TradeJournal()
+    journal.record(INDEX[0], INDEX[1], "long", 100.0, 110.0, 1.0, 10.0, "take profit", 110.0)
+    return journal
+
+def test_periods_per_year_counts_bars_over_span():
+    assert periods_per_year(INDEX) == pytest.approx(365.25)
+    # Barres de semaine seulement : 52 semaines de 5 barres sur 361 jours, environ 262 barres par an
+    weekdays = pd.bdate_range("2021-01-04", periods=260).as_unit("ns")
+    assert periods_per_year(weekdays) == pytest.approx(259 * 365.25 / 361)
+    assert math.isnan(periods_per_year(INDEX[:1]))
+
+def test_max_drawdown():
+    drawdown, duration = max_drawdown(EQUITY)
+    # Plus bas 99 sous le plus haut 110, et 110 sous 121 : -10 % contre -9,09 %
+    assert drawdown == pytest.approx(-0.1)
+    assert duration == 1
+    assert max_drawdown(EQUITY, INDEX)[1] == pd.Timedelta(days=1).value
+
+def test_sharpe_sortino():
+    mean = sum(RETURNS) / 4
+    std = math.sqrt(sum((r - mean) ** 2 for r in RETURNS) / 3)
+    downside = math.sqrt((0.1 ** 2 + (1 / 11) ** 2) / 4)
+    sharpe, sortino = sharpe_sortino(EQUITY, 365.25)
+    assert sharpe == pytest.approx(mean / std * math.sqrt(365.25))
+    assert sortino == pytest.approx(mean / downside * math.sqrt(365.25))
+
+def test_exposure_counts_open_position():
+    # Un jour de trade clôturé sur quatre jours couverts
+    metrics = compute_metrics(journal(), EQUITY, INDEX)
+    assert metrics["exposure"] == pytest.approx(0.25)
+    assert metrics["max_drawdown"] == pytest.approx(-0.1)
+    assert metrics["sharpe"] == pytest.approx(sharpe_sortino(EQUITY, 365.25)[0])
+
+    # Position ouverte depuis la troisième barre, toujours ouverte à la dernière : deux jours de plus
+    metrics = compute_metrics(journal(), EQUITY, INDEX, open_since=INDEX[2])
+    assert metrics["exposure"] == pytest.approx(0.75)
@@ -0,0 +1,56 @@
+import pytest
+
+from Backtester import Backtester
+from strategies import MeanReversion
+
+VARIANTS = [
+    MeanReversion(stop="entry", stop_pct=0.002),
+    MeanReversion(take_profit="band"),
+    MeanReversion(trailing=True),
+    MeanReversion(bb_period=25, rsi_window=14),
+]
+
+def run(df, mode, strategy=None):
+    bt = Backtester(df, strategy=strategy)
+    return bt.run(mode=mode)
+
+def test_default_strategy_same_in_all_modes(candles):
+    pandas = run(candles, "pandas")
+    assert pandas["number_of_trades"] > 0
+    for mode in ("numpy", "events"):
+        results = run(candles, mode)
+        assert results["all_trades"] == pandas["all_trades"]
+        assert results["final_balance"] == pandas["final_balance"]
+        assert results["journal"].to_frame().equals(pandas["journal"].to_frame())
+        assert results["equity"].equals(pandas["equity"])
+
+@pytest.mark.parametrize("strategy", VARIANTS, ids=["entry_stop", "band_tp", "trailing", "windows"])
+def test_strategy_variants_same_in_pandas_and_events(candles, strategy):
+    pandas = run(candles, "pandas", strategy)
+    events = run(candles, "events", strategy)
+    assert events["number_of_trades"] > 0
+    assert events["all_trades"] == pandas["all_trades"]
+    assert events["journal"].to_frame().equals(pandas["journal"].to_frame())
+
+def test_numpy_mode_rejects_other_exits(candles):
+    with pytest.raises(ValueError):
+        run(candles, "numpy", MeanReversion(trailing=True))
+
+def test_run_chunks_same_as_events(candles):
+    events = run(candles, "events")
+    columns = {col: candles[col].to_numpy() for col in ("Open", "High", "Low", "Close")}
+    columns["datetime"] = candles.index.as_unit("ns").asi8
+
+    # Un bloc qui se termine entre l'entrée et la sortie d'un trade : la position passe au bloc suivant
+    trades = events["journal"].to_frame()
+    entries = candles.index.get_indexer(trades["entry_time"])
+    exits = candles.index.get_indexer(trades["exit_time"])
+    split = entries[(exits > entries) & (entries > 1000)][0] + 1
+    assert entries[entries < split].size > exits[exits < split].size
+
+    for chunk_size in (1000, 4096, split, len(candles)):
+        results = Backtester(candles).run_chunks(columns, chunk_size)
+        assert results["all_trades"] == events["all_trades"]
+        assert results["final_balance"] == events["final_balance"]
+        assert results["journal"].to_frame().equals(trades)
+        assert results["equity"].equals(events["equity"])
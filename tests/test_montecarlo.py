@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from Backtester import Backtester
+from montecarlo import monte_carlo, paths, summary, trade_returns
+
+# 60 trades connus : deux gains de 2 % pour une perte de 1,5 %
+RETURNS = np.tile([0.02, 0.02, -0.015], 20)
+
+def test_paths_hand_computed():
+    final, drawdown, ruined = paths(np.array([0.1, -0.5, 0.2]), np.array([[0, 1, 2], [1, 1, 0]]), balance=100)
+    # 100 -> 110 -> 55 -> 66, puis 100 -> 50 -> 25 -> 27,5
+    np.testing.assert_allclose(final, [66.0, 27.5])
+    np.testing.assert_allclose(drawdown, [-0.5, -0.75])
+    assert ruined.tolist() == [False, True]
+
+def test_fixed_seed_is_reproducible():
+    first = monte_carlo(RETURNS, simulations=1000, seed=42, processes=1)
+    second = monte_carlo(RETURNS, simulations=1000, seed=42, processes=2)
+    # Une graine par lot : même résultat quel que soit le nombre de processus
+    np.testing.assert_array_equal(first["final_balance"], second["final_balance"])
+    np.testing.assert_array_equal(first["max_drawdown"], second["max_drawdown"])
+
+    other = monte_carlo(RETURNS, simulations=1000, seed=43, processes=1)
+    assert not np.array_equal(first["final_balance"], other["final_balance"])
+
+def test_bootstrap_quantiles_bracket_observed():
+    result = monte_carlo(RETURNS, simulations=5000, seed=0, processes=1, balance=100)
+    observed = 100 * np.prod(1 + RETURNS)
+    assert result["observed"]["final_balance"] == pytest.approx(observed)
+
+    table = summary(result, (0.05, 0.5, 0.95))
+    assert table.loc[0.05, "final_balance"] < observed < table.loc[0.95, "final_balance"]
+    # Une seule perte à la fois dans la séquence observée : drawdown plus faible que presque tous les tirages
+    assert result["observed"]["max_drawdown"] == pytest.approx(-0.015)
+    assert table.loc[0.95, "max_drawdown"] < result["observed"]["max_drawdown"]
+    assert result["risk_of_ruin"] == 0.0
+
+def test_shuffle_keeps_final_balance():
+    result = monte_carlo(RETURNS, simulations=500, method="shuffle", seed=0, processes=1, balance=100)
+    np.testing.assert_allclose(result["final_balance"], result["observed"]["final_balance"], rtol=1e-12)
+    # Les pertes regroupées donnent des drawdowns pires que la séquence alternée
+    assert result["max_drawdown"].min() < result["observed"]["max_drawdown"]
+
+def test_trade_returns_replay_backtest(candles):
+    bt = Backtester(candles)
+    results = bt.run(mode="events")
+    returns = trade_returns(results["journal"], bt.margin_ratio, bt.leverage)
+    result = monte_carlo(returns, simulations=10, seed=0, processes=1, balance=bt.initial_balance)
+    assert result["observed"]["final_balance"] == pytest.approx(results["final_balance"], rel=1e-9)
@@ -0,0 +1,31 @@
+import pytest
+
+from Backtester import Backtester
+from live import LiveRunner, ReplayFeed
+from orders import FillModel, LEGACY
+from strategies import LimitEntry
+
+def limit_backtester(df, fill_model=None):
+    return Backtester(df, spread=0, margin_per_trade=25, strategy=LimitEntry(), fill_model=fill_model)
+
+def test_legacy_fills_same_in_pandas_and_events(candles):
+    pandas = limit_backtester(candles).run(mode="pandas")
+    events = limit_backtester(candles).run(mode="events")
+
+    assert events["number_of_trades"] > 0
+    assert pandas["all_trades"] == events["all_trades"]
+    assert pandas["journal"].to_frame().equals(events["journal"].to_frame())
+    assert pandas["equity"].equals(events["equity"])
+
+def test_fill_model_only_simulated_in_events(candles):
+    realistic = FillModel(ambiguity="stop_first")
+    assert limit_backtester(candles, realistic).run(mode="events")["number_of_trades"] > 0
+
+    with pytest.raises(ValueError):
+        limit_backtester(candles, realistic).run(mode="pandas")
+    with pytest.raises(ValueError):
+        LiveRunner(limit_backtester(None, realistic), ReplayFeed(candles))
+
+    # Un modèle égal à LEGACY donne les mêmes règles que on_candle
+    same = FillModel(**{name: value for name, value in vars(LEGACY).items()})
+    assert limit_backtester(candles, same).run(mode="pandas")["all_trades"] == limit_backtester(candles).run(mode="events")["all_trades"]
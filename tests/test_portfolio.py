@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from Backtester import BALANCE, LEVERAGE, MARGIN_RATIO, Backtester
+from portfolio import run_portfolio
+from strategies import MeanReversion
+
+def test_single_instrument_same_as_events(candles):
+    for strategy in (MeanReversion(), MeanReversion(take_profit="band", trailing=True)):
+        events = Backtester(candles, strategy=strategy).run(mode="events")
+        portfolio = run_portfolio({"XAUUSD": candles}, strategy)
+        assert portfolio["number_of_trades"] == events["number_of_trades"] > 0
+        assert portfolio["final_balance"] == events["final_balance"]
+        journal = portfolio["instruments"].loc["XAUUSD", "journal"]
+        assert journal.to_frame().equals(events["journal"].to_frame())
+
+def test_disjoint_instruments_chain_the_balance(candles):
+    # Premier instrument coupé juste après une sortie : il finit à plat, le second démarre avec sa balance
+    trades = Backtester(candles.iloc[:10000]).run(mode="events")["journal"].to_frame()
+    cut = candles.index.get_loc(trades["exit_time"].iloc[-1]) + 1
+    first, second = candles.iloc[:cut], candles.iloc[cut:]
+
+    alone = Backtester(first).run(mode="events")
+    after = Backtester(second, balance=alone["final_balance"]).run(mode="events")
+    portfolio = run_portfolio({"A": first, "B": second})
+
+    assert portfolio["final_balance"] == after["final_balance"]
+    assert portfolio["number_of_trades"] == alone["number_of_trades"] + after["number_of_trades"]
+    assert portfolio["instruments"].loc["A", "journal"].to_frame().equals(alone["journal"].to_frame())
+    assert portfolio["instruments"].loc["B", "journal"].to_frame().equals(after["journal"].to_frame())
+
+def test_shared_margin_between_instruments(candles):
+    # Deux fois les mêmes candles : mêmes signaux, entrées à la même date dans l'ordre de frames
+    portfolio = run_portfolio({"A": candles, "B": candles.copy()}, balance=BALANCE)
+    a = portfolio["instruments"].loc["A", "journal"].to_frame()
+    b = portfolio["instruments"].loc["B", "journal"].to_frame()
+    pd.testing.assert_series_equal(a["entry_time"], b["entry_time"])
+
+    # B entre avec margin_ratio de la balance laissée libre par A : ses unités sont (1 - margin_ratio) fois celles de A
+    ratio = b["units"] / a["units"]
+    assert ratio.to_numpy() == pytest.approx(1 - MARGIN_RATIO)
+    assert b["pnl"].to_numpy() == pytest.approx(a["pnl"].to_numpy() * ratio.to_numpy())
+
+    # Le journal de B garde la balance du compte après chaque sortie, A puis B à la même date :
+    # entre les deux, la marge de B est restituée avec son PnL
+    margin = b["units"] * b["entry_price"] / LEVERAGE
+    assert (b["balance"] - a["balance"]).to_numpy() == pytest.approx((margin + b["pnl"]).to_numpy())
+    assert portfolio["total_pnl"] == pytest.approx(a["pnl"].sum() + b["pnl"].sum())
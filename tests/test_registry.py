@@ -0,0 +1,107 @@
+import inspect
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+import sweep
+from Backtester import Backtester
+from journal import TradeJournal
+from orders import FillModel
+from registry import MODULES, Registry, code_version
+from strategies import LimitEntry
+
+def same_results(a, b):
+    return (a["final_balance"] == b["final_balance"] and a["all_trades"] == b["all_trades"]
+            and a["journal"].to_frame().equals(b["journal"].to_frame()) and a["equity"].equals(b["equity"]))
+
+def test_run_served_from_registry(tmp_path, candles):
+    registry = Registry(str(tmp_path / "registry.sqlite"))
+    df = candles.iloc[:12345] # position encore ouverte à la fin
+    first = Backtester(df, registry=registry)
+    expected = first.run(mode="events")
+    served = Backtester(df, registry=registry)
+    results = served.run(mode="events")
+
+    assert (registry.hits, registry.misses) == (1, 1)
+    assert same_results(results, expected)
+    assert served.position == first.position is not None
+    assert isinstance(served.entry_time, pd.Timestamp) and served.entry_time == first.entry_time
+
+    # Une position restaurée se clôture comme l'originale
+    for bt in (first, served):
+        bt.exit_trade("take profit", bt.position, float(df["Close"].iloc[-1]), df.index[-1])
+    assert first.journal.to_frame().equals(served.journal.to_frame())
+
+def test_trading_on_a_served_run_leaves_it_unchanged(tmp_path, candles):
+    registry = Registry(str(tmp_path / "registry.sqlite"))
+    df = candles.iloc[:12345]
+    expected = Backtester(df, journal=TradeJournal(capacity=16, directory=str(tmp_path / "journal")),
+                          registry=registry).run(mode="events")
+
+    # Le run servi continue : sa position est clôturée et results écrit le journal
+    served = Backtester(df, registry=registry)
+    served.run(mode="events")
+    served.exit_trade("take profit", served.position, float(df["Close"].iloc[-1]), df.index[-1])
+    assert len(served.results()["journal"]) == len(expected["journal"]) + 1
+    assert served.journal.directory is None
+
+    again = Backtester(df, registry=registry).run(mode="events")
+    assert registry.hits == 2
+    assert same_results(again, expected)
+
+def test_code_version_ignores_scripts(tmp_path):
+    source = os.path.dirname(inspect.getfile(Registry))
+    for module in MODULES:
+        shutil.copy(os.path.join(source, module + ".py"), tmp_path)
+    version = code_version(str(tmp_path))
+    (tmp_path / "main.py").write_text("print('autre script')\n")
+    assert code_version(str(tmp_path)) == version
+    with open(tmp_path / "strategies.py", "a") as f:
+        f.write("\n# règle modifiée\n")
+    assert code_version(str(tmp_path)) != version
+
+def test_mode_is_part_of_the_key(tmp_path, candles):
+    registry = Registry(str(tmp_path / "registry.sqlite"))
+    Backtester(candles, registry=registry).run(mode="events")
+    Backtester(candles, registry=registry).run(mode="pandas")
+    assert registry.hits == 0
+    assert sorted(registry.runs()["params.mode"]) == ["events", "pandas"]
+
+def test_served_journal_survives_directory_reuse(tmp_path, candles):
+    registry = Registry(str(tmp_path / "registry.sqlite"))
+    directory = str(tmp_path / "journal")
+    expected = Backtester(candles, journal=TradeJournal(capacity=16, directory=directory), registry=registry).run(mode="events")
+    frame = expected["journal"].to_frame()
+
+    # Un autre backtest écrit dans le même dossier de journal
+    Backtester(candles.iloc[:8000], journal=TradeJournal(capacity=16, directory=directory)).run(mode="events")
+
+    served = Backtester(candles, registry=registry).run(mode="events")
+    assert registry.hits == 1
+    assert served["journal"].to_frame().equals(frame)
+
+def test_lower_timeframe_bars_are_hashed(tmp_path, candles):
+    registry = Registry(str(tmp_path / "registry.sqlite"))
+    lower = {"datetime": np.asarray(candles.index.asi8), "High": candles["High"].to_numpy(), "Low": candles["Low"].to_numpy()}
+    bt = Backtester(candles, spread=0, margin_per_trade=25, strategy=LimitEntry(), fill_model=FillModel(lower=lower), registry=registry)
+    params, params_hash, _ = registry.key(bt, "events")
+
+    assert len(params) < 2000
+    changed = dict(lower, High=lower["High"] + 0.01)
+    other = Backtester(candles, spread=0, margin_per_trade=25, strategy=LimitEntry(), fill_model=FillModel(lower=changed))
+    assert registry.key(other, "events")[1] != params_hash
+    assert json.loads(params)["mode"] == "events"
+
+def test_sweep_reads_known_combinations(tmp_path, candles, monkeypatch):
+    registry = Registry(str(tmp_path / "registry.sqlite"))
+    grid = {"stop_pct": [0.002, 0.009], "bb_period": [21, 25]}
+    first = sweep.sweep(candles, grid, processes=1, registry=registry)
+
+    # Toutes les combinaisons sont connues : aucun pool n'est lancé
+    monkeypatch.setattr(sweep, "Pool", None)
+    second = sweep.sweep(candles, grid, processes=1, registry=registry)
+    pd.testing.assert_frame_equal(first, second)
+    assert len(registry.runs()) == 4
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from report import downsample, lttb, minmax
+
+def curve(n=10_000, seed=0):
+    y = np.random.default_rng(seed).normal(size=n).cumsum()
+    x = pd.date_range("2020-01-01", periods=n, freq="min").as_unit("ns").to_numpy()
+    return x, y
+
+def check(indices, y, points):
+    assert len(indices) <= points
+    assert (np.diff(indices) > 0).all()
+    assert indices[0] == 0 and indices[-1] == len(y) - 1
+    assert np.nanargmax(y) in indices and np.nanargmin(y) in indices
+
+@pytest.mark.parametrize("points", [4, 5, 100, 999, 4000])
+def test_minmax_keeps_ends_and_extrema(points):
+    x, y = curve()
+    check(minmax(y, points), y, points)
+
+@pytest.mark.parametrize("points", [4, 5, 100, 999, 4000])
+def test_lttb_keeps_ends_and_extrema(points):
+    x, y = curve()
+    indices = lttb(x, y, points)
+    assert len(indices) == points
+    check(indices, y, points)
+
+def test_extrema_in_one_bucket():
+    # Pic et creux voisins, au milieu et dans le dernier bucket : les deux sont gardés
+    for position in (5000, 9990):
+        x, y = curve(seed=1)
+        y[position], y[position + 1] = 1e6, -1e6
+        for points in (10, 50):
+            check(lttb(x, y, points), y, points)
+            check(minmax(y, points), y, points)
+
+def test_short_series_and_nan():
+    x, y = curve(50)
+    np.testing.assert_array_equal(minmax(y, 100), np.arange(50))
+    np.testing.assert_array_equal(lttb(x, y, 100), np.arange(50))
+
+    x, y = curve()
+    y[:500] = np.nan # début de corrélation glissante
+    check(minmax(y, 200), y, 200)
+    check(lttb(x, y, 200), y, 200)
+
+def test_downsample():
+    x, y = curve()
+    for method in ("minmax", "lttb"):
+        dx, dy = downsample(x, y, 300, method)
+        assert len(dx) == len(dy) <= 300
+        assert dy.max() == y.max() and dy.min() == y.min()
+        assert dx[0] == x[0] and dx[-1] == x[-1]
+    with pytest.raises(ValueError):
+        downsample(x, y, 300, "every_nth")
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeframes import TIMEFRAMES, align, resample
+
+def visible_bar(ns, step, starts, period):
+    """
+    Dernière bar terminée à la clôture de chaque candle, par force brute : une bar est terminée
+    quand la clôture de la candle (t + step) atteint la fin de sa période.
+    """
+    visible = []
+    for t in ns:
+        done = [b for b, start in enumerate(starts) if start + period <= t + step]
+        visible.append(done[-1] if done else -1)
+    return np.array(visible)
+
+@pytest.mark.parametrize("timeframe", ["M15", "H1", "H4"])
+def test_align_never_shows_open_bar(candles, timeframe):
+    # Trous dans les données : des bars se terminent sans candle de clôture
+    df = candles.iloc[:3000].drop(candles.index[np.r_[100:170, 1000:1400, 2200:2201]])
+    bars, known_at = resample(df, timeframe)
+    ns = df.index.as_unit("ns").asi8
+    period = pd.Timedelta(TIMEFRAMES[timeframe]).value
+    aligned = align(bars["Close"].to_numpy(), known_at, len(df))
+
+    visible = visible_bar(ns, 60 * 10**9, bars.index.as_unit("ns").asi8, period)
+    np.testing.assert_array_equal(np.isnan(aligned), visible < 0)
+    np.testing.assert_array_equal(aligned[visible >= 0], bars["Close"].to_numpy()[visible[visible >= 0]])
+
+    # Aucune candle ne voit une bar dont une candle est postérieure à elle
+    last_candle = np.r_[np.flatnonzero(np.diff(ns // period)), len(ns) - 1]
+    assert (last_candle[visible[visible >= 0]] <= np.flatnonzero(visible >= 0)).all()
+
+def test_align_ignores_future_candles(candles):
+    df = candles.iloc[:2000]
+    cut = 1234
+    changed = df.copy()
+    changed.iloc[cut:] *= 1.5
+    for timeframe in ("M30", "H1"):
+        bars, known_at = resample(df, timeframe)
+        before = align(bars["Close"].to_numpy(), known_at, len(df))
+        bars, known_at = resample(changed, timeframe)
+        after = align(bars["Close"].to_numpy(), known_at, len(df))
+        np.testing.assert_array_equal(before[:cut], after[:cut])
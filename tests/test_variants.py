@@ -0,0 +1,34 @@
+import sweep
+from Backtester import Backtester
+from strategies import MeanReversion
+from variants import run_variants
+
+def test_single_pass_matches_each_backtest(candles):
+    strategies = [
+        MeanReversion(),
+        MeanReversion(stop="entry", stop_pct=0.002),
+        MeanReversion(take_profit="band", tp_offset=0.1),
+        MeanReversion(trailing=True),
+        MeanReversion(rsi_low=25, rsi_high=75),
+    ]
+    spread = [0.2, 0.2, 0.0, 0.5, 0.2]
+    table = run_variants(candles, strategies, spread=spread)
+
+    for k, strategy in enumerate(strategies):
+        results = Backtester(candles, strategy=strategy, spread=spread[k]).run(mode="events")
+        assert results["number_of_trades"] > 0
+        assert table["final_balance"].iloc[k] == results["final_balance"]
+        assert table["number_of_trades"].iloc[k] == results["number_of_trades"]
+        assert table["journal"].iloc[k].to_frame().equals(results["journal"].to_frame())
+
+def test_sweep_matches_each_backtest(candles):
+    grid = {"stop_pct": [0.002, 0.009], "bb_period": [21, 25], "trailing": [False, True]}
+    table = sweep.sweep(candles, grid, processes=2)
+
+    assert len(table) == 8
+    for params in sweep.parameter_grid(grid):
+        row = table[(table["stop_pct"] == params["stop_pct"]) & (table["bb_period"] == params["bb_period"])
+                    & (table["trailing"] == params["trailing"])].iloc[0]
+        results = sweep.make_backtester(params, candles).run(mode="events")
+        assert row["final_balance"] == results["final_balance"]
+        assert row["number_of_trades"] == results["number_of_trades"]
@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from volatility_ratio import bars_per_year, ewma_volatility, ratio_matrix, rolling_volatility, volatility
+
+INDEX = pd.bdate_range("2021-01-04", periods=4, name="Date")
+
+# Deux actifs sur quatre barres : A +10 %, -10 %, +10 % ; B +5 %, -5 %, +5 %
+OHLC = {
+    "Open": pd.DataFrame({"A": [100.0, 101.0, 108.0, 100.0], "B": [50.0, 51.0, 52.0, 51.0]}, index=INDEX),
+    "High": pd.DataFrame({"A": [102.0, 112.0, 109.0, 110.0], "B": [51.0, 53.0, 52.5, 53.0]}, index=INDEX),
+    "Low": pd.DataFrame({"A": [99.0, 100.0, 98.0, 99.0], "B": [49.5, 50.5, 49.5, 50.5]}, index=INDEX),
+    "Close": pd.DataFrame({"A": [100.0, 110.0, 99.0, 108.9], "B": [50.0, 52.5, 49.875, 52.36875]}, index=INDEX),
+}
+LN2 = math.log(2)
+
+def close_to_close(up, down):
+    # Rendements up, down, up : écart type (ddof=1) calculé à la main
+    returns = [math.log(1 + up), math.log(1 - down), math.log(1 + up)]
+    mean = sum(returns) / 3
+    return math.sqrt(sum((r - mean) ** 2 for r in returns) / 2)
+
+def parkinson(asset):
+    high, low = OHLC["High"][asset], OHLC["Low"][asset]
+    return math.sqrt(sum(math.log(h / l) ** 2 for h, l in zip(high, low)) / (4 * LN2 * 4))
+
+def garman_klass(asset):
+    bars = zip(OHLC["Open"][asset], OHLC["High"][asset], OHLC["Low"][asset], OHLC["Close"][asset])
+    return math.sqrt(sum(0.5 * math.log(h / l) ** 2 - (2 * LN2 - 1) * math.log(c / o) ** 2 for o, h, l, c in bars) / 4)
+
+def test_full_sample_estimators():
+    table = volatility(OHLC, ("close", "parkinson", "garman_klass"), periods=1)
+    assert table.loc["A", "close"] == pytest.approx(close_to_close(0.10, 0.10))
+    assert table.loc["B", "close"] == pytest.approx(close_to_close(0.05, 0.05))
+    for asset in ("A", "B"):
+        assert table.loc[asset, "parkinson"] == pytest.approx(parkinson(asset))
+        assert table.loc[asset, "garman_klass"] == pytest.approx(garman_klass(asset))
+
+    # Annualisation : racine du nombre de barres par an
+    annual = volatility(OHLC, ("close",), periods=252)
+    assert annual.loc["A", "close"] == pytest.approx(close_to_close(0.10, 0.10) * math.sqrt(252))
+    # Sans High/Low, seuls les estimateurs de clôture sont calculés
+    assert list(volatility(OHLC["Close"], periods=1).columns) == ["close", "ewma"]
+
+def test_rolling_estimators():
+    result = rolling_volatility(OHLC, "close", windows=(2, 3, 5), periods=1)
+    assert result.shape == (3, 4, 2)
+    # Fenêtre de 2 barres : un seul rendement sur la première fenêtre complète, pas d'écart type
+    assert np.isnan(result[0, :2]).all()
+    r1, r2 = math.log(1.1), math.log(0.9)
+    assert result[0, 2, 0] == pytest.approx(abs(r1 - r2) / math.sqrt(2))
+    assert result[1, 3, 0] == pytest.approx(close_to_close(0.10, 0.10))
+    assert np.isnan(result[2]).all() # fenêtre plus longue que l'historique
+
+    park = rolling_volatility(OHLC, "parkinson", windows=(2,), periods=1)[0]
+    high, low = OHLC["High"]["B"].to_numpy(), OHLC["Low"]["B"].to_numpy()
+    expected = math.sqrt((math.log(high[2] / low[2]) ** 2 + math.log(high[3] / low[3]) ** 2) / (2 * 4 * LN2))
+    assert park[3, 1] == pytest.approx(expected)
+    assert np.isnan(park[0]).all()
+
+def test_ewma():
+    lam = 0.9
+    r = [math.log(1.1), math.log(0.9), math.log(1.1)]
+    variance = r[0] ** 2 # initialisée au premier r²
+    expected = [math.nan, math.sqrt(variance)]
+    for value in r[1:]:
+        variance = lam * variance + (1 - lam) * value ** 2
+        expected.append(math.sqrt(variance))
+    result = ewma_volatility(OHLC["Close"], lam=lam, periods=1)
+    np.testing.assert_allclose(result[:, 0], expected)
+    assert volatility(OHLC["Close"], ("ewma",), periods=1, lam=lam).loc["A", "ewma"] == pytest.approx(expected[-1])
+
+def test_ratio_matrix():
+    table = volatility(OHLC, ("close",), periods=1)["close"]
+    ratios = ratio_matrix(table)
+    expected = close_to_close(0.10, 0.10) / close_to_close(0.05, 0.05)
+    assert ratios.loc["A", "B"] == pytest.approx(expected)
+    assert ratios.loc["B", "A"] == pytest.approx(1 / expected)
+    np.testing.assert_allclose(np.diag(ratios), 1.0)
+
+    rolling = rolling_volatility(OHLC, "close", windows=(3,), periods=1)
+    matrices = ratio_matrix(rolling)
+    assert matrices.shape == (1, 4, 2, 2)
+    assert matrices[0, 3, 0, 1] == pytest.approx(expected)
+
+def test_bars_per_year():
+    assert bars_per_year(pd.RangeIndex(10)) == 252
+    assert bars_per_year(INDEX) == pytest.approx(3 * 365.25 / 3)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Backtester import BALANCE, Backtester
+from maths import add_indicators
+from sweep import make_strategy
+from walkforward import walk_forward, windows
+
+GRID = {"stop_pct": [0.002, 0.009], "bb_period": [21, 30]}
+
+def test_windows_do_not_overlap(candles):
+    bounds = windows(candles.index, "4D", "2D")
+    assert len(bounds) > 2
+    for (lo, mid, hi), (next_lo, next_mid, next_hi) in zip(bounds, bounds[1:]):
+        assert lo < mid < hi
+        # Tests contigus et disjoints, chaque optimisation s'arrête au début de son test
+        assert next_mid == hi
+        assert candles.index[mid] - candles.index[lo] == pd.Timedelta("4D")
+
+    result = walk_forward(candles, GRID, "4D", "2D", processes=2)
+    equity = result["equity"]
+    assert equity.index.is_unique and equity.index.is_monotonic_increasing
+    assert equity.index[0] == candles.index[bounds[0][1]]
+    assert result["final_balance"] == equity.iloc[-1]
+
+def test_parameters_chosen_on_train_data_only(candles):
+    bounds = windows(candles.index, "4D", "2D")
+    mid = bounds[0][1]
+    first = walk_forward(candles, GRID, "4D", "2D", processes=2)["windows"]
+
+    # Prix modifiés après la période d'optimisation de la première fenêtre : même choix, même score
+    changed = candles.copy()
+    noise = np.random.default_rng(1).normal(0, 0.5, len(candles) - mid).cumsum()
+    changed.iloc[mid:] = changed.iloc[mid:].to_numpy() + noise[:, None]
+    second = walk_forward(changed, GRID, "4D", "2D", processes=2)["windows"]
+
+    columns = [col for col in first.columns if col not in ("test_return", "test_trades")]
+    pd.testing.assert_series_equal(first.loc[0, columns], second.loc[0, columns])
+
+def test_single_window_equals_plain_run(candles):
+    bounds = windows(candles.index, "10D", "4D")
+    assert len(bounds) == 1
+    lo, mid, hi = bounds[0]
+    result = walk_forward(candles, GRID, "10D", "4D", processes=2)
+    params = result["windows"].iloc[0].to_dict()
+
+    # Run simple sur la période de test, avec les indicateurs chauffés sur l'historique qui la précède
+    strategy = make_strategy(params)
+    frame = add_indicators(candles, strategy.rsi_window, strategy.bb_period, strategy.bb_num_std, dropna=False).iloc[mid:hi]
+    bt = Backtester(frame, leverage=params["leverage"], spread=params["spread"],
+                    margin_ratio=params["margin_ratio"], strategy=strategy)
+    plain = bt.run(mode="events")
+
+    expected = plain["equity"].to_numpy().copy()
+    trades = plain["number_of_trades"]
+    if bt.position is not None:
+        # Sortie forcée à la dernière clôture, au prix des sorties de la stratégie
+        close = float(frame["Close"].iloc[-1])
+        price = close + bt.spread / 2 if bt.position == "long" else close - bt.spread / 2
+        sign = 1.0 if bt.position == "long" else -1.0
+        expected[-1] = bt.balance + bt.margin_used + sign * (price - bt.entry_price) * bt.units
+        trades += 1
+
+    assert result["windows"].loc[0, "test_trades"] == trades
+    # balance = BALANCE : la courbe raccordée est celle du run, sans remise à l'échelle
+    assert expected[0] == BALANCE
+    np.testing.assert_allclose(result["equity"].to_numpy(), expected, rtol=1e-12)
+    assert result["final_balance"] == pytest.approx(expected[-1], rel=1e-12)
+
+def test_forced_exit_at_strategy_price(candles, monkeypatch):
+    import sweep
+    import walkforward
+    from cache import IndicatorCache
+
+    monkeypatch.setattr(sweep, "_candles", candles)
+    monkeypatch.setattr(sweep, "_cache", IndicatorCache())
+    monkeypatch.setattr(walkforward, "_key", None)
+    params = {**sweep.DEFAULTS, "spread": 2.0}
+    frame = walkforward._prepared(params)
+
+    # Fenêtre de test qui se termine juste après l'entrée d'un trade long
+    bt = Backtester(frame.iloc[5000:], spread=2.0, strategy=make_strategy(params))
+    trades = bt.run(mode="events")["journal"].to_frame()
+    entry = trades[trades["direction"] == "long"].iloc[0]
+    hi = 5000 + frame.index[5000:].get_loc(entry["entry_time"]) + 2
+    assert frame.index[hi - 1] < entry["exit_time"]
+
+    k, equity, count = walkforward._test((0, 5000, hi, params))
+    # Un long sort à la clôture + demi-spread, comme les sorties de MeanReversion ; la dernière candle est à plat
+    price = frame["Close"].iloc[hi - 1] + 1.0
+    pnl = (price - entry["entry_price"]) * entry["units"]
+    balance = trades["balance"].iloc[trades.index.get_loc(entry.name) - 1] if entry.name else BALANCE
+    assert count == entry.name + 1
+    assert equity[-1] == pytest.approx(balance + pnl)
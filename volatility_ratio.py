@@ -3,31 +3,32 @@
 Calcul de volatilité entre deux actifs?
 Auteur : Louise Robert
 Description :
+    Compare la volatilité annualisée de deux actifs, et plus généralement de tout un univers :
+    volatilités close-to-close, Parkinson, Garman-Klass et EWMA, sur l'échantillon entier ou sur
+    des fenêtres glissantes, annualisées selon la fréquence des barres (journalières, minutes...),
+    et matrice des ratios de volatilité de toutes les paires d'actifs.
+
+    Les calculs se font sur un tableau actifs x dates : chaque estimateur est une moyenne de
+    contributions par barre, et chaque fenêtre glissante une différence de deux sommes cumulées.
 """
 
-import yfinance as yf
+import os
+import sys
+import numpy as np
 import pandas as pd
 from math import sqrt
 
-def download_data(ticker: str, start: str = "2015-01-01", end: str = None) -> pd.Series:
-    """
-    Télécharge les prix de clôture dun actif.
-    
-    :@param ticker: Ticker de l'actif à télécharger (ex: AAPL)
-    :@param start: Date de début de la série à télécharger (format: YYYY-MM-DD)
-    :@param end: Date de fin de la série à télécharger (format: YYYY-MM-DD)
-    :return: Une série de prix de fermeture de l'actif courant sur la période donnée
-    """
-    # On télécharge le dataframe des données de prix de l'actif 
-    dataframe = yf.download(ticker, start=start, end=end, progress=False)
+from market_data import MarketData, download_prices
 
-    # On récupère uniquement le prix de cloture de l'actif en une série
-    serie_closeprice = dataframe['Close']
+# Même annualisation que les métriques du backtester (Calgary/metrics.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Calgary"))
+from metrics import periods_per_year
 
-    # on renomme cette série avec le nom ticker de l'actif courant
-    # serie_closeprice.rename(ticker)
-
-    return serie_closeprice
+TRADING_DAYS = 252 # Jours de cotation par an, si l'index ne permet pas de déduire la fréquence
+ESTIMATORS = ("close", "parkinson", "garman_klass", "ewma") # Estimateurs disponibles
+WINDOWS = (20, 60, 120) # Fenêtres glissantes par défaut, en nombre de barres
+EWMA_LAMBDA = 0.94 # Facteur de décroissance de RiskMetrics pour des données journalières
+EWMA_BLOCK = 4096 # Barres traitées par bloc de sommes cumulées dans l'EWMA
 
 def compute_volatility(rendements: pd.Series) -> float:
     """
@@ -39,11 +40,273 @@ def compute_volatility(rendements: pd.Series) -> float:
     # Calcul de la volatilité quotidienne
     daily_vol = rendements.std() # standard deviation = écart type
 
-    # on annualise la volatilité 
+    # on annualise la volatilité
     annualized_vol = daily_vol * sqrt(252)  # 252 jours de trading par an
-    
+
     return annualized_vol
 
+def bars_per_year(index) -> float:
+    """
+    Nombre de barres par an, mesuré sur l'index : nombre de barres divisé par la durée couverte (metrics.periods_per_year).
+    Les heures et jours sans cotation sont donc pris en compte (environ 252 pour des barres journalières
+    d'actions, bien plus pour des barres minutes de XAUUSD).
+
+    :@param index: Index datetime des barres
+    :return: Nombre de barres par an, TRADING_DAYS si l'index est trop court ou n'est pas daté
+    """
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return TRADING_DAYS
+    periods = periods_per_year(index)
+    return TRADING_DAYS if np.isnan(periods) else periods
+
+def from_candles(candles: pd.DataFrame, name: str) -> dict:
+    """
+    Univers d'un seul actif à partir d'un dataframe de candles (colonnes Open, High, Low, Close),
+    par exemple les barres minutes de XAUUSD du backtester.
+
+    :@param candles: Dataframe OHLC d'un actif
+    :@param name: Nom de l'actif
+    :return: dict colonne -> dataframe à une colonne, comme load_ohlc
+    """
+    return {col: candles[[col]].rename(columns={col: name}) for col in ("Open", "High", "Low", "Close") if col in candles.columns}
+
+def load_ohlc(tickers: list, start: str = "2015-01-01", end: str = None) -> dict:
+    """
+    Prix OHLC journaliers d'un univers, depuis le cache local de market_data.
+
+    :@param tickers: Tickers des actifs
+    :@param start: Date de début (format: YYYY-MM-DD)
+    :@param end: Date de fin (format: YYYY-MM-DD)
+    :return: dict colonne ("Open", "High", "Low", "Close") -> dataframe dates x actifs
+    """
+    market = MarketData()
+    market.update(tickers, start, end)
+    return {col: market.prices(tickers, start, end, col) for col in ("Open", "High", "Low", "Close")}
+
+def _panel(prices) -> tuple:
+    """
+    Normalise les prix d'entrée : un dataframe de clôtures (dates x actifs) ou un dict colonne -> dataframe.
+
+    :return: (dict colonne -> tableau actifs x dates, index des dates, noms des actifs)
+    """
+    if not isinstance(prices, dict):
+        prices = {"Close": prices}
+    if "Close" not in prices:
+        raise ValueError("volatility : prices must contain closes")
+    close = prices["Close"]
+    index = close.index if isinstance(close, pd.DataFrame) else None
+    assets = list(close.columns) if isinstance(close, pd.DataFrame) else list(range(np.shape(close)[1]))
+    panel = {}
+    for col, frame in prices.items():
+        if isinstance(frame, pd.DataFrame):
+            frame = frame.reindex(index=index, columns=assets) if index is not None else frame
+        values = np.array(frame, dtype=np.float64)
+        if values.shape != np.shape(close):
+            raise ValueError(f"volatility : {col} must have the same shape as Close")
+        panel[col] = np.ascontiguousarray(values.T) # actifs x dates : le temps sur l'axe contigu
+    return panel, index, assets
+
+def _log_returns(close: np.ndarray) -> np.ndarray:
+    """
+    Rendements logarithmiques barre à barre (actifs x dates), NaN sur la première barre et quand l'un
+    des deux prix manque.
+    """
+    returns = np.full(close.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[:, 1:] = np.log(close[:, 1:] / close[:, :-1])
+    return returns
+
+def _contributions(panel: dict, estimator: str) -> np.ndarray:
+    """
+    Contribution de chaque barre à la variance (actifs x dates) : la variance d'un estimateur est
+    la moyenne de ses contributions (close-to-close : rendements centrés, voir _variance).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if estimator == "close":
+            return _log_returns(panel["Close"])
+        if "High" not in panel or "Low" not in panel:
+            raise ValueError(f"volatility : {estimator} needs High and Low prices")
+        range_ = np.log(panel["High"] / panel["Low"]) ** 2
+        if estimator == "parkinson":
+            return range_ / (4 * np.log(2))
+        if estimator == "garman_klass":
+            if "Open" not in panel:
+                raise ValueError("volatility : garman_klass needs Open prices")
+            body = np.log(panel["Close"] / panel["Open"]) ** 2
+            return 0.5 * range_ - (2 * np.log(2) - 1) * body
+    raise ValueError(f"volatility : unknown estimator {estimator}, expected one of {ESTIMATORS}")
+
+def _cumulative(values: np.ndarray) -> np.ndarray:
+    """
+    Sommes cumulées sur le dernier axe, précédées d'une colonne de zéros.
+    """
+    out = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,))
+    np.cumsum(values, axis=-1, out=out[..., 1:])
+    return out
+
+def _variance(contributions: np.ndarray, estimator: str, window: int, min_periods: int) -> np.ndarray:
+    """
+    Variance par barre glissante sur window barres (actifs x dates), à partir de sommes cumulées.
+    Les barres sans contribution (NaN) sont ignorées ; une fenêtre avec moins de min_periods contributions
+    vaut NaN.
+    """
+    valid = ~np.isnan(contributions)
+    values = np.where(valid, contributions, 0.0)
+    if estimator == "close":
+        # Rendements centrés sur leur moyenne, pour limiter les erreurs d'arrondi de Σr² - (Σr)²/n
+        with np.errstate(invalid="ignore"):
+            mean = values.sum(axis=-1, keepdims=True) / valid.sum(axis=-1, keepdims=True)
+        values = np.where(valid, values - mean, 0.0)
+
+    def window_sums(v):
+        # Les premières fenêtres, incomplètes, commencent à la première barre (comme pandas avec min_periods)
+        cumulative = _cumulative(v)
+        sums = cumulative[..., 1:].copy()
+        sums[..., window:] -= cumulative[..., 1:-window]
+        return sums
+
+    count = window_sums(valid.astype(np.float64))
+    total = window_sums(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if estimator == "close":
+            squares = window_sums(values * values)
+            rolling = (squares - total ** 2 / count) / (count - 1)
+            rolling[count < 2] = np.nan
+        else:
+            rolling = total / count
+        rolling[count < min_periods] = np.nan
+    return np.maximum(rolling, 0.0)
+
+def _ewma_variance(returns: np.ndarray, lam: float, block: int = EWMA_BLOCK) -> np.ndarray:
+    """
+    Variance EWMA (RiskMetrics) des rendements, σ²(t) = λ·σ²(t-1) + (1 - λ)·r²(t), initialisée au premier
+    r² de chaque actif. Les barres sans rendement sont ignorées (σ² inchangée, comme pandas ewm(adjust=False,
+    ignore_na=True)). La récurrence est déroulée par blocs de sommes cumulées : dans un bloc,
+    σ²(t) = λ^k(t)·(σ²(début) + (1 - λ)·Σ λ^-k(s)·r²(s)), k comptant les rendements depuis le début du bloc ;
+    le bloc est assez court pour que λ^-k reste représentable.
+    """
+    n, t = returns.shape
+    valid = ~np.isnan(returns)
+    squares = np.where(valid, returns * returns, 0.0)
+    variance = np.full((n, t), np.nan)
+    if t == 0:
+        return variance
+
+    # Bloc limité pour que λ^-k ne dépasse pas 1e100
+    block = max(1, min(block, int(100 * np.log(10) / -np.log(lam)) if lam < 1 else block))
+    first = np.argmax(valid, axis=1)
+    state = np.where(valid.any(axis=1), squares[np.arange(n), first], np.nan) # σ² avant le bloc
+    seen = np.zeros(n, dtype=bool)
+
+    for lo in range(0, t, block):
+        hi = min(lo + block, t)
+        counts = np.cumsum(valid[:, lo:hi], axis=1) # k(t)
+        scaled = np.where(valid[:, lo:hi], lam ** -counts.astype(np.float64) * squares[:, lo:hi], 0.0)
+        values = lam ** counts * (state[:, None] + (1 - lam) * np.cumsum(scaled, axis=1))
+        # Avant le premier rendement d'un actif : pas encore de variance
+        started = seen[:, None] | (counts > 0)
+        variance[:, lo:hi] = np.where(started, values, np.nan)
+        state = values[:, -1]
+        seen |= started[:, -1]
+    return variance
+
+def rolling_volatility(prices, estimator: str = "close", windows=WINDOWS, periods: float = None, min_periods: int = None) -> np.ndarray:
+    """
+    Volatilité annualisée glissante de tous les actifs, pour plusieurs fenêtres.
+
+    Estimateurs :
+        - close : écart type des rendements logarithmiques de clôture à clôture
+        - parkinson : à partir de l'amplitude ln(High / Low) de chaque barre
+        - garman_klass : amplitude et corps ln(Close / Open) de chaque barre
+    Comme pandas rolling(window, min_periods), les barres manquantes sont ignorées et une fenêtre
+    avec moins de min_periods observations vaut NaN.
+
+    :@param prices: Dataframe de clôtures (dates x actifs), ou dict colonne ("Open", "High", "Low", "Close") -> dataframe
+    :@param estimator: "close", "parkinson" ou "garman_klass"
+    :@param windows: Longueurs des fenêtres glissantes, en barres
+    :@param periods: Nombre de barres par an pour annualiser (déduit de l'index par défaut, voir bars_per_year)
+    :@param min_periods: Nombre minimum d'observations par fenêtre, la fenêtre entière par défaut
+    :return: Tableau de shape (fenêtres, dates, actifs)
+    """
+    if estimator == "ewma":
+        raise ValueError("rolling_volatility : use ewma_volatility for the ewma estimator")
+    panel, index, assets = _panel(prices)
+    periods = bars_per_year(index) if periods is None else periods
+    contributions = _contributions(panel, estimator)
+    n, t = contributions.shape
+
+    result = np.full((len(windows), n, t), np.nan)
+    for k, window in enumerate(windows):
+        window = int(window)
+        if window < 2:
+            raise ValueError("rolling_volatility : windows must be at least 2")
+        if window > t:
+            continue # fenêtre plus longue que l'historique
+        required = window if min_periods is None else max(int(min_periods), 1)
+        result[k] = np.sqrt(_variance(contributions, estimator, window, required) * periods)
+    return result.transpose(0, 2, 1)
+
+def ewma_volatility(prices, lam: float = EWMA_LAMBDA, periods: float = None) -> np.ndarray:
+    """
+    Volatilité annualisée EWMA (RiskMetrics) de tous les actifs, à chaque barre.
+
+    :@param prices: Dataframe de clôtures (dates x actifs), ou dict colonne -> dataframe
+    :@param lam: Facteur de décroissance λ, entre 0 et 1
+    :@param periods: Nombre de barres par an pour annualiser (déduit de l'index par défaut)
+    :return: Tableau de shape (dates, actifs)
+    """
+    if not 0 < lam < 1:
+        raise ValueError("ewma_volatility : lam must be between 0 and 1")
+    panel, index, assets = _panel(prices)
+    periods = bars_per_year(index) if periods is None else periods
+    return np.sqrt(_ewma_variance(_log_returns(panel["Close"]), lam) * periods).T
+
+def volatility(prices, estimators=ESTIMATORS, periods: float = None, lam: float = EWMA_LAMBDA) -> pd.DataFrame:
+    """
+    Volatilité annualisée de tous les actifs sur tout l'échantillon, pour chaque estimateur
+    (EWMA : valeur à la dernière barre).
+
+    :@param prices: Dataframe de clôtures (dates x actifs), ou dict colonne -> dataframe
+    :@param estimators: Estimateurs à calculer (ceux qui demandent High, Low ou Open sont ignorés s'ils manquent)
+    :@param periods: Nombre de barres par an pour annualiser (déduit de l'index par défaut)
+    :@param lam: Facteur de décroissance de l'EWMA
+    :return: Dataframe actifs x estimateurs
+    """
+    panel, index, assets = _panel(prices)
+    periods = bars_per_year(index) if periods is None else periods
+    table = {}
+    for estimator in estimators:
+        if estimator == "ewma":
+            variance = _ewma_variance(_log_returns(panel["Close"]), lam)
+            last = np.full(len(assets), np.nan)
+            started = ~np.isnan(variance)
+            rows = np.flatnonzero(started.any(axis=1))
+            last[rows] = variance[rows, variance.shape[1] - 1 - np.argmax(started[rows, ::-1], axis=1)]
+            table[estimator] = np.sqrt(last * periods)
+            continue
+        required = {"parkinson": {"High", "Low"}, "garman_klass": {"Open", "High", "Low"}}.get(estimator, set())
+        if not required <= set(panel):
+            continue
+        contributions = _contributions(panel, estimator)
+        t = contributions.shape[1]
+        table[estimator] = np.sqrt(_variance(contributions, estimator, t, 1)[:, -1] * periods) if t else np.full(len(assets), np.nan)
+    return pd.DataFrame(table, index=pd.Index(assets, name="asset"))
+
+def ratio_matrix(volatilities):
+    """
+    Matrice des ratios de volatilité de toutes les paires d'actifs : case [i, j] = volatilité de i / volatilité de j.
+
+    :@param volatilities: Série indexée par actif, ou tableau (..., actifs), par exemple un résultat de rolling_volatility
+    :return: Dataframe actifs x actifs pour une série, sinon tableau (..., actifs, actifs)
+    """
+    if isinstance(volatilities, pd.Series):
+        values = volatilities.to_numpy(dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return pd.DataFrame(values[:, None] / values[None, :], index=volatilities.index, columns=volatilities.index)
+    values = np.asarray(volatilities, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return values[..., :, None] / values[..., None, :]
+
 def volatility_ratio(ticker1: str, ticker2: str, start="2015-01-01", end=None):
     """
     Compare la volatilité de deux actifs.
@@ -54,24 +317,35 @@ def volatility_ratio(ticker1: str, ticker2: str, start="2015-01-01", end=None):
     :@param end: Date de fin de récolte des données de prix
     """
 
-    # On télécharge les données de prix des deux actifs
-    data1 = download_data(ticker1, start, end)
-    data2 = download_data(ticker2, start, end)
-    
-    # On calcule les taux de variations journaliers.
-    rendement1 = data1.pct_change().dropna()
-    rendement2 = data2.pct_change().dropna()
-    
+    # On télécharge les données de prix des deux actifs en un seul appel (lues depuis le cache local si déjà téléchargées)
+    prices = download_prices([ticker1, ticker2], start, end)
+
+    # On calcule les taux de variations journaliers, chaque actif sur ses propres jours de cotation
+    rendement1 = prices[[ticker1]].dropna().pct_change().dropna()
+    rendement2 = prices[[ticker2]].dropna().pct_change().dropna()
+
     # Calcul de la volatilité annualisée
     volatilite1 = compute_volatility(rendement1)
     volatilite2 = compute_volatility(rendement2)
-    
+
     # Calcul du ratio entre volatilités des deux actifs
     ratio = volatilite1[ticker1] / volatilite2[ticker2]
-    
+
     print(f"Volatilité annualisée de {ticker1} : {volatilite1[ticker1]:.2%}")
     print(f"Volatilité annualisée de {ticker2} : {volatilite2[ticker2]:.2%}")
     print(f"Volatility ratio ({ticker1}/{ticker2}) : {ratio:.2f}")
 
+def main():
+    volatility_ratio("MSFT", "GOOGL")
+
+    # Tout un univers : volatilités par estimateur, puis ratios des volatilités Garman-Klass sur 60 jours
+    tickers = ["MSFT", "GOOGL", "AAPL", "GC=F", "SI=F", "^GSPC"]
+    ohlc = load_ohlc(tickers)
+    print(volatility(ohlc).to_string(float_format="{:.2%}".format))
+
+    rolling = rolling_volatility(ohlc, "garman_klass", windows=(60,), min_periods=40)
+    last = pd.Series(rolling[0, -1], index=tickers)
+    print(ratio_matrix(last).to_string(float_format="{:.2f}".format))
+
 if __name__ == "__main__":
-    volatility_ratio("MSFT", "GOOGL")
\ No newline at end of file
+    main()